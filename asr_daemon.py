@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻解码服务: 启动时加载一个或多个模型 (VAD、LLM、encoder、tokenizer) 并常驻内存，
+通过 Unix domain socket 接收解码请求，逐句把结果流式返回。
+decode.py (++daemon=true) 与 demo.py (--daemon) 作为瘦客户端连接服务，不再各自构建 AutoModel，
+调整 prompt、跑小评测集时可以立即开始解码。
+协议为 JSON lines，每个连接发送一行请求，服务端逐行应答:
+    {"op": "decode", "model": "ft", "prompt": "语音转写成日文：", "lines": ["<key> <audio>", ...]}
+        -> {"key": ..., "text": ...} ... {"done": true, "count": N}
+    {"op": "models"} -> {"models": {"ft": {"model_dir": ..., "init_param": ...}}, "default": "ft", "done": true}
+出错时应答 {"error": "..."}。多个连接共用一个模型时按句交替解码。
+用法:
+    python asr_daemon.py --model nano=FunAudioLLM/Fun-ASR-Nano-2512 \
+        --model ft=FunAudioLLM/Fun-ASR-Nano-2512,outputs/model.pt.best
+    python decode.py ++daemon=true ++daemon_model=ft ++scp_file=val.scp ++output_file=out.txt
+    python demo.py --daemon --daemon_model ft --audio_file a.wav
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+DEFAULT_SOCKET = os.environ.get("ASR_DAEMON_SOCKET", os.path.expanduser("~/.cache/fun_asr_galgame/asr_daemon.sock"))
+DEFAULT_MODEL = "FunAudioLLM/Fun-ASR-Nano-2512"
+# audio uris that carry a local file path after the scheme
+PATH_SCHEMES = ("tar://", "pack://")
+
+
+def absolute_line(line):
+    """'<key> <audio>' with a relative local audio path made absolute (the daemon has its own cwd)."""
+    parts = line.strip().split(maxsplit=1)
+    if len(parts) != 2:
+        return line
+    key, audio = parts
+    scheme = next((s for s in PATH_SCHEMES if audio.startswith(s)), "")
+    if "://" in audio and not scheme:
+        return line
+    path = audio[len(scheme) :]
+    return f"{key} {scheme}{path if os.path.isabs(path) else os.path.abspath(path)}"
+
+
+class DaemonClient(object):
+    """Thin client of a running asr_daemon; imports nothing heavier than the socket module."""
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or DEFAULT_SOCKET
+
+    def _request(self, request):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            sock.close()
+            raise ConnectionError(
+                f"no decode daemon at {self.socket_path}; start one with `python asr_daemon.py`"
+            ) from e
+        with sock, sock.makefile("r", encoding="utf-8") as f:
+            sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+            for line in f:
+                message = json.loads(line)
+                if "error" in message:
+                    raise RuntimeError(f"decode daemon: {message['error']}")
+                yield message
+                if message.get("done"):
+                    return
+        raise ConnectionError(f"decode daemon at {self.socket_path} closed the connection mid-request")
+
+    def models(self):
+        """{"models": {name: spec}, "default": name} of the daemon."""
+        return list(self._request({"op": "models"}))[-1]
+
+    def decode(self, lines, model=None, prompt=None):
+        """Yield (key, text) for every "<key> <audio>" line, streamed as the daemon decodes them."""
+        request = {"op": "decode", "model": model, "prompt": prompt, "lines": [absolute_line(line) for line in lines]}
+        for message in self._request(request):
+            if "key" in message:
+                yield message["key"], message["text"]
+
+
+class ModelSlot(object):
+    """One loaded model; `lock` serializes its use across connections."""
+
+    def __init__(self, model_dir, init_param=None, device=None):
+        from decode import build_model
+
+        self.spec = {"model_dir": model_dir, "init_param": init_param}
+        self.model = build_model(model_dir, device, init_param=init_param)
+        self.lock = threading.Lock()
+
+
+class DecodeHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline() or "{}")
+            op = request.get("op", "decode")
+            if op == "models":
+                models = {name: slot.spec for name, slot in self.server.models.items()}
+                self.send({"models": models, "default": self.server.default, "done": True})
+            elif op == "decode":
+                self.decode(request)
+            else:
+                self.send({"error": f"unknown op {op!r}"})
+        except (BrokenPipeError, ConnectionResetError):
+            # the client went away; its remaining lines are dropped
+            pass
+        except Exception as e:
+            logging.exception("decode daemon request failed")
+            try:
+                self.send({"error": f"{type(e).__name__}: {e}"})
+            except OSError:
+                pass
+
+    def send(self, message):
+        self.wfile.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def decode(self, request):
+        from decode import decode_lines
+
+        name = request.get("model") or self.server.default
+        slot = self.server.models.get(name)
+        if slot is None:
+            self.send({"error": f"unknown model {name!r}, loaded: {', '.join(self.server.models)}"})
+            return
+        results = decode_lines(slot.model, request.get("lines", []), prompt=request.get("prompt"), prefetch=self.server.prefetch)
+        count = 0
+        try:
+            while True:
+                # taken per utterance, so concurrent clients of one model take turns
+                with slot.lock:
+                    result = next(results, None)
+                if result is None:
+                    break
+                self.send({"key": result[0], "text": result[1]})
+                count += 1
+        finally:
+            results.close()
+        self.send({"done": True, "count": count})
+
+
+class DecodeServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, models, default, prefetch=8):
+        self.models = models
+        self.default = default
+        self.prefetch = prefetch
+        super().__init__(socket_path, DecodeHandler)
+
+
+def claim_socket(socket_path):
+    """Remove a stale socket file; refuse to start next to a live daemon."""
+    if not os.path.exists(socket_path):
+        os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(socket_path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"a decode daemon is already listening on {socket_path}")
+
+
+def parse_model_spec(spec):
+    """'NAME=MODEL_DIR[,INIT_PARAM]' -> (name, model_dir, init_param); a bare MODEL_DIR is named 'default'."""
+    name, sep, rest = spec.partition("=")
+    if not sep:
+        name, rest = "default", spec
+    model_dir, _, init_param = rest.partition(",")
+    return name, model_dir, init_param or None
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Keep ASR models loaded and decode for clients over a Unix domain socket.")
+    p.add_argument("--model", action="append", default=None,
+                   help=f"NAME=MODEL_DIR[,INIT_PARAM], repeatable; the first one is the default (default: default={DEFAULT_MODEL})")
+    p.add_argument("--socket", default=DEFAULT_SOCKET, help="Socket path (default: $ASR_DAEMON_SOCKET or %(default)s)")
+    p.add_argument("--device", default=None, help="Device for all models (default: cuda:0, mps or cpu)")
+    p.add_argument("--prefetch", type=int, default=8, help="Remote clips fetched ahead per request")
+    p.add_argument("--remote_cache_dir", default=None, help="Keep downloaded http(s) audio here")
+    p.add_argument("--remote_cache_max_gb", type=float, default=20, help="Size cap of --remote_cache_dir")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    specs = [parse_model_spec(spec) for spec in args.model or [DEFAULT_MODEL]]
+    claim_socket(args.socket)
+    if args.remote_cache_dir:
+        from audio_source import configure_remote
+
+        configure_remote(args.remote_cache_dir, args.remote_cache_max_gb)
+
+    models = {}
+    for name, model_dir, init_param in specs:
+        print(f"loading {name}: {model_dir}" + (f" + {init_param}" if init_param else ""), flush=True)
+        models[name] = ModelSlot(model_dir, init_param, args.device)
+
+    server = DecodeServer(args.socket, models, specs[0][0], args.prefetch)
+    # the socket decodes any path this user can read; keep it private
+    os.chmod(args.socket, 0o600)
+    print(f"listening on {args.socket} ({', '.join(models)})", flush=True)
+    # `kill` stops it as cleanly as Ctrl-C and removes the socket file
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import logging
+import re
+from io import BytesIO
+
+import soundfile as sf
+import torch
+from funasr.datasets.fun_asr_datasets import datasets as fun_asr_datasets
+from funasr.register import tables
+from funasr.utils.load_utils import load_audio_text_image_video
+
+from blocklist import Blocklist
+from packed_audio import PACK_SCHEME, PCM16, pcm16_to_float, read_pack_uri
+from remote_audio import Prefetcher, RemoteAudio
+from staging_cache import StagingCache, pack_pcm, unpack_pcm
+from tar_audio import TAR_SCHEME, read_tar_uri
+
+
+REMOTE_SCHEMES = ("http://", "https://")
+
+
+def is_virtual(data):
+    return isinstance(data, str) and data.startswith((TAR_SCHEME, PACK_SCHEME) + REMOTE_SCHEMES)
+
+
+def decode_bytes(data):
+    """Decode an encoded clip to a mono float32 tensor; returns (waveform, sample_rate)."""
+    waveform, sample_rate = sf.read(BytesIO(data), dtype="float32", always_2d=True)
+    return torch.from_numpy(waveform.mean(axis=1)), sample_rate
+
+
+# pooled connections for http(s) audio; configure_remote adds an on-disk cache
+_remote = RemoteAudio()
+
+
+def configure_remote(cache_dir=None, max_gb=20):
+    global _remote
+    _remote = RemoteAudio(cache_dir=cache_dir, max_gb=max_gb)
+
+
+def remote_prefetcher(urls, depth=8):
+    """Background fetch of the upcoming `urls` (in manifest order) through the shared remote."""
+    return Prefetcher(_remote, urls, depth=depth)
+
+
+def read_waveform(uri):
+    """Mono float32 waveform and its sample rate for a tar://, pack:// or http(s) uri."""
+    if uri.startswith(REMOTE_SCHEMES):
+        return decode_bytes(_remote.read(uri))
+    if uri.startswith(TAR_SCHEME):
+        return decode_bytes(read_tar_uri(uri))
+    if uri.startswith(PACK_SCHEME):
+        payload, sample_rate, fmt = read_pack_uri(uri)
+        if fmt == PCM16:
+            # the int16 view is zero-copy; the float conversion is the only copy made
+            return torch.from_numpy(pcm16_to_float(payload)), sample_rate
+        return decode_bytes(payload)
+    raise ValueError(f"Unsupported audio uri: {uri}")
+
+
+# set from dataset_conf.blocklist by the FunASRNano index; inherited by forked DataLoader workers
+_blocklist = None
+
+
+def set_blocklist(blocklist):
+    global _blocklist
+    _blocklist = blocklist
+
+
+# opt-in local copy of slow-disk audio, see configure_staging
+_staging = None
+
+
+def configure_staging(stage_dir, max_gb=100, mode="file"):
+    """Stage audio read from slow disks into `stage_dir` (LRU, at most `max_gb`)."""
+    global _staging
+    _staging = StagingCache(stage_dir, max_gb=max_gb, mode=mode) if stage_dir else None
+
+
+def is_stageable(data):
+    # pack:// is already mmapped and remote audio has its own cache
+    return isinstance(data, str) and not data.startswith((PACK_SCHEME,) + REMOTE_SCHEMES)
+
+
+def read_staged(path):
+    """Like read_waveform, but served from the staging directory after the first read."""
+    key, blob = _staging.lookup(path)
+    if blob is not None:
+        if _staging.mode == "pcm":
+            samples, sample_rate = unpack_pcm(blob)
+            return torch.from_numpy(pcm16_to_float(samples)), sample_rate
+        return decode_bytes(blob)
+
+    if path.startswith(TAR_SCHEME):
+        data = read_tar_uri(path)
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    waveform, sample_rate = decode_bytes(data)
+    _staging.put(key, pack_pcm(waveform.numpy(), sample_rate) if _staging.mode == "pcm" else data)
+    return waveform, sample_rate
+
+
+def load_audio(data, fs=16000, **kwargs):
+    """
+    Drop-in for load_audio_text_image_video on the audio path.
+    Virtual uris (tar://shard.tar#member, pack://shard.pack#key, http(s) urls) are read
+    here and resampled to `fs`; anything else goes to funasr unchanged. Blocklisted audio is
+    refused without being read. With staging configured, local files and tar members
+    are read from the fast staging copy once they have been seen.
+    """
+    if _blocklist is not None and isinstance(data, str) and data in _blocklist:
+        raise IOError(f"Blocklisted audio: {data}")
+    if _staging is not None and is_stageable(data):
+        waveform, sample_rate = read_staged(data)
+    elif is_virtual(data):
+        waveform, sample_rate = read_waveform(data)
+    else:
+        # arrays and tensors keep the caller's audio_fs
+        return load_audio_text_image_video(data, fs=fs, **kwargs)
+    # the waveform read here comes with its own sample rate
+    kwargs["audio_fs"] = sample_rate
+    return load_audio_text_image_video(waveform, fs=fs, **kwargs)
+
+
+def load_encoded(data, fs=16000, **kwargs):
+    """Decode in-memory audio bytes and resample to `fs`."""
+    waveform, sample_rate = decode_bytes(data)
+    return load_audio_text_image_video(waveform, fs=fs, audio_fs=sample_rate, **kwargs)
+
+
+# The FunASR training dataset calls funasr's loader directly; route it through
+# load_audio so tar:// and pack:// uris and the blocklist also apply during training.
+# funasr's datasets module does `from funasr.utils.load_utils import load_audio_text_image_video`
+# and its __getitem__ looks the name up in that module's globals at call time, so replacing
+# the module attribute reroutes every dataset built afterwards (and in forked workers).
+fun_asr_datasets.load_audio_text_image_video = load_audio
+
+
+@tables.register("index_ds_classes", "FunASRNano")
+class FunASRNanoIndexDS(fun_asr_datasets.FunASR):
+    """
+    The FunASR jsonl index, plus the audio options of this repo (++dataset_conf.index_ds=FunASRNano):
+      blocklist: drop utterances whose audio is listed (written by tools/check_tars.py),
+        so broken clips never reach a DataLoader worker
+      stage_dir / stage_max_gb / stage_mode: stage audio read from slow disks into a
+        local LRU directory ("file": encoded bytes, "pcm": decoded int16)
+      remote_cache_dir / remote_cache_max_gb: keep downloaded http(s) audio on disk
+    """
+
+    speech_pattern = re.compile(r"<\|startofspeech\|>!(.*?)<\|endofspeech\|>")
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        remote_cache_dir = kwargs.get("remote_cache_dir", None)
+        if remote_cache_dir:
+            configure_remote(remote_cache_dir, kwargs.get("remote_cache_max_gb", 20))
+        stage_dir = kwargs.get("stage_dir", None)
+        if stage_dir:
+            configure_staging(stage_dir, kwargs.get("stage_max_gb", 100), kwargs.get("stage_mode", "file"))
+            logging.info(f"staging audio in {stage_dir}")
+        blocklist_file = kwargs.get("blocklist", None)
+        if not blocklist_file:
+            return
+        blocklist = Blocklist.load(blocklist_file)
+        set_blocklist(blocklist)
+        total = len(self.contents)
+        self.contents = [
+            item
+            for item in self.contents
+            if not any(
+                wav_path in blocklist
+                for user in item["user"]
+                for wav_path in self.speech_pattern.findall(user)
+            )
+        ]
+        logging.info(
+            f"blocklist: dropped {total - len(self.contents)} of {total} samples, {blocklist_file}"
+        )
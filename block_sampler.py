@@ -0,0 +1,116 @@
+import logging
+import math
+import random
+
+import torch.distributed as dist
+from funasr.register import tables
+from torch.utils.data import Sampler
+
+
+@tables.register("batch_sampler_classes", "BlockShuffleBatchSampler")
+def BlockShuffleBatchSampler_fn(dataset, **kwargs):
+    return {
+        "batch_sampler": BlockShuffleBatchSampler(dataset, **kwargs),
+        "num_workers": kwargs.get("num_workers", 4),
+        "pin_memory": kwargs.get("pin_memory", True),
+    }
+
+
+class BlockShuffleBatchSampler(Sampler):
+    """
+    Token-budget batches for manifests written by tools/bucket_manifest.py.
+    The index is cut into contiguous blocks of `block_size` samples (adjacent rows share
+    a length band and, when packed, a .pack shard). Each epoch the block order is
+    shuffled, `shuffle_window` blocks at a time are pooled and sorted by length into
+    batches, and those batches are shuffled within the window. Batches stay tight on
+    padding and reads stay mostly sequential, while the block shuffle keeps SGD random.
+    """
+
+    def __init__(
+        self,
+        dataset,
+        batch_size,
+        batch_type="token",
+        shuffle=True,
+        is_training: bool = True,
+        block_size: int = 1024,
+        shuffle_window: int = 4,
+        start_step: int = 0,
+        **kwargs,
+    ):
+        try:
+            rank = dist.get_rank()
+            num_replicas = dist.get_world_size()
+        except:
+            rank = 0
+            num_replicas = 1
+
+        self.rank = rank
+        self.num_replicas = num_replicas
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.batch_type = batch_type
+        self.shuffle = shuffle and is_training
+        self.block_size = block_size
+        self.shuffle_window = shuffle_window
+        self.max_token_length = kwargs.get("max_token_length", 2048)
+        self.batch_size_sample_max = kwargs.get("batch_size_sample_max", 200)
+        self.start_step = start_step
+        self.epoch = 0
+        self.batch_num = 1
+
+    def make_batches(self, indices):
+        """Sort `indices` by length and cut them into batches under the token budget."""
+        batches = []
+        batch = []
+        max_len_in_batch = 0
+        for idx in sorted(indices, key=self.dataset.get_source_len):
+            source_len = self.dataset.get_source_len(idx)
+            if source_len > self.max_token_length:
+                continue
+            sample_length = 1 if self.batch_type == "example" else source_len
+            if batch and (
+                max(max_len_in_batch, sample_length) * (len(batch) + 1) > self.batch_size
+                or len(batch) >= self.batch_size_sample_max
+            ):
+                batches.append(batch)
+                batch = []
+                max_len_in_batch = 0
+            batch.append(idx)
+            max_len_in_batch = max(max_len_in_batch, sample_length)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def __iter__(self):
+        rng = random.Random(self.epoch)
+        total = len(self.dataset)
+        blocks = [range(start, min(start + self.block_size, total)) for start in range(0, total, self.block_size)]
+        if self.shuffle:
+            rng.shuffle(blocks)
+
+        all_batches = []
+        for start in range(0, len(blocks), self.shuffle_window):
+            window = [idx for block in blocks[start : start + self.shuffle_window] for idx in block]
+            batches = self.make_batches(window)
+            if self.shuffle:
+                rng.shuffle(batches)
+            all_batches += batches
+
+        # Same number of batches on every rank; pad with repeats like the FunASR samplers
+        batches_per_rank = math.ceil(len(all_batches) / self.num_replicas)
+        extra_batches = batches_per_rank * self.num_replicas - len(all_batches)
+        all_batches += rng.choices(all_batches, k=extra_batches) if all_batches else []
+
+        final_batches = all_batches[self.rank :: self.num_replicas][self.start_step :]
+        self.batch_num = len(final_batches)
+        logging.info(
+            f"rank: {self.rank}, blocks: {len(blocks)}, dataloader start from step: {self.start_step}, batch_num: {self.batch_num}"
+        )
+        return iter(final_batches)
+
+    def __len__(self):
+        return self.batch_num
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
@@ -0,0 +1,54 @@
+import os
+
+from packed_audio import PACK_SCHEME
+from tar_audio import TAR_SCHEME
+
+
+class Blocklist(object):
+    """
+    Audio known to be broken, as written by tools/check_tars.py.
+    One entry per line: a whole shard (`/data/xxx.tar`), a tar member
+    (`tar:///data/xxx.tar#abc.ogg`), a packed clip (`pack:///data/xxx.pack#abc`) or a
+    plain audio path. A shard entry blocks every member of that shard; any other entry
+    blocks an utterance, identified by its utt (the file stem, or the pack key), in every
+    form it is read from: tar member, extracted file or packed clip.
+    """
+
+    def __init__(self, entries=()):
+        self.entries = set()
+        self.shards = set()
+        self.utts = set()
+        for entry in entries:
+            self.add(entry)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(line.strip() for line in f if line.strip())
+
+    @staticmethod
+    def utt(path):
+        """tar:///d/x.tar#sub/abc.ogg, pack:///d/x.pack#abc and /d/abc.wav -> "abc" """
+        if path.startswith(PACK_SCHEME):
+            # packed clips are keyed by utt
+            return path.partition(".pack#")[2]
+        if path.startswith(TAR_SCHEME):
+            path = path.partition(".tar#")[2]
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def add(self, entry):
+        self.entries.add(entry)
+        if entry.endswith(".tar"):
+            self.shards.add(entry)
+        else:
+            self.utts.add(self.utt(entry))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, path):
+        if path.endswith(".tar"):
+            return path in self.shards
+        if path.startswith(TAR_SCHEME) and path[len(TAR_SCHEME) :].partition(".tar#")[0] + ".tar" in self.shards:
+            return True
+        return self.utt(path) in self.utts
@@ -1,26 +1,13 @@
 import os
 
 import hydra
-import torch
 from omegaconf import DictConfig, ListConfig, OmegaConf
 
 
-@hydra.main(config_name=None, version_base=None)
-def main_hydra(cfg: DictConfig):
-    def to_plain_list(cfg_item):
-        if isinstance(cfg_item, ListConfig):
-            return OmegaConf.to_container(cfg_item, resolve=True)
-        elif isinstance(cfg_item, DictConfig):
-            return {k: to_plain_list(v) for k, v in cfg_item.items()}
-        else:
-            return cfg_item
-    kwargs = to_plain_list(cfg)
-
-    model_dir = kwargs.get("model_dir", "FunAudioLLM/Fun-ASR-Nano-2512")
-    scp_file = kwargs["scp_file"]
-    output_file = kwargs["output_file"]
+def default_device():
+    import torch
 
-    device = (
+    return (
         "cuda:0"
         if torch.cuda.is_available()
         else "mps"
@@ -28,43 +15,118 @@ def main_hydra(cfg: DictConfig):
         else "cpu"
     )
 
+
+def build_model(model_dir="FunAudioLLM/Fun-ASR-Nano-2512", device=None, init_param=None):
+    """The decoding AutoModel (with fsmn-vad), loaded once and reusable for any number of scp lines."""
     from funasr import AutoModel
 
-    model = AutoModel(
+    return AutoModel(
         model=model_dir,
+        init_param=init_param,
         trust_remote_code=True,
         vad_model="fsmn-vad",
         vad_kwargs={"max_single_segment_time": 30000},
         remote_code="./model.py",
-        device=device,
+        device=device or default_device(),
     )
 
+
+def decode_lines(model, lines, prompt=None, prefetch=8):
+    """
+    Yield (key, text) for every "<key> <audio>" line, in order, as each one is decoded;
+    lines without an audio field are skipped.
+    """
+    from audio_source import (
+        REMOTE_SCHEMES,
+        is_virtual,
+        load_audio,
+        load_encoded,
+        remote_prefetcher,
+    )
+
+    lines = list(lines)
+    # remote clips are fetched ahead in scp order while the model decodes
+    prefetcher = remote_prefetcher(
+        (
+            parts[1]
+            for parts in (line.split(maxsplit=1) for line in lines)
+            if len(parts) == 2 and parts[1].startswith(REMOTE_SCHEMES)
+        ),
+        depth=prefetch,
+    )
+    try:
+        for line in lines:
+            parts = line.split(maxsplit=1)
+            if len(parts) == 2:
+                audio_in = parts[1]
+                if audio_in.startswith(REMOTE_SCHEMES):
+                    audio_in = load_encoded(prefetcher.read(audio_in), fs=16000)
+                elif is_virtual(audio_in):
+                    # tar:// / pack:// clips are decoded here; VAD then sees a 16k waveform
+                    audio_in = load_audio(audio_in, fs=16000)
+                if prompt:
+                    res = model.generate(input=[audio_in], cache={}, batch_size=1, prompt=prompt)
+                else:
+                    res = model.generate(input=[audio_in], cache={}, batch_size=1)
+
+                if res:
+                    text = res[0]["text"]
+                else:
+                    print(f"Warning: Empty result for {parts[0]}")
+                    text = ""
+
+                yield parts[0], text
+    finally:
+        prefetcher.close()
+
+
+@hydra.main(config_name=None, version_base=None)
+def main_hydra(cfg: DictConfig):
+    def to_plain_list(cfg_item):
+        if isinstance(cfg_item, ListConfig):
+            return OmegaConf.to_container(cfg_item, resolve=True)
+        elif isinstance(cfg_item, DictConfig):
+            return {k: to_plain_list(v) for k, v in cfg_item.items()}
+        else:
+            return cfg_item
+    kwargs = to_plain_list(cfg)
+
+    model_dir = kwargs.get("model_dir", "FunAudioLLM/Fun-ASR-Nano-2512")
+    scp_file = kwargs["scp_file"]
+    output_file = kwargs["output_file"]
+
     output_dir = os.path.dirname(output_file)
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
 
     prompt = kwargs.get("prompt", None)
-
     with open(scp_file, "r", encoding="utf-8") as f1:
-        with open(output_file, "w", encoding="utf-8") as f2:
-            for line in f1:
-                line = line.strip()
-                if not line:
-                    continue
-                parts = line.split(maxsplit=1)
-                if len(parts) == 2:
-                    if prompt:
-                        res = model.generate(input=[parts[1]], cache={}, batch_size=1, prompt=prompt)
-                    else:
-                        res = model.generate(input=[parts[1]], cache={}, batch_size=1)
-                    
-                    if res:
-                        text = res[0]["text"]
-                    else:
-                        print(f"Warning: Empty result for {parts[0]}")
-                        text = ""
-                        
-                    f2.write(f"{parts[0]}\t{text}\n")
+        lines = [line.strip() for line in f1 if line.strip()]
+
+    # ++daemon=true (or a socket path): decode on a running asr_daemon.py instead of loading the model here
+    daemon = kwargs.get("daemon", None)
+    if daemon:
+        from asr_daemon import DaemonClient
+
+        client = DaemonClient(None if daemon is True else str(daemon))
+        # fails here, before output_file is truncated, when no daemon is running
+        loaded = client.models()
+        daemon_model = kwargs.get("daemon_model", None) or loaded["default"]
+        print(f"decoding with {daemon_model} on {client.socket_path}")
+        results = client.decode(lines, model=daemon_model, prompt=prompt)
+    else:
+        from audio_source import configure_remote
+
+        model = build_model(model_dir, init_param=kwargs.get("init_param", None))
+        # downloaded http(s) audio is kept here across decode runs
+        remote_cache_dir = kwargs.get("remote_cache_dir", None)
+        if remote_cache_dir:
+            configure_remote(remote_cache_dir, kwargs.get("remote_cache_max_gb", 20))
+        results = decode_lines(model, lines, prompt=prompt, prefetch=kwargs.get("prefetch", 8))
+
+    with open(output_file, "w", encoding="utf-8") as f2:
+        for key, text in results:
+            f2.write(f"{key}\t{text}\n")
 
 
 if __name__ == "__main__":
@@ -1,7 +1,5 @@
 import argparse
-import torch
 import os
-from funasr import AutoModel
 
 def main():
     # 1. 设置命令行参数解析
@@ -16,9 +14,22 @@ def main():
                         help="要识别的音频文件路径")
     parser.add_argument("--prompt", type=str, default="语音转写成日文：", 
                         help="推理提示词 (例如 '语音转写成日文：')")
+    parser.add_argument("--daemon", nargs="?", const="", default=None,
+                        help="交给常驻的 asr_daemon.py 识别，不在本进程加载模型 (可指定 socket 路径)")
+    parser.add_argument("--daemon_model", type=str, default=None,
+                        help="daemon 中使用的模型名 (默认为 daemon 的第一个模型)")
     
     args = parser.parse_args()
 
+    if args.daemon is not None:
+        from asr_daemon import DaemonClient
+
+        client = DaemonClient(args.daemon or None)
+        print(f"使用常驻服务: {client.socket_path} (Prompt: {args.prompt})")
+        res = [{"text": text} for _, text in client.decode([f"demo {args.audio_file}"], model=args.daemon_model, prompt=args.prompt) if text]
+        print_result(res)
+        return
+
     # 2. 逻辑处理：自动寻找权重文件
     actual_init_param = args.init_param
     if not actual_init_param and args.model_dir:
@@ -33,6 +44,9 @@ def main():
                 actual_init_param = normal_pt
 
     # 3. 设备检测 (GPU/MPS/CPU)
+    import torch
+    from funasr import AutoModel
+
     device = (
         "cuda:0"
         if torch.cuda.is_available()
@@ -65,6 +79,10 @@ def main():
     )
 
     # 6. 输出结果
+    print_result(res)
+
+
+def print_result(res):
     if res and len(res) > 0:
         text = res[0].get("text", "")
         print("\n识别结果:")
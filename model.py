@@ -8,13 +8,9 @@ import traceback
 
 import torch
 import torch.nn as nn
-from funasr import AutoModel
-from funasr.metrics.compute_acc import compute_accuracy
 from funasr.register import tables
 from funasr.train_utils.device_funcs import force_gatherable, to_device
-from funasr.utils.datadir_writer import DatadirWriter
-from funasr.utils.load_utils import extract_fbank, load_audio_text_image_video
-from transformers import AutoConfig, AutoModelForCausalLM
+from funasr.utils.load_utils import extract_fbank
 
 from ctc import CTC
 
@@ -36,6 +32,12 @@ class FunASRNano(nn.Module):
         **kwargs,
     ):
         super().__init__()
+        # Registers BlockShuffleBatchSampler and the FunASRNano index dataset, and routes
+        # funasr's dataset audio loading through audio_source. Imported here rather than at
+        # module level to keep `import model` light; the trainer builds the model before the
+        # dataset and batch sampler, which need the model's tokenizer and frontend.
+        import audio_source  # noqa: F401
+        import block_sampler  # noqa: F401
 
         # audio encoder
         hub = audio_encoder_conf.get("hub", None)
@@ -43,6 +45,8 @@ class FunASRNano(nn.Module):
             "activation_checkpoint", False
         )
         if hub == "ms":
+            from funasr import AutoModel
+
             model = AutoModel(model=audio_encoder, model_revision="master")
             audio_encoder_output_size = (
                 model.model.encoder_output_size
@@ -71,6 +75,9 @@ class FunASRNano(nn.Module):
         init_param_path = llm_conf.get("init_param_path", None)
         llm_dim = None
 
+        # transformers is only needed once a model is built, not to register the class
+        from transformers import AutoConfig, AutoModelForCausalLM
+
         llm_load_kwargs = llm_conf.get("load_kwargs", {})
         config = AutoConfig.from_pretrained(init_param_path)
         model = AutoModelForCausalLM.from_config(config, **llm_load_kwargs)
@@ -233,6 +240,8 @@ class FunASRNano(nn.Module):
             )
             loss = model_outputs.loss
 
+        from funasr.metrics.compute_acc import compute_accuracy
+
         with torch.no_grad():
             preds = torch.argmax(model_outputs.logits, -1)
             acc_att = compute_accuracy(
@@ -366,10 +375,10 @@ class FunASRNano(nn.Module):
                         if sub_str.startswith("!"):  # !!: audio sample point
                             sub_str = audio
                         try:
+                            from audio_source import load_audio
+
                             time1 = time.perf_counter()
-                            data_src = load_audio_text_image_video(
-                                sub_str, fs=frontend.fs, **kwargs
-                            )
+                            data_src = load_audio(sub_str, fs=frontend.fs, **kwargs)
                             time2 = time.perf_counter()
                             meta_data["load_data"] = f"{time2 - time1:0.3f}"
                         except Exception as e:
@@ -463,6 +472,20 @@ class FunASRNano(nn.Module):
         frontend=None,
         **kwargs,
     ):
+        contents, batch, encoder_out, encoder_out_lens, meta_data = self.prepare_speech(
+            data_in, tokenizer, frontend, **kwargs
+        )
+        inputs_embeds, source_ids = self.embed_inputs(
+            batch, encoder_out, encoder_out_lens, **kwargs
+        )
+        return inputs_embeds, contents, batch, source_ids, meta_data
+
+    def prepare_speech(self, data_in, tokenizer=None, frontend=None, **kwargs):
+        """
+        Everything before the LLM: the prompt template, features, audio encoder and
+        adaptor. Depends only on the frozen encoder / adaptor weights, so the result
+        can be reused across checkpoints that differ in the LLM only (embed_inputs).
+        """
         meta_data = {}
 
         if kwargs.get("batch_size", 1) > 1:
@@ -476,6 +499,7 @@ class FunASRNano(nn.Module):
 
         # audio encoder
         speech = batch["speech"]
+        encoder_out, encoder_out_lens = None, None
 
         if len(speech) > 0:
             if "audio_embedding" in kwargs and "audio_embedding_lens" in kwargs:
@@ -498,6 +522,10 @@ class FunASRNano(nn.Module):
                 meta_data["audio_adaptor_out"] = encoder_out
                 meta_data["audio_adaptor_out_lens"] = encoder_out_lens
 
+        return contents, batch, encoder_out, encoder_out_lens, meta_data
+
+    def embed_inputs(self, batch, encoder_out, encoder_out_lens, **kwargs):
+        """LLM input embeddings of the prompt with the adaptor outputs spliced in."""
         input_ids = batch["input_ids"]
         source_ids = batch["source_ids"]
         fbank_beg = batch["fbank_beg"]
@@ -532,7 +560,7 @@ class FunASRNano(nn.Module):
                         #
                         logging.error(f"{str(e)}, {traceback.format_exc()}")
                         logging.info(
-                            f"batch_idx: {batch_idx}, inputs_embeds: {inputs_embeds.shape}, fbank_beg_idx: {fbank_beg_idx}, speech_token_len: {speech_token_len}, encoder_out: {encoder_out.shape}, encoder_out_lens: {encoder_out_lens}, fake_token_len: {fake_token_len}, speech_lengths: {speech_lengths}"
+                            f"batch_idx: {batch_idx}, inputs_embeds: {inputs_embeds.shape}, fbank_beg_idx: {fbank_beg_idx}, speech_token_len: {speech_token_len}, encoder_out: {encoder_out.shape}, encoder_out_lens: {encoder_out_lens}, fake_token_len: {fake_token_len}, speech_lengths: {batch['speech_lengths']}"
                         )
                         speech_token_len = encoder_out_lens[speech_idx].item()
                         speech_token = encoder_out[speech_idx, :speech_token_len, :]
@@ -543,17 +571,10 @@ class FunASRNano(nn.Module):
                         ] = speech_token
 
                     speech_idx += 1
-        return inputs_embeds, contents, batch, source_ids, meta_data
+        return inputs_embeds, source_ids
 
-    def inference(
-        self,
-        data_in,
-        data_lengths=None,
-        key: list = None,
-        tokenizer=None,
-        frontend=None,
-        **kwargs,
-    ):
+    def chat_inputs(self, data_in, **kwargs):
+        """Wrap audio paths / waveforms into the chat template with the (default or given) prompt."""
         prompt = kwargs.get("prompt", None)
         if prompt is None:
             hotwords = kwargs.get("hotwords", [])
@@ -598,7 +619,18 @@ class FunASRNano(nn.Module):
                         {"role": "assistant", "content": "null"},
                     ]
                 )
-        data_in = new_data_in
+        return new_data_in
+
+    def inference(
+        self,
+        data_in,
+        data_lengths=None,
+        key: list = None,
+        tokenizer=None,
+        frontend=None,
+        **kwargs,
+    ):
+        data_in = self.chat_inputs(data_in, **kwargs)
 
         if key is None:
             key = []
@@ -629,6 +661,15 @@ class FunASRNano(nn.Module):
         inputs_embeds, contents, batch, source_ids, meta_data = self.inference_prepare(
             data_in, data_lengths, key, tokenizer, frontend, **kwargs
         )
+        results = self.generate_text(
+            inputs_embeds, contents, batch, source_ids, key, tokenizer, **kwargs
+        )
+        return results, meta_data
+
+    def generate_text(
+        self, inputs_embeds, contents, batch, source_ids, key, tokenizer, **kwargs
+    ):
+        """LLM decoding from prepared input embeddings; returns the result dicts."""
         llm_dtype = kwargs.get("llm_dtype", "fp32")
         if llm_dtype == "fp32":
             llm_dtype = "fp16" if kwargs.get("fp16", False) else llm_dtype
@@ -679,6 +720,8 @@ class FunASRNano(nn.Module):
         ibest_writer = None
         if kwargs.get("output_dir") is not None:
             if not hasattr(self, "writer"):
+                from funasr.utils.datadir_writer import DatadirWriter
+
                 self.writer = DatadirWriter(kwargs.get("output_dir"))
             ibest_writer = self.writer[f"{0 + 1}best_recog"]
 
@@ -699,7 +742,7 @@ class FunASRNano(nn.Module):
             ibest_writer["label"][key[0]] = label.replace("\n", " ")
             ibest_writer["text_tn"][key[0]] = response_clean
 
-        return results, meta_data
+        return results
 
     @staticmethod
     def from_pretrained(model: str = None, **kwargs):
@@ -0,0 +1,161 @@
+import mmap
+import os
+
+import numpy as np
+
+PACK_SCHEME = "pack://"
+
+# payload formats
+ENCODED = 0  # the original file bytes (ogg/flac/wav), decoded on read
+PCM16 = 1  # little-endian int16 mono samples, read as a zero-copy view
+
+INDEX_DTYPE = [("offset", "<u8"), ("length", "<u8"), ("sample_rate", "<u4"), ("format", "u1")]
+
+
+def parse_pack_uri(uri):
+    """pack:///data/galgame-000.pack#abc -> ("/data/galgame-000.pack", "abc")"""
+    shard, sep, key = uri[len(PACK_SCHEME) :].partition(".pack#")
+    if not sep or not key:
+        raise ValueError(f"Invalid pack uri: {uri}")
+    return shard + ".pack", key
+
+
+def make_pack_uri(shard, key):
+    return f"{PACK_SCHEME}{shard}#{key}"
+
+
+def index_path(shard):
+    return shard + ".idx.npz"
+
+
+def float_to_pcm16(samples):
+    """float waveform in [-1, 1] -> int16, on soundfile's scale (int16 k reads as k / 32768)."""
+    return np.clip(np.asarray(samples, dtype=np.float32) * 32768, -32768, 32767).astype("<i2")
+
+
+def pcm16_to_float(samples):
+    """int16 samples -> float32 waveform, the inverse of float_to_pcm16."""
+    return samples.astype(np.float32) / 32768
+
+
+class PackWriter(object):
+    """
+    Append clips to one `.pack` shard: payloads are concatenated back to back and the
+    (key, offset, length, sample rate, format) index is written on close as
+    `<shard>.idx.npz`. Payloads start on 8 byte boundaries so int16 views are aligned.
+    """
+
+    ALIGN = 8
+
+    def __init__(self, shard):
+        self.shard = shard
+        self.f = open(shard + ".tmp", "wb")
+        self.keys = []
+        self.rows = []
+
+    @property
+    def size(self):
+        return self.f.tell()
+
+    def add_encoded(self, key, data, sample_rate):
+        self._add(key, data, sample_rate, ENCODED)
+
+    def add_pcm(self, key, samples, sample_rate):
+        """`samples`: 1-d int16 array (or float in [-1, 1], converted here)."""
+        samples = np.asarray(samples)
+        if samples.dtype != np.int16:
+            samples = float_to_pcm16(samples)
+        self._add(key, samples.astype("<i2", copy=False).tobytes(), sample_rate, PCM16)
+
+    def _add(self, key, data, sample_rate, fmt):
+        pad = -self.f.tell() % self.ALIGN
+        if pad:
+            self.f.write(b"\0" * pad)
+        self.keys.append(key)
+        self.rows.append((self.f.tell(), len(data), sample_rate, fmt))
+        self.f.write(data)
+
+    def close(self):
+        self.f.close()
+        os.replace(self.shard + ".tmp", self.shard)
+        with open(index_path(self.shard) + ".tmp", "wb") as f:
+            np.savez(f, keys=np.array(self.keys), index=np.array(self.rows, dtype=INDEX_DTYPE))
+        os.replace(index_path(self.shard) + ".tmp", index_path(self.shard))
+
+    def abort(self):
+        """Drop the partly written shard; nothing is published under the final names."""
+        self.f.close()
+        if os.path.exists(self.shard + ".tmp"):
+            os.remove(self.shard + ".tmp")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class PackReader(object):
+    """
+    Memory-mapped `.pack` shard.
+    `read(key)` is random access; iterating yields every clip in file order, which is a
+    single sequential pass over the mapping. PCM clips come back as read-only int16
+    views into the mapping (no copy); encoded clips as a memoryview of their bytes.
+    """
+
+    def __init__(self, shard):
+        self.shard = shard
+        with np.load(index_path(shard)) as npz:
+            self.keys = npz["keys"]
+            self.index = npz["index"]
+        self._positions = None
+        with open(shard, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _advise(self, advice):
+        if hasattr(self.mm, "madvise") and advice is not None:
+            self.mm.madvise(advice)
+
+    def _view(self, row):
+        offset, length, sample_rate, fmt = (int(x) for x in row)
+        if fmt == PCM16:
+            return np.frombuffer(self.mm, dtype="<i2", count=length // 2, offset=offset), sample_rate, fmt
+        return memoryview(self.mm)[offset : offset + length], sample_rate, fmt
+
+    def read(self, key):
+        """Returns (payload, sample_rate, format) for one clip."""
+        if self._positions is None:
+            self._advise(getattr(mmap, "MADV_RANDOM", None))
+            self._positions = {str(k): i for i, k in enumerate(self.keys)}
+        try:
+            return self._view(self.index[self._positions[key]])
+        except KeyError:
+            raise FileNotFoundError(f"{key} not found in {self.shard}")
+
+    def __iter__(self):
+        """Yields (key, payload, sample_rate, format) in file order."""
+        self._advise(getattr(mmap, "MADV_SEQUENTIAL", None))
+        for key, row in zip(self.keys, self.index):
+            yield (str(key),) + self._view(row)
+
+
+_readers = {}
+
+
+def open_pack(shard):
+    """Shared reader per shard and process."""
+    reader = _readers.get(shard)
+    if reader is None:
+        reader = _readers[shard] = PackReader(shard)
+    return reader
+
+
+def read_pack_uri(uri):
+    shard, key = parse_pack_uri(uri)
+    return open_pack(shard).read(key)
@@ -0,0 +1,137 @@
+import hashlib
+import http.client
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from staging_cache import LRUStore
+
+MAX_REDIRECTS = 5
+
+
+class HTTPPool(object):
+    """
+    Keep-alive HTTP(S) connections, one per (scheme, host) and thread, reused across
+    requests; redirects are followed, and a request that fails on its connection is
+    retried once on a new one.
+    """
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self, scheme, netloc):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conns[(scheme, netloc)] = conn_class(netloc, timeout=self.timeout)
+        return conn
+
+    def _drop(self, scheme, netloc):
+        conn = self._local.conns.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def _request(self, url, headers):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        for attempt in range(2):
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                # drain the body so the connection can be reused
+                return response.status, response.getheader, response.read()
+            except (http.client.HTTPException, OSError):
+                # whatever failed (idle disconnect, timeout mid-response, ...) leaves the
+                # connection in an unknown state: drop it, the retry opens a fresh one
+                self._drop(parts.scheme, parts.netloc)
+                if attempt:
+                    raise
+
+    def fetch(self, url, byte_range=None):
+        """GET `url`, following redirects. Returns (status, body, total_size)."""
+        headers = {}
+        if byte_range is not None:
+            headers["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        for _ in range(MAX_REDIRECTS + 1):
+            status, getheader, body = self._request(url, headers)
+            if status in (301, 302, 303, 307, 308):
+                url = urljoin(url, getheader("Location"))
+                continue
+            total_size = None
+            if status == 206:
+                total = (getheader("Content-Range") or "").rpartition("/")[2]
+                total_size = int(total) if total.isdigit() else None
+            elif status == 200:
+                total_size = len(body)
+            return status, body, total_size
+        raise IOError(f"Too many redirects: {url}")
+
+
+class RemoteAudio(object):
+    """
+    Encoded bytes of remote clips, fetched over an HTTPPool and, when `cache_dir` is
+    set, kept in a size-capped LRU store addressed by the sha1 of the url (hub files
+    are immutable, so a url always names the same content).
+    """
+
+    def __init__(self, cache_dir=None, max_gb=20, timeout=60):
+        self.pool = HTTPPool(timeout=timeout)
+        self.store = LRUStore(cache_dir, int(max_gb * (1 << 30))) if cache_dir else None
+
+    def read(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        if self.store is not None:
+            data = self.store.get(key)
+            if data is not None:
+                return data
+        status, data, _ = self.pool.fetch(url)
+        if status == 404:
+            raise FileNotFoundError(f"Audio not found: {url}")
+        if status != 200:
+            raise IOError(f"HTTP {status} for {url}")
+        if self.store is not None:
+            self.store.put(key, data)
+        return data
+
+
+class Prefetcher(object):
+    """
+    Fetch the next `depth` urls of a manifest in background threads while the current
+    one is being decoded. `read(url)` expects urls in manifest order; urls the caller
+    skipped are dropped from the queue and urls it never announced are fetched directly.
+    """
+
+    def __init__(self, remote, urls, depth=8, num_threads=4):
+        self.remote = remote
+        self.urls = iter(urls)
+        self.depth = depth
+        self.executor = ThreadPoolExecutor(max_workers=num_threads)
+        self.queue = deque()
+
+    def _fill(self):
+        while len(self.queue) < self.depth:
+            url = next(self.urls, None)
+            if url is None:
+                return
+            self.queue.append((url, self.executor.submit(self.remote.read, url)))
+
+    def read(self, url):
+        self._fill()
+        if any(queued == url for queued, _ in self.queue):
+            while True:
+                queued, future = self.queue.popleft()
+                if queued == url:
+                    self._fill()
+                    return future.result()
+        return self.remote.read(url)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+import numpy as np
+
+from packed_audio import float_to_pcm16
+
+
+class LRUStore(object):
+    """
+    Size-capped, content-addressed blob store on a local disk.
+    Blobs live under `<root>/objects/ab/abcdef...`, bookkeeping in `<root>/index.sqlite`.
+    Safe to share between processes (DataLoader workers, several trainings): blobs are
+    written to a temporary name and renamed into place, and the index is a WAL sqlite
+    database, so every put / evict is one transaction. Least recently used blobs are
+    evicted once the total size exceeds `max_bytes`.
+    """
+
+    # a hit refreshes its access time at most this often (seconds), to keep reads read-only
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection().execute(
+                "CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, size INTEGER, atime REAL)"
+            )
+            self._connection().execute("CREATE INDEX IF NOT EXISTS blobs_atime ON blobs (atime)")
+            # running total, so a put does not have to sum the whole table
+            self._connection().execute("CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY, total INTEGER)")
+            self._connection().execute("INSERT OR IGNORE INTO usage VALUES (0, 0)")
+
+    def _connection(self):
+        # connections must not cross a fork; every worker process opens its own
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(
+                os.path.join(self.root, "index.sqlite"), timeout=60, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._pid = os.getpid()
+        return self._conn
+
+    def path(self, key):
+        return os.path.join(self.root, "objects", key[:2], key)
+
+    def get(self, key):
+        """The blob stored under `key`, or None."""
+        try:
+            with open(self.path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "UPDATE blobs SET atime = ? WHERE key = ? AND atime < ?", (now, key, now - self.TOUCH_INTERVAL)
+            )
+        return data
+
+    def put(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        evicted = []
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT size FROM blobs WHERE key = ?", (key,)).fetchone()
+                total = conn.execute("SELECT total FROM usage").fetchone()[0] + len(data) - (row[0] if row else 0)
+                conn.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)", (key, len(data), time.time()))
+                if total > self.max_bytes:
+                    for old_key, size in conn.execute("SELECT key, size FROM blobs WHERE key != ? ORDER BY atime", (key,)):
+                        if total <= self.max_bytes:
+                            break
+                        evicted.append(old_key)
+                        total -= size
+                    conn.executemany("DELETE FROM blobs WHERE key = ?", [(k,) for k in evicted])
+                conn.execute("UPDATE usage SET total = ?", (total,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        for old_key in evicted:
+            try:
+                # readers that already opened the file keep reading it
+                os.remove(self.path(old_key))
+            except FileNotFoundError:
+                pass
+
+
+def pack_pcm(samples, sample_rate):
+    """float waveform in [-1, 1] -> int16 blob with a sample rate header."""
+    return struct.pack("<I", sample_rate) + float_to_pcm16(samples).tobytes()
+
+
+def unpack_pcm(blob):
+    return np.frombuffer(blob, dtype="<i2", offset=4), struct.unpack_from("<I", blob)[0]
+
+
+class StagingCache(object):
+    """
+    Read-through copy of slow-disk audio on a fast local directory.
+    mode "file" keeps the encoded bytes; mode "pcm" keeps decoded int16 PCM so later
+    epochs skip decoding as well. A source is identified by its path, size and mtime
+    (for tar:// members, those of the shard), so replaced files are staged again.
+    """
+
+    def __init__(self, root, max_gb=100, mode="file"):
+        if mode not in ("file", "pcm"):
+            raise ValueError(f"Unknown staging mode: {mode}")
+        self.mode = mode
+        self.store = LRUStore(root, int(max_gb * (1 << 30)))
+
+    def key(self, path):
+        source = path[len("tar://") :].partition(".tar#")[0] + ".tar" if path.startswith("tar://") else path
+        st = os.stat(source)
+        return hashlib.sha1(f"{self.mode}|{path}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8")).hexdigest()
+
+    def lookup(self, path):
+        """(key, staged blob or None); pass the key back to `put` on a miss."""
+        key = self.key(path)
+        return key, self.store.get(key)
+
+    def put(self, key, blob):
+        self.store.put(key, blob)
@@ -0,0 +1,103 @@
+import json
+import os
+import tarfile
+import threading
+
+TAR_SCHEME = "tar://"
+
+
+def parse_tar_uri(uri):
+    """tar:///data/galgame-train-000000.tar#abc.ogg -> ("/data/...000000.tar", "abc.ogg")"""
+    shard, sep, member = uri[len(TAR_SCHEME) :].partition(".tar#")
+    if not sep or not member:
+        raise ValueError(f"Invalid tar uri: {uri}")
+    return shard + ".tar", member
+
+
+def make_tar_uri(shard, member):
+    return f"{TAR_SCHEME}{shard}#{member}"
+
+
+class TarIndex(object):
+    """
+    Member name -> (data offset, size) for one tar shard.
+    The index is built once by walking the tar headers and cached next to the shard
+    as `<shard>.idx.json`; it is rebuilt when the shard's size or mtime changes.
+    """
+
+    def __init__(self, shard):
+        self.shard = shard
+        st = os.stat(shard)
+        self.stamp = [st.st_size, st.st_mtime_ns]
+        self.members = self._load() or self._build()
+
+    @property
+    def index_path(self):
+        return self.shard + ".idx.json"
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get("stamp") != self.stamp:
+            return None
+        return {k: tuple(v) for k, v in cached["members"].items()}
+
+    def _build(self):
+        members = {}
+        with tarfile.open(self.shard, "r:") as tar:
+            for info in tar:
+                if info.isfile():
+                    members[info.name] = (info.offset_data, info.size)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"stamp": self.stamp, "members": members}, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            # read-only dataset mount: keep the index in memory only
+            pass
+        return members
+
+
+class TarReader(object):
+    """
+    Random access to tar members without extraction: one index and one open file
+    descriptor per shard, and each member read is a single pread.
+    Safe to share across threads; after fork every DataLoader worker keeps using the
+    inherited descriptors, which is fine because pread does not move the file offset.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._fds = {}
+        self._lock = threading.Lock()
+
+    def _open(self, shard):
+        with self._lock:
+            if shard not in self._indexes:
+                self._indexes[shard] = TarIndex(shard)
+                self._fds[shard] = os.open(shard, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            return self._indexes[shard], self._fds[shard]
+
+    def read(self, shard, member):
+        index, fd = self._open(shard)
+        try:
+            offset, size = index.members[member]
+        except KeyError:
+            raise FileNotFoundError(f"{member} not found in {shard}")
+        if hasattr(os, "pread"):
+            return os.pread(fd, size, offset)
+        with self._lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            return os.read(fd, size)
+
+
+_tar_reader = TarReader()
+
+
+def read_tar_uri(uri):
+    """Encoded bytes of one tar member."""
+    return _tar_reader.read(*parse_tar_uri(uri))
@@ -0,0 +1,66 @@
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROOT, "tests", "data")
+
+# root modules are imported flat and tools/ scripts as the tools package, as when the
+# scripts are run with `python -m tools.<name>` from the repo root
+sys.path.insert(0, ROOT)
+
+
+# Differential tests of the text normalization rewrites run against frozen copies of the
+# baseline modules: tests/baseline/{cn_tn,format5res,whisper_mix_normalize}.py are
+# `git show 3525671:tools/<module>.py`.
+BASELINE = os.path.join(ROOT, "tests", "baseline")
+TEXT_FILES = [
+    os.path.join(ROOT, "data", "train_text.txt"),
+    os.path.join(ROOT, "data", "val_text.txt"),
+    os.path.join(ROOT, "eval_results", "default", "pretrained_prompt_decode.txt"),
+]
+PRIME, DEGREE = "′", "°"
+
+# numerals, units and symbols the converters rewrite, with the language-class edges of
+# whisper_mix_normalize (U+4E00 / U+9FA5, full-width look-alikes, kana, cyrillic)
+FUZZ_TOKENS = (
+    list("0123456789零一二两三四五六七八九十百千万亿点年月日号时分秒元块角毛") * 3
+    + list("+-=×÷℃㎡‰﹪%％.,:/~'!?，。！？：；、 ") * 2
+    + [PRIME, DEGREE, "一", "龥", "龦", "䷿", "１２", "ａ", "ー", "カナ", "ひら", "Дом", "é"]
+    + ["km", "kg", "cm", "mg", "ml", "GB", "AI", "the", "Mr.", "It's", "OK", "P2P", "4G", "3D", "2022-10-01"]
+    + ["138", "12345678", "13812345678", "0.5", "1/3", "3.14", "50%", "1,000", "¥20", "$5", "10:30", "2020年"]
+)
+
+
+def fuzz_texts(count, seed=44):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FUZZ_TOKENS) for _ in range(rng.randint(0, 20))) for _ in range(count)]
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    from tools.bench_textnorm import load_module
+
+    return {name: load_module(name, BASELINE) for name in ("cn_tn", "format5res")}
+
+
+@pytest.fixture(scope="session")
+def textnorm_inputs():
+    """bench_textnorm's inputs by kind, from the repo's texts and fuzzed ones."""
+    from tools.bench_textnorm import bench_inputs, load_texts
+
+    return bench_inputs(load_texts(TEXT_FILES) + fuzz_texts(3000))
+
+
+def assert_stage_matches_baseline(baseline, inputs, module_name, fn_name, kind, expected=None):
+    """Every input of `kind` gives the baseline's output, or raises the baseline's exception."""
+    from tools.bench_textnorm import call, load_module
+
+    current = getattr(load_module(module_name), fn_name)
+    old = getattr(baseline[module_name], fn_name)
+    assert inputs[kind]
+    for text in inputs[kind]:
+        want = expected(old, text) if expected else call(fn_name, old, text)
+        assert call(fn_name, current, text) == want, text
@@ -0,0 +1,134 @@
+"""
+audio_source.load_audio and its hooks into funasr's training dataset, against a stubbed
+funasr: the stub dataset module loads audio through its module-level
+load_audio_text_image_video, the name audio_source replaces.
+"""
+
+import importlib
+import json
+import sys
+import types
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+DATASETS_SOURCE = '''
+import json
+
+from funasr.utils.load_utils import load_audio_text_image_video
+
+
+class FunASR(object):
+    """jsonl of ChatML rows; items load their audio like funasr's FunASR.__getitem__."""
+
+    def __init__(self, path, **kwargs):
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        self.contents = [{"user": [m["content"] for m in row["messages"] if m["role"] == "user"]} for row in rows]
+
+    def load(self, audio):
+        return load_audio_text_image_video(audio, fs=16000)
+'''
+
+
+class Tables(object):
+    def __init__(self):
+        self.registered = {}
+
+    def register(self, kind, name):
+        def decorator(cls):
+            self.registered[(kind, name)] = cls
+            return cls
+
+        return decorator
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    calls = []
+
+    def load_audio_text_image_video(data, fs=16000, audio_fs=16000, **kwargs):
+        calls.append({"data": data, "fs": fs, "audio_fs": audio_fs})
+        return data
+
+    modules = {name: types.ModuleType(name) for name in (
+        "funasr",
+        "funasr.utils",
+        "funasr.utils.load_utils",
+        "funasr.register",
+        "funasr.datasets",
+        "funasr.datasets.fun_asr_datasets",
+        "funasr.datasets.fun_asr_datasets.datasets",
+    )}
+    modules["funasr.utils.load_utils"].load_audio_text_image_video = load_audio_text_image_video
+    modules["funasr.register"].tables = Tables()
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    datasets = modules["funasr.datasets.fun_asr_datasets.datasets"]
+    exec(DATASETS_SOURCE, datasets.__dict__)
+    modules["funasr.datasets.fun_asr_datasets"].datasets = datasets
+
+    monkeypatch.delitem(sys.modules, "audio_source", raising=False)
+    audio_source = importlib.import_module("audio_source")
+    yield types.SimpleNamespace(
+        audio_source=audio_source, datasets=datasets, tables=modules["funasr.register"].tables, calls=calls
+    )
+    sys.modules.pop("audio_source", None)
+
+
+def write_pack(tmp_path, sample_rate):
+    from packed_audio import PackWriter, make_pack_uri
+
+    shard = str(tmp_path / "a-000000.pack")
+    with PackWriter(shard) as writer:
+        writer.add_pcm("utt1", np.array([0, 16384, -16384], dtype=np.int16), sample_rate)
+    return make_pack_uri(shard, "utt1")
+
+
+def test_arrays_keep_the_callers_audio_fs(stub):
+    samples = np.zeros(8, dtype=np.float32)
+    stub.audio_source.load_audio(samples, fs=16000, audio_fs=8000)
+    assert stub.calls[-1]["data"] is samples and stub.calls[-1]["audio_fs"] == 8000
+
+
+def test_virtual_uris_use_the_decoded_rate(stub, tmp_path):
+    stub.audio_source.load_audio(write_pack(tmp_path, 22050), fs=16000, audio_fs=8000)
+    call = stub.calls[-1]
+    assert call["audio_fs"] == 22050
+    assert torch.equal(call["data"], torch.tensor([0.0, 0.5, -0.5]))
+
+
+def test_training_dataset_loads_through_load_audio(stub, tmp_path):
+    from blocklist import Blocklist
+
+    assert stub.datasets.load_audio_text_image_video is stub.audio_source.load_audio
+    uri = write_pack(tmp_path, 16000)
+    dataset = stub.datasets.FunASR(str(write_manifest(tmp_path, [uri])))
+    assert dataset.load(uri) is stub.calls[-1]["data"]
+    stub.audio_source.set_blocklist(Blocklist([uri]))
+    with pytest.raises(IOError):
+        dataset.load(uri)
+
+
+def write_manifest(tmp_path, audios):
+    path = tmp_path / "train.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for audio in audios:
+            row = {"messages": [{"role": "user", "content": f"语音转写：<|startofspeech|>!{audio}<|endofspeech|>"}]}
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return path
+
+
+def test_index_ds_drops_blocklisted_rows(stub, tmp_path):
+    index_ds = stub.tables.registered[("index_ds_classes", "FunASRNano")]
+    assert index_ds is stub.audio_source.FunASRNanoIndexDS
+    blocklist = tmp_path / "blocklist.txt"
+    blocklist.write_text("/data/bad.wav\n", encoding="utf-8")
+    manifest = write_manifest(tmp_path, ["/data/good.wav", "/data/bad.wav"])
+
+    dataset = index_ds(str(manifest), blocklist=str(blocklist))
+    assert [item["user"][0].count("good.wav") for item in dataset.contents] == [1]
+    with pytest.raises(IOError):
+        stub.audio_source.load_audio("/data/bad.wav")
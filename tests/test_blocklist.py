@@ -0,0 +1,46 @@
+"""Blocklist matching: shard entries block their members, every other entry blocks an utt in every form."""
+
+import pytest
+
+from blocklist import Blocklist
+from tar_audio import make_tar_uri
+
+# the same utterance as a tar member, an extracted file and a packed clip
+FORMS = [make_tar_uri("/data/a.tar", "sub/x.ogg"), "/extracted/x.ogg", "/extracted/x.wav", "pack:///data/p.pack#x"]
+
+
+def test_shard_entry_blocks_its_members():
+    blocklist = Blocklist(["/data/a.tar"])
+    assert "/data/a.tar" in blocklist
+    assert make_tar_uri("/data/a.tar", "x.ogg") in blocklist
+    assert make_tar_uri("/data/b.tar", "x.ogg") not in blocklist
+    # the utts of a shard are unknown until it is read
+    assert "/extracted/x.ogg" not in blocklist
+
+
+@pytest.mark.parametrize("entry", FORMS)
+def test_any_form_of_an_entry_blocks_every_form_of_its_utt(entry):
+    blocklist = Blocklist([entry])
+    for path in FORMS:
+        assert path in blocklist
+    # the same utt in another shard, pack or directory is the same utterance
+    assert make_tar_uri("/data/b.tar", "x.ogg") in blocklist
+    assert "pack:///data/q.pack#x" in blocklist
+    assert "/other/x.flac" in blocklist
+
+
+@pytest.mark.parametrize("entry", FORMS)
+def test_other_utts_are_not_blocked(entry):
+    blocklist = Blocklist([entry])
+    for path in (make_tar_uri("/data/a.tar", "sub/y.ogg"), "/extracted/y.ogg", "pack:///data/p.pack#y", "/data/x.tar"):
+        assert path not in blocklist
+
+
+def test_load(tmp_path):
+    path = tmp_path / "blocklist.txt"
+    path.write_text("/data/a.tar\n\n" + make_tar_uri("/data/b.tar", "x.ogg") + "\n", encoding="utf-8")
+    blocklist = Blocklist.load(str(path))
+    assert len(blocklist) == 2
+    assert make_tar_uri("/data/a.tar", "y.ogg") in blocklist
+    assert make_tar_uri("/data/b.tar", "x.ogg") in blocklist
+    assert "/extracted/x.wav" in blocklist
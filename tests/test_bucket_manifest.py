@@ -0,0 +1,67 @@
+"""bucket_manifest.write_shard: length-ordered shards with packed audio, nothing published on failure."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from packed_audio import PackReader
+from tools.bucket_manifest import scan_lengths, write_shard
+
+
+def chatml_row(audio, speech_length):
+    return {
+        "messages": [
+            {"role": "user", "content": f"语音转写：<|startofspeech|>!{audio}<|endofspeech|>"},
+            {"role": "assistant", "content": "text"},
+        ],
+        "speech_length": speech_length,
+    }
+
+
+def write_manifest(tmp_path, rows):
+    path = tmp_path / "train.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+def make_clip(tmp_path, name, seconds):
+    path = str(tmp_path / name)
+    sf.write(path, np.zeros(int(16000 * seconds), dtype=np.float32), 16000)
+    return path
+
+
+def test_write_shard_packs_in_length_order(tmp_path):
+    long_clip, short_clip = make_clip(tmp_path, "long.wav", 0.2), make_clip(tmp_path, "short.wav", 0.1)
+    manifest = write_manifest(tmp_path, [chatml_row(long_clip, 20), chatml_row(short_clip, 10)])
+    rows = sorted(scan_lengths([manifest]))
+    shard = str(tmp_path / "out" / "bucketed-000000.jsonl")
+    os.makedirs(os.path.dirname(shard))
+
+    result = write_shard([manifest], rows, shard, pack=True, pcm=False)
+    assert result == {"rows": 2, "failed": 0, "errors": []}
+    assert sorted(os.listdir(os.path.dirname(shard))) == [
+        "bucketed-000000.jsonl",
+        "bucketed-000000.pack",
+        "bucketed-000000.pack.idx.npz",
+    ]
+    with open(shard, "r", encoding="utf-8") as f:
+        lengths = [json.loads(line)["speech_length"] for line in f]
+    assert lengths == [10, 20]
+    assert [key for key, *_ in PackReader(shard[: -len(".jsonl")] + ".pack")] == ["short", "long"]
+
+
+def test_failed_shard_publishes_nothing(tmp_path):
+    clip = make_clip(tmp_path, "a.wav", 0.1)
+    # the second row has no messages, which fails after the first clip was packed
+    manifest = write_manifest(tmp_path, [chatml_row(clip, 10), {"speech_length": 20}])
+    shard = str(tmp_path / "out" / "bucketed-000000.jsonl")
+    os.makedirs(os.path.dirname(shard))
+
+    with pytest.raises(KeyError):
+        write_shard([manifest], sorted(scan_lengths([manifest])), shard, pack=True, pcm=False)
+    assert os.listdir(os.path.dirname(shard)) == []
@@ -0,0 +1,73 @@
+"""
+cn_tn against the baseline module (see conftest): each rewritten routine gives the baseline's
+output, or raises the baseline's exception, on the repo's texts, on fuzzed input and on
+hand-picked cases for the rules it short-circuits.
+"""
+
+import itertools
+import random
+
+import pytest
+
+from conftest import assert_stage_matches_baseline
+from tools import cn_tn
+from tools.bench_textnorm import call
+
+# the frozen copies keep their old regex literals
+pytestmark = pytest.mark.filterwarnings("ignore:invalid escape sequence")
+
+NSW_CASES = [
+    "",
+    "没有数字的句子",
+    "2020年10月1日开会",
+    "98年3月号",
+    "花了12.5元又3块5",
+    "一共3千多万",
+    "打13812345678或者+86 13912345678",
+    # the phone rule matches the second run but rewrites the first occurrence of it
+    "9913812345678 13812345678",
+    "座机010-12345678转分机",
+    "占1/3，涨了50%",
+    "P2P和B2C",
+    "3个人吃了1234567个饺子",
+    "0.5和3.14",
+]
+
+
+def test_normalize_nsw_matches_baseline(baseline, textnorm_inputs):
+    inputs = dict(textnorm_inputs, cases=NSW_CASES)
+    for kind in ("text", "cases"):
+        assert_stage_matches_baseline(baseline, inputs, "cn_tn", "normalize_nsw", kind)
+
+
+
+@pytest.mark.parametrize("fn_name, kind", [("num2chn", "number"), ("chn2num", "chinese_number")])
+def test_number_converter_matches_baseline(baseline, textnorm_inputs, fn_name, kind):
+    assert_stage_matches_baseline(baseline, textnorm_inputs, "cn_tn", fn_name, kind)
+
+
+def test_number_converters_keep_options_apart(baseline):
+    old = baseline["cn_tn"]
+    numbers = ["0", "10", "12", "102", "1000", "10203.05", "200000000", "0.5", "007", "1234567890123"]
+    # the same number with every option set, interleaved, so a memoized result can never leak
+    # into a call with other options
+    for number in numbers:
+        for numbering_type in cn_tn.NUMBERING_TYPES:
+            for options in itertools.product((False, True), repeat=7):
+                expected = call("num2chn", lambda n: old.num2chn(n, numbering_type, *options), number)
+                assert call("num2chn", lambda n: cn_tn.num2chn(n, numbering_type, *options), number) == expected
+    for numbering_type in cn_tn.NUMBERING_TYPES:
+        for text in ["一万零二", "壹亿零贰万", "兩千", "十", "三点一四", "一兆", "一京零一", "五万万"]:
+            expected = call("chn2num", lambda t: old.chn2num(t, numbering_type), text)
+            assert call("chn2num", lambda t: cn_tn.chn2num(t, numbering_type), text) == expected, text
+
+
+def test_remove_erhua_matches_baseline(baseline, textnorm_inputs):
+    # whitelisted words that overlap, nest or run into each other, with stray 儿 between them
+    words = cn_tn.ER_WHITELIST.strip("()").split("|")
+    rng = random.Random(44)
+    pieces = words + ["儿", "儿", "儿", "那边", "女", "子", "新生", "托", "a", " "]
+    fuzzed = ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 12))) for _ in range(3000)]
+    inputs = dict(textnorm_inputs, erhua=fuzzed + ["他女儿在那边儿", "儿儿女儿子", "新生儿童", "托儿所儿"])
+    for kind in ("text", "erhua"):
+        assert_stage_matches_baseline(baseline, inputs, "cn_tn", "remove_erhua", kind)
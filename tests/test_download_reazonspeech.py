@@ -0,0 +1,62 @@
+"""Resume bookkeeping of download_reazonspeech after a crash mid-write."""
+
+import json
+
+from tools.download_reazonspeech import drop_torn_line, read_utts, trim_manifest
+
+
+def jsonl_line(utt):
+    return json.dumps({"audio": f"/out/{utt}.flac", "transcription": "テスト", "utt_id": utt}, ensure_ascii=False) + "\n"
+
+
+def test_resume_after_torn_writes(tmp_path):
+    scp, text, jsonl = tmp_path / "train.scp", tmp_path / "train.txt", tmp_path / "train.jsonl"
+    # utt1 and utt2 committed; the crash hit while utt3's lines were being written, one of
+    # them torn inside a multi-byte character
+    text.write_bytes("utt1\tテスト\nutt2\tテスト\nutt3\tテスト".encode("utf-8")[:-1])
+    torn = jsonl_line("utt3").encode("utf-8")[:-9]
+    jsonl.write_bytes((jsonl_line("utt1") + jsonl_line("utt2")).encode("utf-8") + torn)
+    scp.write_text("utt1\t/out/utt1.flac\nutt2\t/out/utt2.flac\nutt3\t/out/ut", encoding="utf-8")
+
+    drop_torn_line(scp)
+    done = read_utts(scp)
+    assert done == {"utt1", "utt2"}
+    assert scp.read_text(encoding="utf-8") == "utt1\t/out/utt1.flac\nutt2\t/out/utt2.flac\n"
+
+    trim_manifest(text, done, lambda line: line.split("\t", 1)[0])
+    trim_manifest(jsonl, done, lambda line: json.loads(line)["utt_id"])
+    assert text.read_text(encoding="utf-8") == "utt1\tテスト\nutt2\tテスト\n"
+    assert jsonl.read_text(encoding="utf-8") == jsonl_line("utt1") + jsonl_line("utt2")
+
+
+def test_drop_torn_line_edges(tmp_path):
+    path = tmp_path / "a.scp"
+    path.write_bytes(b"")
+    drop_torn_line(path)
+    assert path.read_bytes() == b""
+    path.write_bytes(b"no newline at all")
+    drop_torn_line(path)
+    assert path.read_bytes() == b""
+    complete = b"x\t" + b"y" * 100000 + b"\n"
+    path.write_bytes(complete + b"z" * 70000)
+    drop_torn_line(path)
+    assert path.read_bytes() == complete
+    drop_torn_line(tmp_path / "missing.scp")
+
+
+def test_trim_manifest_cuts_in_place(tmp_path):
+    path = tmp_path / "train.txt"
+    committed = "".join(f"utt{i}\tテスト\n" for i in range(5000))
+    path.write_text(committed + "utt5000\tテスト\n", encoding="utf-8")
+    inode = path.stat().st_ino
+    key = lambda line: line.split("\t", 1)[0]
+    done = {f"utt{i}" for i in range(5000)}
+
+    trim_manifest(path, done, key)
+    assert path.read_text(encoding="utf-8") == committed
+    assert path.stat().st_ino == inode
+    # nothing to drop: the file is left alone
+    mtime = path.stat().st_mtime_ns
+    trim_manifest(path, done, key)
+    assert path.stat().st_mtime_ns == mtime
+    trim_manifest(tmp_path / "missing.txt", done, key)
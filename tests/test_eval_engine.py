@@ -0,0 +1,62 @@
+"""StratifiedCER and the approximate-eval stopping rule, on synthetic heavy-tailed CER data."""
+
+from collections import Counter
+from itertools import islice
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from tools.eval_engine import StratifiedCER, quantile_bins, sample_until_narrow, stratified_order
+
+
+def population(size, hallucinated=0.02, seed=1):
+    """(lengths, errors) of a test set where a share of the utterances hallucinate 3x their length."""
+    rng = np.random.default_rng(seed)
+    lengths = 5 + rng.poisson(20, size)
+    errors = rng.binomial(lengths, rng.beta(1, 8, size))
+    errors = np.where(rng.random(size) < hallucinated, errors + 3 * lengths, errors)
+    return lengths.tolist(), errors.tolist()
+
+
+def coverage(lengths, errors, seeds, stop):
+    """Share of `seeds` sampling orders whose interval covers the exact CER, and the sizes used."""
+    exact = sum(errors) / sum(lengths)
+    strata = quantile_bins(lengths, 4)
+    covered, used = 0, []
+    for seed in range(seeds):
+        order = stratified_order(list(range(len(lengths))), strata, seed)
+        sample = StratifiedCER(Counter(strata))
+        low, high = stop(sample, ((strata[i], errors[i], lengths[i]) for i in order))
+        covered += low <= exact <= high
+        used.append(sample.n)
+    return covered / seeds, used
+
+
+def test_interval_closes_on_the_whole_set():
+    lengths, errors = population(300)
+    strata = quantile_bins(lengths, 4)
+    sample = StratifiedCER(Counter(strata))
+    for stratum, e, l in zip(strata, errors, lengths):
+        sample.add(stratum, e, l)
+    low, high = sample.interval()
+    assert low == pytest.approx(sum(errors) / sum(lengths))
+    assert high == pytest.approx(sum(errors) / sum(lengths))
+
+
+@pytest.mark.parametrize("hallucinated", [0.0, 0.02])
+def test_fixed_size_sample_reaches_nominal_coverage(hallucinated):
+    lengths, errors = population(2000, hallucinated)
+    # no stop on the width: the first 300 utterances, as many as the first stop check sees
+    rate, _ = coverage(lengths, errors, 200, lambda sample, scored: sample_until_narrow(sample, islice(scored, 300), 0))
+    assert rate >= 0.92
+
+
+def test_stopping_rule_coverage():
+    lengths, errors = population(1000)
+    rate, used = coverage(lengths, errors, 200, lambda sample, scored: sample_until_narrow(sample, scored, 4))
+    # the stop has to come early enough to be worth it; stopping on the width picks the
+    # samples that have met few hallucinations, so the interval holds a little less often
+    # than nominal 95%
+    assert max(used) < len(lengths)
+    assert rate >= 0.90
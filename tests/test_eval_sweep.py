@@ -0,0 +1,113 @@
+"""CheckpointSweep weight swapping on a toy model (CPU): a swap back to base decodes like a fresh base."""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from tools.eval_sweep import CheckpointSweep, load_state_dict
+
+LINES = [f"utt{i} clip{i}.wav" for i in range(4)]
+
+
+class ToyModel(torch.nn.Module):
+    """The prepare_speech / embed_inputs / generate_text split of model.py, on three linear layers."""
+
+    def __init__(self):
+        super().__init__()
+        torch.manual_seed(0)
+        self.audio_encoder = torch.nn.Linear(4, 4)
+        self.audio_adaptor = torch.nn.Linear(4, 4)
+        self.llm = torch.nn.Linear(4, 2)
+        self.prepared = 0
+
+    def chat_inputs(self, data_in, **kwargs):
+        return data_in
+
+    def prepare_speech(self, data_in, **kwargs):
+        self.prepared += 1
+        speech = torch.tensor([[ord(c) / 100 for c in data_in[0][3:7]]])
+        encoder_out = self.audio_adaptor(self.audio_encoder(speech))
+        return [{"audio": data_in[0]}], {"speech": speech}, encoder_out, torch.tensor([1]), {}
+
+    def embed_inputs(self, batch, encoder_out, encoder_out_lens, **kwargs):
+        return encoder_out, None
+
+    def generate_text(self, inputs_embeds, contents, batch, source_ids, key, **kwargs):
+        return [{"key": key[0], "text": " ".join(f"{v:.4f}" for v in self.llm(inputs_embeds)[0].tolist())}]
+
+
+def shifted(model, prefixes):
+    return {
+        name: tensor + 1 if name.startswith(prefixes) else tensor.clone()
+        for name, tensor in model.state_dict().items()
+    }
+
+
+def test_swap_back_to_base_matches_fresh_base():
+    fresh = list(CheckpointSweep(ToyModel(), {"device": "cpu"}).decode(LINES))
+
+    model = ToyModel()
+    sweep = CheckpointSweep(model, {"device": "cpu"})
+    sweep.snapshot_base()
+    list(sweep.decode(LINES))
+    # a checkpoint that also finetuned the audio encoder
+    assert sweep.load(shifted(model, ("audio_encoder.", "llm."))) == 4
+    assert list(sweep.decode(LINES)) != fresh
+    assert sweep.load(sweep.base_state) == 4
+    assert list(sweep.decode(LINES)) == fresh
+
+
+def test_llm_only_checkpoint_reuses_cached_features():
+    model = ToyModel()
+    sweep = CheckpointSweep(model, {"device": "cpu"})
+    list(sweep.decode(LINES))
+    assert model.prepared == len(LINES)
+    sweep.load(shifted(model, ("llm.",)))
+    list(sweep.decode(LINES))
+    assert model.prepared == len(LINES)
+    sweep.load(shifted(model, ("audio_adaptor.",)))
+    list(sweep.decode(LINES))
+    assert model.prepared == 2 * len(LINES)
+
+
+def test_load_state_dict_unwraps_training_checkpoints(tmp_path):
+    path = tmp_path / "model.pt"
+    torch.save({"state_dict": {"module.llm.weight": torch.ones(2)}, "epoch": 3}, path)
+    state = load_state_dict(str(path))
+    assert list(state) == ["llm.weight"]
+    assert torch.equal(state["llm.weight"], torch.ones(2))
+
+
+def test_unchanged_tensors_are_compared_on_the_host(monkeypatch):
+    model = ToyModel()
+    sweep = CheckpointSweep(model, {"device": "cpu"})
+    sweep.snapshot_base()
+    state = shifted(model, ("llm.",))
+    moved = []
+    to = torch.Tensor.to
+    monkeypatch.setattr(torch.Tensor, "to", lambda self, *args, **kwargs: moved.append(args) or to(self, *args, **kwargs))
+    # only the two llm tensors are copied; nothing is moved to compare the other four
+    assert sweep.load(state) == 2
+    assert moved == []
+    assert sweep.load(state) == 0
+    assert all(torch.equal(model.state_dict()[name], tensor) for name, tensor in state.items())
+
+
+def test_vad_pipeline_decodes_like_decode_py():
+    # decode.decode_lines reads clips through audio_source
+    pytest.importorskip("funasr")
+    model = ToyModel()
+    calls = []
+
+    class Pipeline:
+        def generate(self, input, cache, batch_size, **kwargs):
+            calls.append((input[0], kwargs))
+            return [{"text": f"{model.llm.bias[0].item():.4f}"}]
+
+    sweep = CheckpointSweep(model, {"device": "cpu"}, prompt="p:", pipeline=Pipeline())
+    first = list(sweep.decode(LINES))
+    sweep.load(shifted(model, ("llm.",)))
+    assert list(sweep.decode(LINES)) != first
+    assert calls[0] == ("clip0.wav", {"prompt": "p:"})
+    # nothing bypasses the pipeline, so nothing is cached
+    assert model.prepared == 0 and not sweep.features
@@ -0,0 +1,120 @@
+"""HTTPDurationProber against a local server: Range probes, servers that ignore Range, redirects, 404."""
+
+import http.server
+import io
+import re
+import threading
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from tools.http_probe import HTTPDurationProber
+
+SAMPLE_RATE = 16000
+HEADER_BYTES = 1024
+
+
+def encode(fmt, seconds, **kwargs):
+    buf = io.BytesIO()
+    noise = np.random.default_rng(0).uniform(-0.5, 0.5, int(SAMPLE_RATE * seconds))
+    sf.write(buf, noise, SAMPLE_RATE, format=fmt, **kwargs)
+    return buf.getvalue()
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        byte_range = self.headers.get("Range")
+        self.server.requests.append((self.path, byte_range))
+        if self.path.startswith("/redirect/"):
+            self.send_response(302)
+            self.send_header("Location", self.path[len("/redirect") :])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.server.files.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", byte_range or "")
+        if match and self.path not in self.server.ignore_range:
+            start, end = int(match.group(1)), min(int(match.group(2)), len(body) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+            body = body[start : end + 1]
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.server.sent += len(body)
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    httpd.requests = []
+    httpd.sent = 0
+    httpd.ignore_range = set()
+    httpd.files = {
+        "/clip.wav": encode("WAV", 2.5, subtype="PCM_16"),
+        "/clip.flac": encode("FLAC", 1.75),
+    }
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+@pytest.mark.parametrize("path, seconds", [("/clip.wav", 2.5), ("/clip.flac", 1.75)])
+def test_range_probe_reads_the_header_only(server, path, seconds):
+    prober = HTTPDurationProber(header_bytes=HEADER_BYTES, timeout=5)
+    assert prober.duration(url(server, path)) == pytest.approx(seconds)
+    assert server.requests == [(path, f"bytes=0-{HEADER_BYTES - 1}")]
+    assert server.sent == HEADER_BYTES < len(server.files[path])
+
+
+def test_server_ignoring_range_falls_back_to_the_full_body(server):
+    server.ignore_range.add("/clip.flac")
+    prober = HTTPDurationProber(header_bytes=HEADER_BYTES, timeout=5)
+    assert prober.duration(url(server, "/clip.flac")) == pytest.approx(1.75)
+    assert len(server.requests) == 1
+    assert server.sent == len(server.files["/clip.flac"])
+
+
+def test_header_without_length_refetches_the_whole_file(server):
+    if "OGG" not in sf.available_formats():
+        pytest.skip("libsndfile without ogg")
+    server.files["/clip.ogg"] = encode("OGG", 3.0, subtype="VORBIS")
+    assert len(server.files["/clip.ogg"]) > HEADER_BYTES
+    prober = HTTPDurationProber(header_bytes=HEADER_BYTES, timeout=5)
+    assert prober.duration(url(server, "/clip.ogg")) == pytest.approx(3.0)
+    assert server.requests == [("/clip.ogg", f"bytes=0-{HEADER_BYTES - 1}"), ("/clip.ogg", None)]
+
+
+def test_redirect_keeps_the_range(server):
+    prober = HTTPDurationProber(header_bytes=HEADER_BYTES, timeout=5)
+    assert prober.duration(url(server, "/redirect/clip.wav")) == pytest.approx(2.5)
+    assert [path for path, _ in server.requests] == ["/redirect/clip.wav", "/clip.wav"]
+    assert server.requests[1][1] == f"bytes=0-{HEADER_BYTES - 1}"
+
+
+def test_missing_file_is_an_error(server):
+    prober = HTTPDurationProber(header_bytes=HEADER_BYTES, timeout=5)
+    with pytest.raises(FileNotFoundError):
+        prober.duration(url(server, "/missing.wav"))
+    with pytest.raises(FileNotFoundError):
+        prober.duration(url(server, "/redirect/missing.wav"))
@@ -0,0 +1,98 @@
+"""
+Lazy-import boundaries of the entry points: each module is imported in a fresh interpreter
+under `python -X importtime`, and the modules its import pulled in are checked against the
+heavy dependencies it must only load on use. Entry points whose dependencies are not
+installed are skipped. Run with `-s` to see the import times.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+# (module, modules imported first, modules the module itself must not pull in at import).
+# Preloaded modules are the unavoidable base (e.g. funasr for model.py), so whatever they
+# import is not charged to the entry point.
+ENTRY_POINTS = [
+    ("tools.whisper_mix_normalize", (), ("pyopenjtalk", "zhconv", "whisper_normalizer")),
+    ("tools.wer_scorer", (), ("numpy", "torch")),
+    ("tools.eval_engine", (), ("torch", "funasr", "numpy", "soundfile", "pyopenjtalk", "zhconv", "whisper_normalizer")),
+    ("tools.eval_model", (), ("torch", "funasr", "pyopenjtalk", "zhconv", "whisper_normalizer")),
+    ("tools.scp2jsonl", (), ("modelscope",)),
+    ("decode", (), ("torch", "funasr")),
+    ("demo", (), ("torch", "funasr")),
+    ("asr_daemon", (), ("torch", "funasr", "hydra")),
+    (
+        "model",
+        ("torch", "funasr"),
+        ("transformers", "audio_source", "block_sampler", "remote_audio", "staging_cache", "soundfile"),
+    ),
+]
+
+
+def parse_importtime(stderr):
+    """[(depth, name, self_us, cumulative_us)] from -X importtime output, in print order."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(fields[0]), int(fields[1])))
+    return entries
+
+
+def subtree(entries, module):
+    """(cumulative_us, [(depth, name, self_us, cumulative_us)] of its imports) for a top-level import."""
+    # children are printed before their parent, with a deeper indentation
+    for i, (depth, name, _, cumulative) in enumerate(entries):
+        if depth == 0 and name == module:
+            start = i
+            while start > 0 and entries[start - 1][0] > 0:
+                start -= 1
+            return cumulative, entries[start:i]
+    return None, []
+
+
+def measure(module, preload):
+    code = "".join(f"import {name}; " for name in preload) + f"import {module}"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        missing = [line for line in proc.stderr.splitlines() if "ModuleNotFoundError" in line]
+        pytest.skip(missing[-1] if missing else proc.stderr.strip().splitlines()[-1])
+    return subtree(parse_importtime(proc.stderr), module)
+
+
+def test_subtree_parsing():
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 | base",
+            "import time:        30 |         30 |     leaf",
+            "import time:        20 |         50 |   child",
+            "import time:        10 |         60 | target",
+        ]
+    )
+    cumulative, children = subtree(parse_importtime(stderr), "target")
+    assert cumulative == 60
+    assert [(depth, name) for depth, name, _, _ in children] == [(2, "leaf"), (1, "child")]
+
+
+@pytest.mark.parametrize("module, preload, forbidden", ENTRY_POINTS, ids=[entry[0] for entry in ENTRY_POINTS])
+def test_entry_point_imports_lazily(module, preload, forbidden):
+    cumulative, children = measure(module, preload)
+    assert cumulative is not None, f"{module} was already imported by {preload}"
+    heaviest = sorted((c for c in children if c[0] == 1), key=lambda c: -c[3])[:3]
+    print(f"{module}: {cumulative / 1000:.1f} ms, " + ", ".join(f"{n} {c / 1000:.1f}" for _, n, _, c in heaviest))
+    names = [name for _, name, _, _ in children]
+    eager = [f for f in forbidden if any(name == f or name.startswith(f + ".") for name in names)]
+    assert not eager, f"{module} imports {', '.join(eager)} at import time"
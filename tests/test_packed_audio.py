@@ -0,0 +1,69 @@
+"""PackWriter / PackReader round trip, the int16 sample scale, and nothing published when packing fails."""
+
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from packed_audio import (
+    ENCODED,
+    PCM16,
+    PackReader,
+    PackWriter,
+    float_to_pcm16,
+    index_path,
+    make_pack_uri,
+    parse_pack_uri,
+    pcm16_to_float,
+)
+from staging_cache import pack_pcm, unpack_pcm
+
+
+def test_round_trip(tmp_path):
+    shard = str(tmp_path / "a-000000.pack")
+    samples = np.array([0, 1, -1, 32767, -32768], dtype=np.int16)
+    with PackWriter(shard) as writer:
+        writer.add_encoded("x", b"OggS-bytes", 16000)
+        writer.add_pcm("y", samples, 16000)
+    assert sorted(os.listdir(tmp_path)) == ["a-000000.pack", "a-000000.pack.idx.npz"]
+
+    reader = PackReader(shard)
+    data, sample_rate, fmt = reader.read("x")
+    assert (bytes(data), sample_rate, fmt) == (b"OggS-bytes", 16000, ENCODED)
+    data, sample_rate, fmt = reader.read("y")
+    assert np.array_equal(data, samples) and (sample_rate, fmt) == (16000, PCM16)
+    assert [key for key, *_ in reader] == ["x", "y"]
+    assert parse_pack_uri(make_pack_uri(shard, "y")) == (shard, "y")
+
+
+def test_failed_packing_publishes_nothing(tmp_path):
+    shard = str(tmp_path / "a-000000.pack")
+    with pytest.raises(RuntimeError):
+        with PackWriter(shard) as writer:
+            writer.add_encoded("x", b"data", 16000)
+            raise RuntimeError("source clip unreadable")
+    assert not os.path.exists(shard)
+    assert not os.path.exists(index_path(shard))
+    assert os.listdir(tmp_path) == []
+
+
+def test_decoded_16_bit_audio_round_trips_exactly(tmp_path):
+    pcm = np.array([0, 1, -1, 12345, -12345, 32767, -32768], dtype=np.int16)
+    sf.write(str(tmp_path / "a.wav"), pcm, 16000, subtype="PCM_16")
+    samples, _ = sf.read(str(tmp_path / "a.wav"), dtype="float32")
+
+    shard = str(tmp_path / "a-000000.pack")
+    with PackWriter(shard) as writer:
+        writer.add_pcm("a", samples, 16000)
+    data, _, _ = PackReader(shard).read("a")
+    assert np.array_equal(data, pcm)
+    assert np.array_equal(pcm16_to_float(data), samples)
+
+    staged, sample_rate = unpack_pcm(pack_pcm(samples, 16000))
+    assert sample_rate == 16000
+    assert np.array_equal(staged, pcm)
+
+
+def test_float_to_pcm16_clips_to_the_int16_range():
+    assert float_to_pcm16([1.0, -1.0, 2.0, -2.0, 0.5]).tolist() == [32767, -32768, 32767, -32768, 16384]
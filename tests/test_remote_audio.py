@@ -0,0 +1,82 @@
+"""HTTPPool keep-alive reuse and recovery from connections that fail mid-response."""
+
+import http.server
+import threading
+import time
+
+import pytest
+
+from remote_audio import HTTPPool
+
+BODY = b"x" * 1000
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/ok")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        if self.server.stalls.get(self.path, 0) > 0:
+            # half the body, then silence past the client's timeout
+            self.server.stalls[self.path] -= 1
+            self.wfile.write(BODY[: len(BODY) // 2])
+            self.wfile.flush()
+            time.sleep(0.5)
+            self.close_connection = True
+            return
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    httpd.requests = []
+    httpd.stalls = {}
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_redirect_and_reuse(server):
+    pool = HTTPPool(timeout=5)
+    assert pool.fetch(url(server, "/redirect")) == (200, BODY, len(BODY))
+    conn = pool._local.conns[("http", f"127.0.0.1:{server.server_address[1]}")]
+    assert pool.fetch(url(server, "/ok"))[1] == BODY
+    assert pool._local.conns[("http", f"127.0.0.1:{server.server_address[1]}")] is conn
+    assert server.requests == ["/redirect", "/ok", "/ok"]
+
+
+def test_timeout_mid_response_is_retried_on_a_new_connection(server):
+    pool = HTTPPool(timeout=0.2)
+    server.stalls["/clip"] = 1
+    assert pool.fetch(url(server, "/clip")) == (200, BODY, len(BODY))
+    assert server.requests == ["/clip", "/clip"]
+    assert pool.fetch(url(server, "/ok"))[1] == BODY
+
+
+def test_failed_retry_does_not_poison_the_pool(server):
+    pool = HTTPPool(timeout=0.2)
+    server.stalls["/clip"] = 2
+    with pytest.raises(OSError):
+        pool.fetch(url(server, "/clip"))
+    # the half-read connection was dropped; the next request on this thread works
+    assert pool.fetch(url(server, "/ok"))[1] == BODY
@@ -0,0 +1,97 @@
+"""scan_to_jsonl end to end on a small shard tree, with a thread pool and a per-character tokenizer."""
+
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+pytest.importorskip("hydra")
+
+from tools import scan_to_jsonl
+from tools.scp2jsonl import speech_length
+
+SAMPLE_RATE = 16000
+
+
+def tokenize(texts, add_special_tokens, return_attention_mask):
+    return {"input_ids": [list(range(len(text))) for text in texts]}
+
+
+def write_clip(path, seconds, text=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sf.write(str(path), np.zeros(int(SAMPLE_RATE * seconds), dtype=np.float32), SAMPLE_RATE)
+    if text is not None:
+        path.with_suffix(".txt").write_text(text, encoding="utf-8")
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    root = tmp_path / "data"
+    for shard in range(3):
+        for i in range(8):
+            write_clip(root / f"{shard:06d}" / f"s{shard}u{i}.wav", 0.5 + i / 10, f"文{i}" * (i + 1))
+    write_clip(root / "000001" / "nested" / "deep.wav", 1.0, "深い")
+    write_clip(root / "000000" / "no_text.wav", 1.0)
+    write_clip(root / "000002" / "empty.wav", 1.0, " \n")
+    (root / "000002" / "no_audio.txt").write_text("音声なし", encoding="utf-8")
+    # a transcript in another shard does not pair
+    (root / "000001" / "no_text.txt").write_text("別の分片", encoding="utf-8")
+    return root
+
+
+def run(monkeypatch, capsys, data_dir, out_dir, *options):
+    monkeypatch.setattr(scan_to_jsonl, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(scan_to_jsonl, "load_tokenizer", lambda: tokenize)
+    argv = ["scan_to_jsonl", str(data_dir), str(out_dir), "--audio_ext", ".wav", "--num_workers", "2", *options]
+    monkeypatch.setattr(sys, "argv", argv)
+    scan_to_jsonl.main()
+    rows = {}
+    for split in ("train", "val"):
+        with open(out_dir / f"{split}_test.jsonl", encoding="utf-8") as f:
+            rows[split] = [json.loads(line) for line in f]
+    return rows, capsys.readouterr().out
+
+
+def audio_path(row):
+    return row["messages"][1]["content"].split("<|startofspeech|>!")[1].split("<|endofspeech|>")[0]
+
+
+def test_pairs_audio_and_text_per_shard(monkeypatch, capsys, data_dir, tmp_path):
+    rows, out = run(monkeypatch, capsys, data_dir, tmp_path / "out", "--name", "test", "--val_ratio", "0.3")
+    all_rows = rows["train"] + rows["val"]
+    assert len(all_rows) == 3 * 8 + 1
+    for row in all_rows:
+        path = audio_path(row)
+        with open(path[: -len(".wav")] + ".txt", encoding="utf-8") as f:
+            assert row["messages"][2]["content"] == f.read().strip()
+        assert row["speech_length"] == speech_length(sf.info(path).duration)
+        assert row["text_length"] == len(row["messages"][2]["content"])
+    # every split follows shard order, and paths are sorted within a shard
+    for split_rows in rows.values():
+        paths = [audio_path(row) for row in split_rows]
+        assert paths == sorted(paths)
+    # the audio without a transcript and the empty transcript, then the two transcripts without audio
+    assert "Missing transcript: 2" in out
+    assert "Transcript without audio: 2" in out
+
+
+def test_split_is_deterministic(monkeypatch, capsys, data_dir, tmp_path):
+    first, _ = run(monkeypatch, capsys, data_dir, tmp_path / "a", "--name", "test", "--val_ratio", "0.3")
+    second, _ = run(monkeypatch, capsys, data_dir, tmp_path / "b", "--name", "test", "--val_ratio", "0.3")
+    assert first == second
+    assert first["train"] and first["val"]
+    for split, split_rows in first.items():
+        for row in split_rows:
+            utt = audio_path(row).rsplit("/", 1)[1][: -len(".wav")]
+            assert scan_to_jsonl.is_val(utt, 0.3) == (split == "val")
+
+
+def test_shard_range(monkeypatch, capsys, data_dir, tmp_path):
+    rows, out = run(
+        monkeypatch, capsys, data_dir, tmp_path / "out", "--name", "test", "--shard_start", "1", "--num_shards", "1"
+    )
+    assert {audio_path(row).split("/")[-2] for row in rows["train"] + rows["val"]} == {"000001", "nested"}
+    assert "Scanned 1 shard directories" in out
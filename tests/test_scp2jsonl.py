@@ -0,0 +1,160 @@
+"""scp2jsonl's bounded, order-preserving chunk pipeline and its incremental ManifestCache."""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+pytest.importorskip("hydra")
+
+from tools.scp2jsonl import DEFAULT_PROMPT, LineProcessor, ManifestCache, attach_cached, ordered_map, text_hash
+
+SAMPLE_RATE = 16000
+
+
+class Tokenizer:
+    """One id per character; records the batches it is called with."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, add_special_tokens, return_attention_mask):
+        self.calls.append(list(texts))
+        return {"input_ids": [list(range(len(text))) for text in texts]}
+
+
+def write_wav(path, seconds):
+    sf.write(str(path), np.zeros(int(SAMPLE_RATE * seconds), dtype=np.float32), SAMPLE_RATE)
+    return str(path)
+
+
+def test_ordered_map_keeps_order_and_bounds_inflight():
+    pulled, done, outstanding, lock = [0], [0], [], threading.Lock()
+
+    def items():
+        for i in range(60):
+            with lock:
+                pulled[0] += 1
+                outstanding.append(pulled[0] - done[0])
+            yield i
+
+    def work(i):
+        # later items often finish first
+        time.sleep(random.Random(i).uniform(0, 0.005))
+        return i * i
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = []
+        for result in ordered_map(executor, work, items(), max_inflight=5):
+            with lock:
+                done[0] += 1
+            results.append(result)
+    assert results == [i * i for i in range(60)]
+    # never more than max_inflight items pulled but not yet handed back
+    assert max(outstanding) == 5
+
+
+def test_ordered_map_pulls_lazily():
+    consumed = []
+
+    def items():
+        for i in range(1000):
+            consumed.append(i)
+            yield i
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = ordered_map(executor, lambda i: i, items(), max_inflight=3)
+        assert next(results) == 0
+        assert len(consumed) == 3
+
+
+def test_process_chunk_keeps_chunk_order(tmp_path):
+    tokenizer = Tokenizer()
+    processor = LineProcessor(tokenizer, prompt="p:")
+    chunk = [
+        ("a", write_wav(tmp_path / "a.wav", 1.0), "一二三", None),
+        ("b", str(tmp_path / "missing.wav"), "四", None),
+        ("c", write_wav(tmp_path / "c.wav", 0.5), None, None),
+        ("d", write_wav(tmp_path / "d.wav", 2.0), "五六", None),
+    ]
+    results = processor.process_chunk(chunk)
+    assert [r.get("utt") for r in results] == ["a", None, None, "d"]
+    assert "WAV not found" in results[1]["error"]
+    assert results[2]["error"] == "No transcript for c"
+    assert [r["success"]["speech_length"] for r in (results[0], results[3])] == [98, 198]
+    assert [r["success"]["text_length"] for r in (results[0], results[3])] == [3, 2]
+    assert results[0]["success"]["messages"][1]["content"] == f"p:<|startofspeech|>!{chunk[0][1]}<|endofspeech|>"
+    # the surviving texts are tokenized in one batch
+    assert tokenizer.calls == [["一二三", "五六"]]
+
+
+def process(processor, cache, chunk):
+    """One round of the main loop: attach cached entries, process, store the new ones."""
+    results = processor.process_chunk(attach_cached(chunk, cache))
+    cache.store([r["cache"] for r in results if "cache" in r])
+    return results
+
+
+def test_cache_reuses_unchanged_rows_and_invalidates_changed_ones(tmp_path):
+    cache = ManifestCache(str(tmp_path / "cache.sqlite"))
+    tokenizer = Tokenizer()
+    processor = LineProcessor(tokenizer)
+    a, b = write_wav(tmp_path / "a.wav", 1.0), write_wav(tmp_path / "b.wav", 1.0)
+    chunk = [("a", a, "一二"), ("b", b, "三四")]
+
+    assert [r.get("cached") for r in process(processor, cache, chunk)] == [None, None]
+    results = process(processor, cache, chunk)
+    assert [r.get("cached") for r in results] == [True, True]
+    assert results[0]["success"]["speech_length"] == 98 and len(tokenizer.calls) == 1
+
+    # a different size (re-extracted audio)
+    write_wav(tmp_path / "a.wav", 2.0)
+    results = process(processor, cache, chunk)
+    assert [r.get("cached") for r in results] == [None, True]
+    assert results[0]["success"]["speech_length"] == 198
+
+    # same size, new mtime
+    st = os.stat(b)
+    os.utime(b, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert [r.get("cached") for r in process(processor, cache, chunk)] == [True, None]
+
+    # an edited transcript
+    chunk[0] = ("a", a, "一二三")
+    results = process(processor, cache, chunk)
+    assert [r.get("cached") for r in results] == [None, True]
+    assert results[0]["success"]["text_length"] == 3
+
+    # another prompt
+    assert [r.get("cached") for r in process(LineProcessor(tokenizer, prompt="x"), cache, chunk)] == [None, None]
+    assert [r.get("cached") for r in process(LineProcessor(tokenizer, prompt="x"), cache, chunk)] == [True, True]
+    cache.close()
+
+
+def test_cache_treats_remote_paths_as_immutable(tmp_path):
+    url = "http://example.invalid/a.wav"
+    cache = ManifestCache(str(tmp_path / "cache.sqlite"))
+    processor = LineProcessor(Tokenizer())
+    processor.prober.duration = lambda wav_path: 1.0
+    entry = processor.process_chunk([("a", url, "一二", None)])[0]["cache"]
+    assert entry == (url, -1, -1, text_hash("一二"), DEFAULT_PROMPT, 1.0, 2)
+
+    process(processor, cache, [("a", url, "一二")])
+    assert cache.lookup([url])[url][:2] == (-1, -1)
+    # nothing to stat, so a remote row is reused as long as the text and prompt match
+    processor.prober.duration = None
+    assert process(processor, cache, [("a", url, "一二")])[0]["cached"] is True
+    cache.close()
+
+
+def test_cache_lookup_batches_many_paths(tmp_path):
+    cache = ManifestCache(str(tmp_path / "cache.sqlite"))
+    entries = [(f"/clips/{i}.wav", i, i, "h", "p", 1.0, 1) for i in range(1234)]
+    cache.store(entries)
+    found = cache.lookup([path for path, *_ in entries] + ["/clips/unknown.wav"])
+    assert len(found) == 1234 and found["/clips/1000.wav"][:2] == (1000, 1000)
+    cache.close()
@@ -0,0 +1,121 @@
+"""tar_to_jsonl end to end on small tar shards, with a thread pool and a per-character tokenizer."""
+
+import io
+import json
+import sys
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+pytest.importorskip("hydra")
+
+from tar_audio import parse_tar_uri, read_tar_uri
+from tools import tar_to_jsonl
+from tools.scp2jsonl import speech_length
+
+SAMPLE_RATE = 16000
+
+
+def tokenize(texts, add_special_tokens, return_attention_mask):
+    return {"input_ids": [list(range(len(text))) for text in texts]}
+
+
+def wav_bytes(seconds):
+    buf = io.BytesIO()
+    sf.write(buf, np.zeros(int(SAMPLE_RATE * seconds), dtype=np.float32), SAMPLE_RATE, format="WAV")
+    return buf.getvalue()
+
+
+def write_tar(path, members):
+    with tarfile.open(path, "w") as tar:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+@pytest.fixture
+def tar_dir(tmp_path):
+    root = tmp_path / "tars"
+    root.mkdir()
+    for shard in range(3):
+        members = []
+        for i in range(8):
+            stem = f"{shard:06d}/s{shard}u{i}"
+            audio, text = (f"{stem}.wav", wav_bytes(0.5 + i / 10)), (f"{stem}.txt", (f"文{i}" * (i + 1)).encode())
+            # the transcript comes first in every other pair
+            members += [audio, text] if i % 2 else [text, audio]
+        if shard == 0:
+            members += [("000000/no_text.wav", wav_bytes(1.0)), ("000000/empty.wav", wav_bytes(1.0))]
+            members += [("000000/empty.txt", b" \n"), ("000000/no_audio.txt", "音声なし".encode())]
+        if shard == 1:
+            # same stem as an unpaired audio of shard 0: members never pair across shards
+            members += [("000000/no_text.txt", "別の分片".encode()), ("000001/notes.json", b"{}")]
+        write_tar(root / f"{tar_to_jsonl.TAR_PREFIX}{shard:06d}.tar", members)
+    (root / "unrelated.tar").write_bytes(b"")
+    return root
+
+
+def run(monkeypatch, capsys, tar_dir, out_dir, *options):
+    monkeypatch.setattr(tar_to_jsonl, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(tar_to_jsonl, "load_tokenizer", lambda: tokenize)
+    argv = ["tar_to_jsonl", str(tar_dir), str(out_dir), "--audio_ext", ".wav", "--num_workers", "2", "--name", "test"]
+    monkeypatch.setattr(sys, "argv", argv + list(options))
+    tar_to_jsonl.main()
+    rows = {}
+    for split in ("train", "val"):
+        with open(out_dir / f"{split}_test.jsonl", encoding="utf-8") as f:
+            rows[split] = [json.loads(line) for line in f]
+    return rows, capsys.readouterr().out
+
+
+def audio_uri(row):
+    return row["messages"][1]["content"].split("<|startofspeech|>!")[1].split("<|endofspeech|>")[0]
+
+
+def test_rows_pair_members_and_resolve(monkeypatch, capsys, tar_dir, tmp_path):
+    rows, out = run(monkeypatch, capsys, tar_dir, tmp_path / "out", "--val_ratio", "0.3")
+    all_rows = rows["train"] + rows["val"]
+    assert len(all_rows) == 3 * 8
+    for row in all_rows:
+        shard, member = parse_tar_uri(audio_uri(row))
+        with tarfile.open(shard) as tar:
+            data = tar.extractfile(member).read()
+            text = tar.extractfile(member[: -len(".wav")] + ".txt").read().decode("utf-8")
+        # the written uri reads back the member's bytes, paired with its own transcript
+        assert read_tar_uri(audio_uri(row)) == data
+        assert row["messages"][2]["content"] == text
+        assert row["speech_length"] == speech_length(sf.info(io.BytesIO(data)).duration)
+        assert row["text_length"] == len(text)
+    # rows follow shard order
+    for split_rows in rows.values():
+        shards = [parse_tar_uri(audio_uri(row))[0] for row in split_rows]
+        assert shards == sorted(shards)
+    # shard 0: an audio without transcript and an empty transcript; a transcript without
+    # audio in shards 0 and 1
+    assert "Missing transcript: 2" in out
+    assert "Transcript without audio: 2" in out
+    assert "Read 3 tar shards" in out
+
+
+def test_split_is_deterministic(monkeypatch, capsys, tar_dir, tmp_path):
+    first, _ = run(monkeypatch, capsys, tar_dir, tmp_path / "a", "--val_ratio", "0.3")
+    second, _ = run(monkeypatch, capsys, tar_dir, tmp_path / "b", "--val_ratio", "0.3")
+    assert first == second
+    assert first["train"] and first["val"]
+    for split, split_rows in first.items():
+        for row in split_rows:
+            utt = parse_tar_uri(audio_uri(row))[1].rsplit("/", 1)[1][: -len(".wav")]
+            assert tar_to_jsonl.is_val(utt, 0.3) == (split == "val")
+
+
+def test_broken_shard_is_reported(monkeypatch, capsys, tar_dir, tmp_path):
+    shard = tar_dir / f"{tar_to_jsonl.TAR_PREFIX}000001.tar"
+    shard.write_bytes(shard.read_bytes()[:5000])
+    rows, out = run(monkeypatch, capsys, tar_dir, tmp_path / "out")
+    assert "Failed: 1" in out
+    assert f"Error reading {shard}" in out
+    assert len(rows["train"] + rows["val"]) >= 2 * 8
@@ -0,0 +1,134 @@
+"""
+wer_scorer against pinned compute-wer 0.2.5 reports.
+
+tests/data/wer/compute_wer_*.txt were written by `PYTHONHASHSEED=0 compute-wer <options> ref.txt
+hyp.txt`. compute-wer lists utterances and clusters in set order, so reports are compared as
+multisets.
+
+eval_results/default/pretrained_prompt_cer.txt is the historical `compute-wer -c -s utt` report
+on pretrained_prompt_ref.txt (the reference side of that eval) and pretrained_prompt_norm.txt,
+from a compute-wer older than 0.2.5. That version broke ties between equal-cost alignments
+differently, so only what does not depend on the tie-break is compared against it: the
+utterances with their N and error count, the overall N and error count, and the SER line.
+"""
+
+import os
+import random
+import re
+import subprocess
+import sys
+
+import pytest
+
+from conftest import DATA, ROOT
+from tools.wer_scorer import SEPARATOR, WERScorer, score_files
+
+WER_DATA = os.path.join(DATA, "wer")
+EVAL_DIR = os.path.join(ROOT, "eval_results", "default")
+
+
+def parse_report(text):
+    """(sorted utterance blocks, overall line, sorted cluster lines, SER line)"""
+    body, _, rest = text.partition(SEPARATOR + "\n")
+    summary = rest.split(SEPARATOR)[0].splitlines()
+    blocks = sorted(block for block in body.split("\n\n") if block.strip())
+    return blocks, summary[0], sorted(summary[1:-1]), summary[-1]
+
+
+def error_counts(line):
+    """(N, Sub + Del + Ins) of a per-utterance or summary line"""
+    n, _, sub, dele, ins = map(int, re.search(r"N=(\d+) Cor=(\d+) Sub=(\d+) Del=(\d+) Ins=(\d+)", line).groups())
+    return n, sub + dele + ins
+
+
+def tie_break_free(text):
+    """The parts of a report that any minimal alignment reproduces."""
+    blocks, overall, _, ser = parse_report(text)
+    utts = sorted((block.splitlines()[0], error_counts(block.splitlines()[1])) for block in blocks)
+    return utts, overall.split(" N=")[0], error_counts(overall), ser
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize(
+    "name, options",
+    [
+        ("word", []),
+        ("char", ["-c"]),
+        ("char_ip_cs", ["-c", "-ip", "-cs"]),
+        ("word_ignore_mw", ["-ig", "ignore.txt", "-mw", "0.5"]),
+        ("word_align_to_hyp", ["--align-to-hyp", "-ip"]),
+    ],
+)
+def test_cli_matches_compute_wer(tmp_path, name, options):
+    out = tmp_path / "report.txt"
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "tools", "wer_scorer.py"), *options, "ref.txt", "hyp.txt", str(out)],
+        cwd=WER_DATA,
+        check=True,
+        capture_output=True,
+    )
+    assert parse_report(read(out)) == parse_report(read(os.path.join(WER_DATA, f"compute_wer_{name}.txt")))
+
+
+def test_repo_eval_report_matches_historical_report(tmp_path):
+    report = score_files(
+        os.path.join(WER_DATA, "pretrained_prompt_ref.txt"),
+        os.path.join(EVAL_DIR, "pretrained_prompt_norm.txt"),
+        to_char=True,
+    )
+    out = tmp_path / "cer.txt"
+    with open(out, "w", encoding="utf-8") as f:
+        report.write(f)
+    assert tie_break_free(read(out)) == tie_break_free(read(os.path.join(EVAL_DIR, "pretrained_prompt_cer.txt")))
+
+
+def test_parallel_report_is_identical(tmp_path):
+    ref, hyp = os.path.join(WER_DATA, "ref.txt"), os.path.join(WER_DATA, "hyp.txt")
+    reports = []
+    for nj in (1, 2):
+        out = tmp_path / f"nj{nj}.txt"
+        with open(out, "w", encoding="utf-8") as f:
+            score_files(ref, hyp, nj=nj, chunk_size=7, to_char=True).write(f)
+        reports.append(read(out))
+    assert reports[0] == reports[1]
+
+
+def test_fuzz_against_compute_wer(monkeypatch):
+    calculator = pytest.importorskip("compute_wer.calculator")
+    # flush often, so the buffered cluster counting is exercised too
+    monkeypatch.setattr(WERScorer, "FLUSH_SIZE", 7)
+    alphabet = list("abcAB ß'.,!?中文字儿五六あいカキ12 3<>x ") + ["<tag>", "  ", "ǅ", "ﬁ", "\x01", "é", "́"]
+    rng = random.Random(45)
+
+    def text():
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 25)))
+
+    for to_char in (True, False):
+        for ignore_punctuation in (False, True):
+            for case_sensitive in (False, True):
+                for max_wer in (sys.maxsize, 0.5):
+                    options = dict(
+                        to_char=to_char,
+                        case_sensitive=case_sensitive,
+                        remove_tag=True,
+                        ignore_words={"A", "中"} if rng.random() < 0.5 else set(),
+                        ignore_punctuation=ignore_punctuation,
+                        max_wer=max_wer,
+                    )
+                    expected, scorer = calculator.Calculator(**options), WERScorer(**options)
+                    for _ in range(300):
+                        ref = text()
+                        hyp = ref if rng.random() < 0.3 else text()
+                        a, b = expected.calculate(ref, hyp), scorer.score(ref, hyp)
+                        assert (a.equal, a.replace, a.delete, a.insert) == b.counts.as_tuple(), (ref, hyp)
+                        assert (a.reference, a.hypothesis) == (b.ref_aligned, b.hyp_aligned), (ref, hyp)
+                    overall, clusters = expected.overall()
+                    assert (str(overall), {k: str(v) for k, v in clusters.items()}) == (
+                        str(scorer.overall()[0]),
+                        {k: str(v) for k, v in scorer.overall()[1].items()},
+                    )
+                    assert (expected.ser.cor, expected.ser.err) == (scorer.ser_cor, scorer.ser_err)
@@ -0,0 +1,110 @@
+"""
+whisper_mix_normalize: its token classification and the whole pipeline against the frozen
+baseline modules (see conftest), and its sqlite cache: opt-in, reused across runs, and closed
+on errors.
+"""
+
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+from conftest import BASELINE, FUZZ_TOKENS, PRIME, ROOT, TEXT_FILES, fuzz_texts
+from tools import whisper_mix_normalize
+from tools.bench_textnorm import load_module
+
+
+def test_cache_is_off_unless_norm_cache_is_set():
+    env = {k: v for k, v in os.environ.items() if k != "NORM_CACHE"}
+    env["PYTHONPATH"] = ROOT
+    code = "import tools.whisper_mix_normalize as m; print(m.DEFAULT_CACHE_FILE)"
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "None"
+
+
+def test_cache_is_reused_and_closed(tmp_path, monkeypatch):
+    src, dst, cache_file = tmp_path / "text.txt", tmp_path / "norm.txt", str(tmp_path / "norm.sqlite")
+    src.write_text("utt1 北京仅新增住宅土地供应10宗。\nutt2 OK, Mr. Smith\n", encoding="utf-8")
+    whisper_mix_normalize.normalize_text(str(src), str(dst), cache_file=cache_file)
+    expected = dst.read_text(encoding="utf-8")
+
+    closed = []
+    close = whisper_mix_normalize.NormCache.close
+    monkeypatch.setattr(whisper_mix_normalize.NormCache, "close", lambda self: closed.append(close(self)))
+    monkeypatch.setattr(whisper_mix_normalize, "normalize_sentence", None)
+    # every line comes from the cache, so the normalizer itself is never called
+    whisper_mix_normalize.normalize_text(str(src), str(dst), cache_file=cache_file)
+    assert dst.read_text(encoding="utf-8") == expected
+    assert len(closed) == 1
+
+    src.write_text("utt3 not cached yet\n", encoding="utf-8")
+    with pytest.raises(TypeError):
+        whisper_mix_normalize.normalize_text(str(src), str(dst), cache_file=cache_file)
+    assert len(closed) == 2
+
+
+def load_baseline_pipeline(monkeypatch, baseline):
+    # the baseline imports pyopenjtalk eagerly but only calls it for kana output
+    if "pyopenjtalk" not in sys.modules:
+        try:
+            import pyopenjtalk  # noqa: F401
+        except ImportError:
+            monkeypatch.setitem(sys.modules, "pyopenjtalk", types.ModuleType("pyopenjtalk"))
+    # and runs on the baseline cn_tn / format5res, so the whole old pipeline is compared
+    monkeypatch.setitem(sys.modules, "cn_tn", baseline["cn_tn"])
+    monkeypatch.setitem(sys.modules, "format5res", baseline["format5res"])
+    return load_module("whisper_mix_normalize", BASELINE)
+
+
+def load_lines(paths):
+    lines = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            lines += [line.rstrip("\n") for line in f]
+    return lines
+
+
+def normalize_both(tmp_path, old, lines, kana):
+    src = tmp_path / "text.txt"
+    src.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+    old.normalize_text(str(src), str(tmp_path / "old.txt"), kana)
+    whisper_mix_normalize.normalize_text(str(src), str(tmp_path / "new.txt"), kana)
+    return (tmp_path / "old.txt").read_text(encoding="utf-8"), (tmp_path / "new.txt").read_text(encoding="utf-8")
+
+
+def baseline_token_language(old, token):
+    if old.is_only_english(token) and not old.is_number(token):
+        return "en"
+    if old.is_only_chinese_and_english(token):
+        return "chn_en"
+    return "not_chn_en"
+
+
+@pytest.mark.filterwarnings("ignore:invalid escape sequence")
+def test_token_language_matches_baseline(monkeypatch, baseline):
+    old = load_baseline_pipeline(monkeypatch, baseline)
+    tokens = {token for line in load_lines(TEXT_FILES) for token in line.split()[1:]}
+    tokens |= {token for text in fuzz_texts(3000) for token in text.split()}
+    tokens |= {token for token in FUZZ_TOKENS if token.strip()}
+    for token in sorted(tokens):
+        assert whisper_mix_normalize.token_language(token) == baseline_token_language(old, token), token
+
+
+@pytest.mark.filterwarnings("ignore:invalid escape sequence")
+def test_pipeline_matches_baseline(tmp_path, monkeypatch, baseline):
+    old = load_baseline_pipeline(monkeypatch, baseline)
+    lines = load_lines(TEXT_FILES)
+    # a prime before any degree sign raises in the baseline (see test_format5res.py)
+    lines += [f"fuzz{i} {text}" for i, text in enumerate(fuzz_texts(500, seed=40)) if PRIME not in text]
+    expected, actual = normalize_both(tmp_path, old, lines, kana=False)
+    assert actual.splitlines() == expected.splitlines()
+
+
+@pytest.mark.filterwarnings("ignore:invalid escape sequence")
+def test_pipeline_matches_baseline_with_kana(tmp_path, monkeypatch, baseline):
+    pytest.importorskip("pyopenjtalk")
+    old = load_baseline_pipeline(monkeypatch, baseline)
+    expected, actual = normalize_both(tmp_path, old, load_lines(TEXT_FILES), kana=True)
+    assert actual.splitlines() == expected.splitlines()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本归一化各环节的耗时基准: 读取解码结果/标注文件 (<key> <text>)，
+逐函数统计处理全部文本 (以及其中出现的数字) 的耗时。
+--baseline_dir 指向旧版本模块所在目录 (例如 git show <rev>:tools/format5res.py > old/format5res.py)
+时同时运行旧实现，报告加速比并检查输出是否完全一致。
+"""
+
+import argparse
+import importlib.util
+import os
+import re
+import time
+
+# (module, function, input): stages of whisper_mix_normalize in pipeline order, then the
+# number converters fed with the numbers found in the texts
+STAGES = [
+    ("cn_tn", "normalize_nsw", "text"),
+    ("format5res", "recoformat", "text"),
+    ("format5res", "numbersingle", "text"),
+    ("format5res", "ch_number2digit", "text"),
+    ("format5res", "special", "text"),
+    ("format5res", "scoreformat", "text"),
+    ("format5res", "all_convert", "text"),
+    ("cn_tn", "remove_erhua", "text"),
+    ("cn_tn", "num2chn", "number"),
+    ("cn_tn", "chn2num", "chinese_number"),
+]
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+CHINESE_NUMBER_PATTERN = re.compile(r"[零一二两三四五六七八九十百千万亿]+(?:点[零一二三四五六七八九]+)?")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark the text normalization routines on decode/reference files.")
+    p.add_argument("files", nargs="+", help="Text files with '<key> <text>' lines")
+    p.add_argument("--baseline_dir", default=None, help="Directory holding older copies of the modules to compare")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is reported (default: 3)")
+    p.add_argument("--only", default=None, help="Comma-separated function names to run")
+    return p.parse_args()
+
+
+def load_texts(files):
+    texts = []
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.strip().split(maxsplit=1)
+                if len(parts) == 2:
+                    texts.append(parts[1])
+    return texts
+
+
+def bench_inputs(texts):
+    return {
+        "text": texts,
+        "number": [m for text in texts for m in NUMBER_PATTERN.findall(text)],
+        "chinese_number": [m for text in texts for m in CHINESE_NUMBER_PATTERN.findall(text)],
+    }
+
+
+def load_module(name, directory=None):
+    if directory is None:
+        return importlib.import_module(f"tools.{name}")
+    spec = importlib.util.spec_from_file_location(f"baseline_{name}", os.path.join(directory, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def call(fn_name, fn, text):
+    try:
+        return fn("", text) if fn_name == "scoreformat" else fn(text)
+    except Exception as e:
+        return type(e).__name__
+
+
+def clear_caches(module):
+    # every run starts cold, so memoized functions only profit from repeats within the inputs
+    for value in vars(module).values():
+        if hasattr(value, "cache_clear"):
+            value.cache_clear()
+
+
+def run(module, fn_name, texts, repeat):
+    fn = getattr(module, fn_name)
+    best = float("inf")
+    outputs = None
+    for _ in range(repeat):
+        clear_caches(module)
+        start = time.perf_counter()
+        outputs = [call(fn_name, fn, text) for text in texts]
+        best = min(best, time.perf_counter() - start)
+    return best, outputs
+
+
+def main():
+    args = parse_args()
+    texts = load_texts(args.files)
+    inputs = bench_inputs(texts)
+    only = set(args.only.split(",")) if args.only else None
+    print(
+        f"{len(texts)} texts, {sum(map(len, texts))} chars, "
+        f"{len(inputs['number'])} numbers, {len(inputs['chinese_number'])} chinese numbers"
+    )
+
+    header = f"{'function':<28}{'current (ms)':>14}"
+    if args.baseline_dir:
+        header += f"{'baseline (ms)':>15}{'speedup':>10}  same"
+    print(header)
+    for module_name, fn_name, kind in STAGES:
+        if only and fn_name not in only:
+            continue
+        current, outputs = run(load_module(module_name), fn_name, inputs[kind], args.repeat)
+        row = f"{module_name + '.' + fn_name:<28}{current * 1000:>14.1f}"
+        if args.baseline_dir:
+            baseline_module = load_module(module_name, args.baseline_dir)
+            baseline, baseline_outputs = run(baseline_module, fn_name, inputs[kind], args.repeat)
+            row += f"{baseline * 1000:>15.1f}{baseline / current:>9.1f}x  {outputs == baseline_outputs}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
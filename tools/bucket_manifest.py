@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按 speech_length 分桶改写训练清单: 全部样本按长度排序后切成若干分片，
+每个分片只覆盖一段很窄的长度区间 (可选 --pack 时音频也按同样顺序连续存放在该分片的 .pack 中)。
+输出 <name>.list 作为 train_data_set_list，配合
+++dataset_conf.batch_sampler=BlockShuffleBatchSampler 使用，
+padding 更少、读盘基本顺序，同时保留分片级别的随机性。
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from tqdm import tqdm
+
+from packed_audio import PackWriter, make_pack_uri
+from tools.pack_audio import SPEECH_PATTERN, audio_key, load_clip, rewrite_line
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Rewrite jsonl manifests into length-bucketed shards.")
+    p.add_argument("manifests", nargs="+", help="Input jsonl manifests")
+    p.add_argument("output_dir", help="Directory for the bucketed shards and the .list file")
+    p.add_argument("--name", default="bucketed", help="Shard name prefix and .list name")
+    p.add_argument("--shard_rows", type=int, default=20000, help="Rows per shard (default: 20000)")
+    p.add_argument("--pack", action="store_true", help="Also pack each shard's audio into <shard>.pack")
+    p.add_argument("--pcm", action="store_true", help="With --pack, store int16 PCM instead of encoded bytes")
+    p.add_argument("--num_workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    return p.parse_args()
+
+
+def scan_lengths(manifests: List[str]) -> List[Tuple[int, int, int]]:
+    """(speech_length, manifest index, byte offset) for every row, in input order."""
+    rows = []
+    for file_idx, path in enumerate(manifests):
+        with open(path, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    rows.append((int(json.loads(line).get("speech_length", 0)), file_idx, offset))
+                offset += len(line)
+    return rows
+
+
+def write_shard(manifests: List[str], rows: List[Tuple[int, int, int]], shard_jsonl: str, pack: bool, pcm: bool) -> Dict:
+    """Write one shard's rows (already in length order), optionally packing their audio."""
+    files = [open(path, "rb") for path in manifests]
+    writer = PackWriter(shard_jsonl[: -len(".jsonl")] + ".pack") if pack else None
+    keys = set()
+    failed, errors = 0, []
+    try:
+        with open(shard_jsonl + ".tmp", "w", encoding="utf-8") as f_out:
+            for _, file_idx, offset in rows:
+                f = files[file_idx]
+                f.seek(offset)
+                line = f.readline().decode("utf-8")
+                if writer is not None:
+                    user = next(m["content"] for m in json.loads(line)["messages"] if m["role"] == "user")
+                    m = SPEECH_PATTERN.search(user)
+                    if m:
+                        path = m.group(2)
+                        try:
+                            clip = load_clip(path, pcm)
+                        except Exception as e:
+                            failed += 1
+                            if len(errors) < 10:
+                                errors.append(f"Error processing {path}: {str(e)}")
+                            continue
+                        key, n = audio_key(path), 1
+                        while key in keys:
+                            key, n = f"{audio_key(path)}.{n}", n + 1
+                        keys.add(key)
+                        if pcm:
+                            writer.add_pcm(key, clip["samples"], clip["sample_rate"])
+                        else:
+                            writer.add_encoded(key, clip["data"], clip["sample_rate"])
+                        line = rewrite_line(line, make_pack_uri(writer.shard, key))
+                f_out.write(line if line.endswith("\n") else line + "\n")
+        if writer is not None:
+            # the rows point into the pack, so it is published first
+            writer.close()
+        os.replace(shard_jsonl + ".tmp", shard_jsonl)
+    except BaseException:
+        # a failed shard leaves neither a partial .pack nor a .jsonl behind
+        if writer is not None:
+            writer.abort()
+        if os.path.exists(shard_jsonl + ".tmp"):
+            os.remove(shard_jsonl + ".tmp")
+        raise
+    finally:
+        for f in files:
+            f.close()
+    return {"rows": len(rows) - failed, "failed": failed, "errors": errors}
+
+
+def main():
+    args = parse_args()
+    manifests = [os.path.abspath(path) for path in args.manifests]
+    output_dir = os.path.abspath(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    rows = scan_lengths(manifests)
+    if not rows:
+        print("No rows found")
+        return
+    # stable sort: equal lengths keep their input order, so reruns produce the same shards
+    rows.sort(key=lambda row: row[0])
+    shards = [rows[start : start + args.shard_rows] for start in range(0, len(rows), args.shard_rows)]
+    shard_files = [os.path.join(output_dir, f"{args.name}-{i:06d}.jsonl") for i in range(len(shards))]
+
+    totals = {"rows": 0, "failed": 0}
+    error_messages = []
+    with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+        futures = [
+            executor.submit(write_shard, manifests, shard_rows, shard_file, args.pack, args.pcm)
+            for shard_rows, shard_file in zip(shards, shard_files)
+        ]
+        for future in tqdm(futures, desc="Shards"):
+            result = future.result()
+            totals["rows"] += result["rows"]
+            totals["failed"] += result["failed"]
+            error_messages.extend(result["errors"][: 10 - len(error_messages)])
+
+    list_file = os.path.join(output_dir, f"{args.name}.list")
+    with open(list_file, "w", encoding="utf-8") as f:
+        f.writelines(f"{path}\n" for path in shard_files)
+
+    print(f"\nWrote {totals['rows']} rows into {len(shards)} shards -> {list_file}")
+    for shard_rows, shard_file in zip(shards, shard_files):
+        print(f"  {os.path.basename(shard_file)}: speech_length {shard_rows[0][0]}-{shard_rows[-1][0]}")
+    print(f"  Failed: {totals['failed']}")
+    for error in error_messages:
+        print(f"  - {error}")
+    print(
+        f"\nTrain with ++train_data_set_list={list_file} "
+        f"++dataset_conf.batch_sampler=BlockShuffleBatchSampler ++dataset_conf.block_size=<rows per block>"
+    )
+
+
+if __name__ == "__main__":
+    main()
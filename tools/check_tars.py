@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Galgame数据集 完整性检查 (check_tars.sh 的并行版)
+多进程逐个分片检查 tar 结构并真正解码每一条音频，结果按 (分片, 大小, mtime) 缓存，
+再次运行只检查新增或变化的分片。输出:
+  - bad_files.txt: 结构损坏、需要重新下载的分片
+  - blocklist.txt: 损坏分片 + 无法解码的成员 (tar://分片#成员)，
+    scp2jsonl (++blocklist=...) 与训练 (++dataset_conf.blocklist=...) 会跳过这些音频
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import tarfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+import soundfile as sf
+from tqdm import tqdm
+
+from tar_audio import make_tar_uri
+
+TAR_PREFIX = "galgame-speech-asr-16kHz-train-"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Check Galgame tar shards in parallel and write a blocklist.")
+    p.add_argument("tar_dir", help="Directory containing the galgame-speech-asr-16kHz-train-*.tar shards")
+    p.add_argument("--tar_prefix", default=TAR_PREFIX)
+    p.add_argument("--audio_ext", default=".ogg")
+    p.add_argument("--cache_file", default=None, help="Verdict cache (default: <tar_dir>/check_cache.sqlite)")
+    p.add_argument("--blocklist", default="blocklist.txt", help="Broken shards and undecodable members")
+    p.add_argument("--bad_files", default="bad_files.txt", help="Broken shards only, to be re-downloaded")
+    p.add_argument("--num_workers", type=int, default=os.cpu_count())
+    return p.parse_args()
+
+
+class VerdictCache:
+    """Per-shard verdicts; a verdict is reused only while the shard's size and mtime are unchanged."""
+
+    def __init__(self, cache_file: str):
+        self.conn = sqlite3.connect(cache_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS shards ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+            "error TEXT, members INTEGER, bad_members TEXT)"
+        )
+
+    def lookup(self, path: str, size: int, mtime_ns: int) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT error, members, bad_members FROM shards WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, size, mtime_ns),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"shard": path, "error": row[0], "members": row[1], "bad_members": json.loads(row[2])}
+
+    def store(self, verdict: Dict, size: int, mtime_ns: int):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO shards VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                verdict["shard"],
+                size,
+                mtime_ns,
+                verdict["error"],
+                verdict["members"],
+                json.dumps(verdict["bad_members"], ensure_ascii=False),
+            ),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def check_shard(shard: str, audio_ext: str) -> Dict:
+    """Stream the shard once, decoding every audio member.
+
+    `error` is set when the tar itself is unreadable (truncated, not a tar, empty);
+    `bad_members` lists audio members that fail to decode or contain no samples.
+    """
+    members = 0
+    bad_members: List[str] = []
+    error = None
+    try:
+        with tarfile.open(shard, "r|") as tar:
+            for info in tar:
+                if not info.isfile():
+                    continue
+                members += 1
+                data = tar.extractfile(info).read()
+                if not info.name.endswith(audio_ext):
+                    continue
+                try:
+                    waveform, _ = sf.read(BytesIO(data), dtype="float32")
+                    if len(waveform) == 0:
+                        bad_members.append(info.name)
+                except Exception:
+                    bad_members.append(info.name)
+        if members == 0:
+            error = "empty tar"
+    except (tarfile.TarError, OSError, EOFError) as e:
+        error = str(e) or type(e).__name__
+    return {"shard": shard, "error": error, "members": members, "bad_members": bad_members}
+
+
+def main():
+    args = parse_args()
+
+    tar_dir = os.path.abspath(args.tar_dir)
+    shards = sorted(
+        entry.path
+        for entry in os.scandir(tar_dir)
+        if entry.is_file() and entry.name.startswith(args.tar_prefix) and entry.name.endswith(".tar")
+    )
+    if not shards:
+        print(f"No {args.tar_prefix}*.tar shards found in {tar_dir}")
+        return
+
+    cache = VerdictCache(args.cache_file or os.path.join(tar_dir, "check_cache.sqlite"))
+    verdicts: List[Dict] = []
+    todo: List[Tuple[str, int, int]] = []
+    for shard in shards:
+        st = os.stat(shard)
+        verdict = cache.lookup(shard, st.st_size, st.st_mtime_ns)
+        if verdict is None:
+            todo.append((shard, st.st_size, st.st_mtime_ns))
+        else:
+            verdicts.append(verdict)
+    print(f"Found {len(shards)} shards, {len(verdicts)} cached, {len(todo)} to check")
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+            futures = {
+                executor.submit(check_shard, shard, args.audio_ext): (size, mtime_ns)
+                for shard, size, mtime_ns in todo
+            }
+            with tqdm(total=len(futures), desc="Checking") as pbar:
+                for future in as_completed(futures):
+                    verdict = future.result()
+                    cache.store(verdict, *futures[future])
+                    verdicts.append(verdict)
+                    pbar.update(1)
+    cache.close()
+
+    verdicts.sort(key=lambda v: v["shard"])
+    bad_shards = [v["shard"] for v in verdicts if v["error"]]
+    bad_members = [make_tar_uri(v["shard"], m) for v in verdicts if not v["error"] for m in v["bad_members"]]
+
+    with open(args.bad_files, "w", encoding="utf-8") as f:
+        f.writelines(f"{shard}\n" for shard in bad_shards)
+    with open(args.blocklist, "w", encoding="utf-8") as f:
+        f.writelines(f"{entry}\n" for entry in bad_shards + bad_members)
+
+    print(f"\nChecked {len(verdicts)} shards, {sum(v['members'] for v in verdicts)} members")
+    print(f"  Broken shards: {len(bad_shards)} -> {args.bad_files}")
+    for v in verdicts:
+        if v["error"]:
+            print(f"  - {v['shard']}: {v['error']}")
+    print(f"  Undecodable members: {len(bad_members)}")
+    print(f"  Blocklist: {len(bad_shards) + len(bad_members)} entries -> {args.blocklist}")
+
+
+if __name__ == "__main__":
+    main()
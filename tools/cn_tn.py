@@ -15,6 +15,7 @@ import os
 import re
 import string
 import sys
+from functools import lru_cache
 
 # ================================================================================ #
 #                                    basic constant
@@ -558,6 +559,7 @@ class MathSymbol(object):
 # ================================================================================ #
 #                                    basic utils
 # ================================================================================ #
+@lru_cache(maxsize=None)
 def create_system(numbering_type=NUMBERING_TYPES[1]):
     """
     根据数字系统类型返回创建相应的数字系统，默认为 mid
@@ -566,6 +568,7 @@ def create_system(numbering_type=NUMBERING_TYPES[1]):
         mid:  '兆' = '亿' * '万' = $10^{12}$, '京' = '兆' * '万', etc.
         high: '兆' = '亿' * '亿' = $10^{16}$, '京' = '兆' * '兆', etc.
     返回对应的数字系统
+    系统只按类型各创建一次并被缓存共享，调用方不得修改其中的对象
     """
 
     # chinese number units of '亿' and larger
@@ -606,27 +609,26 @@ def create_system(numbering_type=NUMBERING_TYPES[1]):
     system.digits = digits
     system.math = MathSymbol(positive_cn, negative_cn, point_cn)
     # system.symbols = OtherSymbol(sil_cn)
+
+    # char -> symbol, for chn2num; on a clash units win over digits and digits over math
+    # symbols ('正' is both a large unit and the plus sign)
+    system.symbol_of = {}
+    for u in system.units:
+        for char in [u.traditional, u.simplified, u.big_s, u.big_t]:
+            system.symbol_of.setdefault(char, u)
+    for d in system.digits:
+        for char in [d.traditional, d.simplified, d.big_s, d.big_t, d.alt_s, d.alt_t]:
+            if char is not None:
+                system.symbol_of.setdefault(char, d)
+    for m in system.math:
+        for char in [m.traditional, m.simplified]:
+            system.symbol_of.setdefault(char, m)
     return system
 
 
 def chn2num(chinese_string, numbering_type=NUMBERING_TYPES[1]):
     def get_symbol(char, system):
-        for u in system.units:
-            if char in [u.traditional, u.simplified, u.big_s, u.big_t]:
-                return u
-        for d in system.digits:
-            if char in [
-                d.traditional,
-                d.simplified,
-                d.big_s,
-                d.big_t,
-                d.alt_s,
-                d.alt_t,
-            ]:
-                return d
-        for m in system.math:
-            if char in [m.traditional, m.simplified]:
-                return m
+        return system.symbol_of.get(char)
 
     def string2symbols(chinese_string, system):
         int_string, dec_string = chinese_string, ""
@@ -713,6 +715,7 @@ def chn2num(chinese_string, numbering_type=NUMBERING_TYPES[1]):
         return int_str
 
 
+@lru_cache(maxsize=65536)
 def num2chn(
     number_string,
     numbering_type=NUMBERING_TYPES[1],
@@ -1004,8 +1007,7 @@ class Money:
 
     def money2chntext(self):
         money = self.money
-        pattern = re.compile(r"(\d+(\.\d+)?)")
-        matchers = pattern.findall(money)
+        matchers = _CARDINAL_PATTERN.findall(money)
         if matchers:
             for matcher in matchers:
                 money = money.replace(
@@ -1031,115 +1033,92 @@ class Percentage:
         return "百分之" + num2chn(self.percentage.strip().strip("%"))
 
 
-def normalize_nsw(raw_text):
-    text = "^" + raw_text + "$"
+_DATE_PATTERN = re.compile(r"\D+((([089]\d|(19|20)\d{2})年)?(\d{1,2}月(\d{1,2}[日号])?)?)")
+_MONEY_PATTERN = re.compile(r"\D+((\d+(\.\d+)?)[多余几]?" + CURRENCY_UNITS + r"(\d" + CURRENCY_UNITS + r"?)?)")
+# 移动：139、138、137、136、135、134、159、158、157、150、151、152、188、187、182、183、184、178、198
+# 联通：130、131、132、156、155、186、185、176
+# 电信：133、153、189、180、181、177
+# http://www.jihaoba.com/news/show/13680
+_MOBILE_PATTERN = re.compile(r"\D((\+?86 ?)?1([38]\d|5[0-35-9]|7[678]|9[89])\d{8})\D")
+_FIXED_PHONE_PATTERN = re.compile(r"\D((0(10|2[1-3]|[3-9]\d{2})-?)?[1-9]\d{6,7})\D")
+_FRACTION_PATTERN = re.compile(r"(\d+/\d+)")
+_PERCENTAGE_PATTERN = re.compile(r"(\d+(\.\d+)?%)")
+_QUANTIFIER_PATTERN = re.compile(r"(\d+(\.\d+)?)[多余几]?" + COM_QUANTIFIERS)
+_DIGIT_STRING_PATTERN = re.compile(r"(\d{4,32})")
+_CARDINAL_PATTERN = re.compile(r"(\d+(\.\d+)?)")
+_PARTICULAR_PATTERN = re.compile(r"(([a-zA-Z]+)二([a-zA-Z]+))")
+
+# cheap preconditions: a rule whose precondition fails cannot match, so its pass is skipped
+_ANY_DIGIT = re.compile(r"\d")
+_SEVEN_DIGITS = re.compile(r"\d{7}")  # both phone patterns need a run of 7+ digits
+_MONEY_UNIT_CHARS = frozenset("亿千万百元块角毛分")  # every CURRENCY_UNITS alternative has one
+
+
+def _rewrite_matches(pattern, text, convert):
+    """
+    Replace group 1 of every match, in match order, by `convert(group)`.
+    Like the original findall + text.replace(match, ..., 1) loop this replaces the first
+    occurrence of each matched string, which is what the scoring has always done.
+    """
+    for m in pattern.finditer(text):
+        matcher = m.group(1)
+        if matcher:
+            text = text.replace(matcher, convert(matcher), 1)
+    return text
+
 
+def _normalize_numbers(text):
     # 规范化日期
-    pattern = re.compile(
-        r"\D+((([089]\d|(19|20)\d{2})年)?(\d{1,2}月(\d{1,2}[日号])?)?)"
-    )
-    matchers = pattern.findall(text)
-    if matchers:
-        # print('date')
-        for matcher in matchers:
-            text = text.replace(matcher[0], Date(date=matcher[0]).date2chntext(), 1)
+    if "年" in text or "月" in text:
+        text = _rewrite_matches(_DATE_PATTERN, text, lambda m: Date(date=m).date2chntext())
 
     # 规范化金钱
-    pattern = re.compile(
-        r"\D+((\d+(\.\d+)?)[多余几]?"
-        + CURRENCY_UNITS
-        + r"(\d"
-        + CURRENCY_UNITS
-        + r"?)?)"
-    )
-    matchers = pattern.findall(text)
-    if matchers:
-        # print('money')
-        for matcher in matchers:
-            text = text.replace(matcher[0], Money(money=matcher[0]).money2chntext(), 1)
+    if not _MONEY_UNIT_CHARS.isdisjoint(text):
+        text = _rewrite_matches(_MONEY_PATTERN, text, lambda m: Money(money=m).money2chntext())
 
     # 规范化固话/手机号码
-    # 手机
-    # http://www.jihaoba.com/news/show/13680
-    # 移动：139、138、137、136、135、134、159、158、157、150、151、152、188、187、182、183、184、178、198
-    # 联通：130、131、132、156、155、186、185、176
-    # 电信：133、153、189、180、181、177
-    pattern = re.compile(r"\D((\+?86 ?)?1([38]\d|5[0-35-9]|7[678]|9[89])\d{8})\D")
-    matchers = pattern.findall(text)
-    if matchers:
-        # print('telephone')
-        for matcher in matchers:
-            text = text.replace(
-                matcher[0], TelePhone(telephone=matcher[0]).telephone2chntext(), 1
-            )
-    # 固话
-    pattern = re.compile(r"\D((0(10|2[1-3]|[3-9]\d{2})-?)?[1-9]\d{6,7})\D")
-    matchers = pattern.findall(text)
-    if matchers:
-        # print('fixed telephone')
-        for matcher in matchers:
-            text = text.replace(
-                matcher[0],
-                TelePhone(telephone=matcher[0]).telephone2chntext(fixed=True),
-                1,
-            )
+    if _SEVEN_DIGITS.search(text):
+        # 手机
+        text = _rewrite_matches(_MOBILE_PATTERN, text, lambda m: TelePhone(telephone=m).telephone2chntext())
+    if _SEVEN_DIGITS.search(text):
+        # 固话
+        text = _rewrite_matches(
+            _FIXED_PHONE_PATTERN, text, lambda m: TelePhone(telephone=m).telephone2chntext(fixed=True)
+        )
 
     # 规范化分数
-    pattern = re.compile(r"(\d+/\d+)")
-    matchers = pattern.findall(text)
-    if matchers:
-        # print('fraction')
-        for matcher in matchers:
-            text = text.replace(
-                matcher, Fraction(fraction=matcher).fraction2chntext(), 1
-            )
+    if "/" in text:
+        text = _rewrite_matches(_FRACTION_PATTERN, text, lambda m: Fraction(fraction=m).fraction2chntext())
 
     # 规范化百分数
     text = text.replace("％", "%")
-    pattern = re.compile(r"(\d+(\.\d+)?%)")
-    matchers = pattern.findall(text)
-    if matchers:
-        # print('percentage')
-        for matcher in matchers:
-            text = text.replace(
-                matcher[0], Percentage(percentage=matcher[0]).percentage2chntext(), 1
-            )
+    if "%" in text:
+        text = _rewrite_matches(_PERCENTAGE_PATTERN, text, lambda m: Percentage(percentage=m).percentage2chntext())
+
+    # 规范化纯数+量词, 数字编号, 纯数; stop as soon as no digit is left
+    for pattern, convert in (
+        (_QUANTIFIER_PATTERN, num2chn),
+        (_DIGIT_STRING_PATTERN, lambda m: num2chn(m, alt_two=False, use_units=False)),
+        (_CARDINAL_PATTERN, num2chn),
+    ):
+        if not _ANY_DIGIT.search(text):
+            break
+        text = _rewrite_matches(pattern, text, convert)
+    return text
 
-    # 规范化纯数+量词
-    pattern = re.compile(r"(\d+(\.\d+)?)[多余几]?" + COM_QUANTIFIERS)
-    matchers = pattern.findall(text)
-    if matchers:
-        # print('cardinal+quantifier')
-        for matcher in matchers:
-            text = text.replace(
-                matcher[0], Cardinal(cardinal=matcher[0]).cardinal2chntext(), 1
-            )
 
-    # 规范化数字编号
-    pattern = re.compile(r"(\d{4,32})")
-    matchers = pattern.findall(text)
-    if matchers:
-        # print('digit')
-        for matcher in matchers:
-            text = text.replace(matcher, Digit(digit=matcher).digit2chntext(), 1)
-
-    # 规范化纯数
-    pattern = re.compile(r"(\d+(\.\d+)?)")
-    matchers = pattern.findall(text)
-    if matchers:
-        # print('cardinal')
-        for matcher in matchers:
-            text = text.replace(
-                matcher[0], Cardinal(cardinal=matcher[0]).cardinal2chntext(), 1
-            )
+def normalize_nsw(raw_text):
+    text = "^" + raw_text + "$"
+
+    # every rule but the last one needs a digit, and most transcripts have none
+    if _ANY_DIGIT.search(text):
+        text = _normalize_numbers(text)
+    else:
+        text = text.replace("％", "%")
 
     # restore P2P, O2O, B2C, B2B etc
-    pattern = re.compile(r"(([a-zA-Z]+)二([a-zA-Z]+))")
-    matchers = pattern.findall(text)
-    if matchers:
-        # print('particular')
-        for matcher in matchers:
-            text = text.replace(matcher[0], matcher[1] + "2" + matcher[2], 1)
+    if "二" in text:
+        text = _rewrite_matches(_PARTICULAR_PATTERN, text, lambda m: m.replace("二", "2"))
 
     return text.lstrip("^").rstrip("$")
 
@@ -1148,27 +1127,29 @@ def remove_erhua(text):
     """
     去除儿化音词中的儿:
     他女儿在那边儿 -> 他女儿在那边
+    一次扫描: 白名单词按 finditer 顺序整体保留，其余的"儿"删除
     """
 
-    new_str = ""
-    while re.search("儿", text):
-        a = re.search("儿", text).span()
-        remove_er_flag = 0
-
-        if ER_WHITELIST_PATTERN.search(text):
-            b = ER_WHITELIST_PATTERN.search(text).span()
-            if b[0] <= a[0]:
-                remove_er_flag = 1
+    a = text.find("儿")
+    if a < 0:
+        return text
 
-        if remove_er_flag == 0:
-            new_str = new_str + text[0 : a[0]]
-            text = text[a[1] :]
+    pieces = []
+    pos = 0
+    whitelist = ER_WHITELIST_PATTERN.finditer(text)
+    b = next(whitelist, None)
+    while a >= 0:
+        if b is not None and b.start() <= a:
+            # the 儿 belongs to (or follows) the next whitelisted word: keep the word
+            pieces.append(text[pos : b.end()])
+            pos = b.end()
+            b = next(whitelist, None)
         else:
-            new_str = new_str + text[0 : b[1]]
-            text = text[b[1] :]
-
-    text = new_str + text
-    return text
+            pieces.append(text[pos:a])
+            pos = a + 1
+        a = text.find("儿", pos)
+    pieces.append(text[pos:])
+    return "".join(pieces)
 
 
 def remove_space(text):
@@ -1,9 +1,12 @@
 import argparse
+import json
 import os
 import shutil
+from collections import deque
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, Set, Tuple
 
 from tqdm import tqdm
 
@@ -50,6 +53,12 @@ def parse_args():
         default=8,
         help="Number of threads for file copying.",
     )
+    p.add_argument(
+        "--max_inflight",
+        type=int,
+        default=None,
+        help="Copies submitted but not yet written to the manifests (default: 4 * num_threads).",
+    )
     p.add_argument(
         "--agree_terms",
         action="store_true",
@@ -107,6 +116,110 @@ def item_to_paths(item: Dict, idx: int) -> Tuple[str, str, str]:
     return utt_id, src_path, text
 
 
+# Linux FICLONE ioctl: share extents on btrfs/xfs instead of copying bytes
+FICLONE = 0x40049409
+
+
+def reflink(src: str, dst: str):
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def place_file(src: str, dst: Path) -> str:
+    """Put `src` at `dst` as cheaply as possible; returns how it was done.
+
+    A destination that already exists with the source's size is kept (resume).
+    Otherwise a hardlink is tried first, then a reflink, and only then a real copy.
+    Copies go through a temporary name, so a crash never leaves a truncated file
+    under the final name.
+    """
+    src_size = os.path.getsize(src)
+    try:
+        if dst.stat().st_size == src_size:
+            return "skipped"
+        dst.unlink()
+    except FileNotFoundError:
+        pass
+
+    tmp = dst.with_name(dst.name + ".tmp")
+    try:
+        os.link(src, dst)
+        return "linked"
+    except OSError:
+        pass
+    try:
+        reflink(src, str(tmp))
+        os.replace(tmp, dst)
+        return "cloned"
+    except (OSError, ImportError):
+        if tmp.exists():
+            tmp.unlink()
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return "copied"
+
+
+def read_utts(path: Path) -> Set[str]:
+    utts = set()
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                utt = line.split("\t", 1)[0].strip()
+                if utt:
+                    utts.add(utt)
+    return utts
+
+
+def drop_torn_line(path: Path):
+    """Cut a last line that a crash left without its newline."""
+    if not path.exists():
+        return
+    with open(path, "rb+") as f:
+        size = end = f.seek(0, os.SEEK_END)
+        # scan back block by block; manifests of the large subsets do not fit comfortably in memory
+        while end > 0:
+            start = max(0, end - (1 << 16))
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end != size:
+            f.truncate(end)
+
+
+def trim_manifest(path: Path, done: Set[str], key):
+    """
+    Drop lines of a partially written utt (not yet committed to the scp) after a crash.
+    Lines are written in scp order, so they are a tail: the file is cut in place at the
+    first line whose utt is not done, reading it one line at a time.
+    """
+    if not path.exists():
+        return
+
+    def committed(line):
+        # a torn last line has no newline and may not even parse
+        if not line.endswith(b"\n"):
+            return False
+        try:
+            # a torn line can end inside a multi-byte character; it is dropped anyway
+            return key(line.decode("utf-8", errors="replace")) in done
+        except (ValueError, KeyError):
+            return False
+
+    with open(path, "rb+") as f:
+        end = 0
+        for line in f:
+            if not committed(line):
+                f.truncate(end)
+                break
+            end += len(line)
+
+
 def main():
     args = parse_args()
 
@@ -120,6 +233,19 @@ def main():
     audio_out = dirs["audio"]
     manifest_out = dirs["manifests"]
 
+    scp_path = manifest_out / f"{args.split}.scp"
+    text_path = manifest_out / f"{args.split}.txt"
+    jsonl_path = manifest_out / f"{args.split}.jsonl"
+
+    # The scp line is written last for each utt, so it marks the utt as done; a rerun
+    # skips those and appends the rest.
+    drop_torn_line(scp_path)
+    done = read_utts(scp_path)
+    trim_manifest(text_path, done, lambda line: line.split("\t", 1)[0])
+    trim_manifest(jsonl_path, done, lambda line: json.loads(line)["utt_id"])
+    if done:
+        print(f"Resuming: {len(done)} utterances already in {scp_path}")
+
     # Load dataset
     ds = load_reazonspeech(
         subset=args.subset,
@@ -128,79 +254,66 @@ def main():
         streaming=args.streaming,
     )
 
-    # Prepare iteration
+    # Items are produced lazily in both modes; nothing is collected up front.
     if args.streaming:
-        iterator = enumerate(ds)
-        length = args.max_samples if args.max_samples is not None else None
-        pbar = tqdm(iterator, total=length, desc="Iterating (streaming)")
+        items: Iterator[Tuple[int, Dict]] = enumerate(ds)
+        total = args.max_samples
     else:
-        if args.max_samples is not None:
-            ds = ds.select(range(min(args.max_samples, len(ds))))
-        pbar = tqdm(range(len(ds)), desc="Copying")
-
-    # Collect copy jobs and manifests
-    copy_jobs = []
-    scp_lines = []
-    text_lines = []
-    jsonl_lines = []
-
-    def plan_one(idx: int, item: Dict):
-        utt_id, src_path, text = item_to_paths(item, idx)
-        # Keep original filename; flatten to utt_id.flac
-        dst = audio_out / f"{utt_id}.flac"
-        return (utt_id, src_path, text, dst)
+        total = len(ds) if args.max_samples is None else min(args.max_samples, len(ds))
+        items = ((i, ds[i]) for i in range(total))
+    if args.max_samples is not None:
+        items = islice(items, args.max_samples)
 
-    if args.streaming:
-        planned = []
-        for idx, item in pbar:
-            planned.append(plan_one(idx, item))
-            if args.max_samples is not None and len(planned) >= args.max_samples:
+    def jobs():
+        for idx, item in items:
+            utt_id, src_path, text = item_to_paths(item, idx)
+            if utt_id in done:
+                counts["resumed"] += 1
+                continue
+            # Keep original filename; flatten to utt_id.flac
+            yield utt_id, src_path, text, audio_out / f"{utt_id}.flac"
+
+    counts = {"resumed": 0, "skipped": 0, "linked": 0, "cloned": 0, "copied": 0, "failed": 0}
+    max_inflight = args.max_inflight or 4 * args.num_threads
+    pending = jobs()
+    inflight = deque()
+
+    with ThreadPoolExecutor(max_workers=args.num_threads) as ex, open(
+        scp_path, "a", encoding="utf-8"
+    ) as f_scp, open(text_path, "a", encoding="utf-8") as f_text, open(
+        jsonl_path, "a", encoding="utf-8"
+    ) as f_jsonl, tqdm(total=total, desc="Copying") as pbar:
+        while True:
+            for utt, src, text, dst in islice(pending, max_inflight - len(inflight)):
+                inflight.append((ex.submit(place_file, src, dst), utt, src, text, dst))
+            if not inflight:
                 break
-    else:
-        planned = [plan_one(i, ds[i]) for i in pbar]
-
-    # Copy with threads
-    with ThreadPoolExecutor(max_workers=args.num_threads) as ex:
-        future_to_job = {
-            ex.submit(shutil.copy2, src, dst): (utt, src, text, dst)
-            for (utt, src, text, dst) in planned
-        }
-        for fut in tqdm(as_completed(future_to_job), total=len(future_to_job), desc="Writing"):
-            utt, src, text, dst = future_to_job[fut]
+            fut, utt, src, text, dst = inflight.popleft()
             try:
-                fut.result()
+                counts[fut.result()] += 1
             except Exception as e:
-                # Skip failed copies but log manifest for visibility
+                # Failed copies stay out of the manifests so a rerun retries them
                 print(f"WARN: failed to copy {src} -> {dst}: {e}")
-            rel_audio = dst.as_posix()
-            scp_lines.append(f"{utt}\t{rel_audio}\n")
-            text_lines.append(f"{utt}\t{text}\n")
-            jsonl_lines.append(
-                {
-                    "audio": rel_audio,
-                    "transcription": text,
-                    "utt_id": utt,
-                }
-            )
-
-    # Write manifests
-    scp_path = manifest_out / f"{args.split}.scp"
-    text_path = manifest_out / f"{args.split}.txt"
-    jsonl_path = manifest_out / f"{args.split}.jsonl"
-
-    with open(scp_path, "w", encoding="utf-8") as f:
-        f.writelines(scp_lines)
-    with open(text_path, "w", encoding="utf-8") as f:
-        f.writelines(text_lines)
-    # Write jsonl
-    with open(jsonl_path, "w", encoding="utf-8") as f:
-        for row in jsonl_lines:
-            # Manual JSONL to avoid extra dependencies
-            import json
-
-            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                counts["failed"] += 1
+            else:
+                rel_audio = dst.as_posix()
+                f_text.write(f"{utt}\t{text}\n")
+                f_jsonl.write(
+                    json.dumps(
+                        {"audio": rel_audio, "transcription": text, "utt_id": utt},
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+                f_scp.write(f"{utt}\t{rel_audio}\n")
+                for f in (f_text, f_jsonl, f_scp):
+                    f.flush()
+            pbar.n = sum(counts.values())
+            pbar.set_postfix(counts, refresh=False)
+            pbar.update(0)
 
     print("\nDone.")
+    print(" ".join(f"{k}={v}" for k, v in counts.items()))
     print(f"Audio: {audio_out}")
     print(f"SCP: {scp_path}")
     print(f"TEXT: {text_path}")
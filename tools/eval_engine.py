@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内评测: 模型与文本归一化器各只加载一次，每句解码结果一出来就送进归一化进程池，
+归一化结果按原顺序增量计分，解码过程中实时输出当前 CER。
+中间文件 (decode / norm / cer) 与分步运行 decode.py、whisper_mix_normalize.py、
+wer_scorer.py 的结果相同；已存在的步骤可跳过，直接从对应文件读入。
+approximate() 为快速近似评测: 按时长与参考文本长度分层随机抽样，逐句计分，
+分层比率估计的 delta 法近似置信区间足够窄时即停止解码。
+"""
+
+import random
+import time
+from bisect import bisect_right
+from collections import Counter, deque
+from statistics import NormalDist
+
+from tools.wer_scorer import WERScorer, read_scp, score_files
+from tools.whisper_mix_normalize import DEFAULT_CACHE_FILE, normalize_async, normalizer_pool, split_line
+
+def read_pairs(path):
+    """(key, text) of every '<key> <text>' line of `path`, in file order."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = split_line(line)
+            if parts is not None:
+                yield parts
+
+
+def write_through(pairs, path):
+    """Pass (key, text) pairs on while writing them to `path` as '<key>\\t<text>' lines."""
+    with open(path, "w", encoding="utf-8") as f:
+        for key, text in pairs:
+            f.write(f"{key}\t{text}\n")
+            yield key, text
+
+
+def normalize_stream(pool, pairs, kana=False):
+    """
+    Normalize (key, text) pairs on a normalizer_pool while `pairs` is still being
+    produced (e.g. decoded); yields the normalized pairs in input order as soon as
+    they are ready.
+    """
+    pending = deque()
+    for key, text in pairs:
+        pending.append(normalize_async(pool, [f"{key} {text}"], kana))
+        while pending and pending[0].ready():
+            yield from _normalized(pending.popleft())
+    while pending:
+        yield from _normalized(pending.popleft())
+
+
+def _normalized(result):
+    for line in result.get():
+        if line is not None:
+            key, _, text = line.rstrip("\n").partition("\t")
+            yield key, text
+
+
+class LiveCER(object):
+    """CER of the hypotheses seen so far against the (normalized) references."""
+
+    def __init__(self, refs):
+        self.refs = refs
+        self.scorer = WERScorer(to_char=True)
+        self.seen = 0
+        self.start = time.time()
+
+    def add(self, key, text):
+        self.seen += 1
+        if key in self.refs:
+            return self.scorer.score(self.refs[key], text, utt=key, align=False)
+        return None
+
+    def status(self):
+        overall, _ = self.scorer.overall()
+        return f"[{self.seen}/{len(self.refs)} {time.time() - self.start:.0f}s] CER {overall}"
+
+
+def evaluate(
+    ref_file,
+    decode_out,
+    norm_out,
+    cer_out,
+    scp_file=None,
+    model_dir="FunAudioLLM/Fun-ASR-Nano-2512",
+    device=None,
+    prompt=None,
+    nj=1,
+    cache_file=DEFAULT_CACHE_FILE,
+    skip=(),
+    report_every=50,
+):
+    """
+    Decode `scp_file`, normalize and score it in one process. Steps named in `skip`
+    ("decode", "norm", "cer") are not run: their input is read from the existing
+    decode_out / norm_out instead (a skipped "cer" only leaves cer_out untouched).
+    Returns the ScoreReport, or None when "cer" is skipped.
+    """
+    refs = read_scp(ref_file)
+    # fork the normalizer workers before the model touches the GPU
+    pool = normalizer_pool(max(nj, 1), cache_file) if "norm" not in skip else None
+    try:
+        if "decode" in skip:
+            hyps = read_pairs(decode_out)
+        else:
+            from decode import build_model, decode_lines
+
+            model = build_model(model_dir, device)
+            with open(scp_file, "r", encoding="utf-8") as f:
+                lines = [line.strip() for line in f if line.strip()]
+            hyps = write_through(decode_lines(model, lines, prompt=prompt), decode_out)
+
+        if pool is None:
+            for _ in hyps:
+                pass
+            normed = read_pairs(norm_out)
+        else:
+            normed = write_through(normalize_stream(pool, hyps), norm_out)
+
+        live_score(refs, normed, report_every)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    if "cer" in skip:
+        return None
+    return write_report(ref_file, norm_out, cer_out)
+
+
+def live_score(refs, normed, report_every=50):
+    """Score the normalized (key, text) stream as it comes, printing the running CER."""
+    live = LiveCER(refs)
+    for key, text in normed:
+        live.add(key, text)
+        if live.seen % report_every == 0:
+            print(live.status(), flush=True)
+    if live.seen % report_every:
+        print(live.status(), flush=True)
+    return live
+
+
+def write_report(ref_file, norm_out, cer_out):
+    """The compute-wer style report of a finished norm file, written to cer_out."""
+    # the live scorer saw decode order; the report keeps wer_scorer's reference order
+    report = score_files(ref_file, norm_out, to_char=True)
+    with open(cer_out, "w", encoding="utf-8") as f:
+        report.write(f)
+    return report
+
+
+def audio_duration(path):
+    """Seconds of a local audio file, from its header; None for uris and unreadable files."""
+    import soundfile as sf
+
+    if "://" in path:
+        return None
+    try:
+        return sf.info(path).duration
+    except Exception:
+        return None
+
+
+def quantile_bins(values, bins):
+    """Bin index (0 .. bins-1, by quantiles of the known values) of each value; None stays None."""
+    known = sorted(v for v in values if v is not None)
+    edges = [known[len(known) * i // bins] for i in range(1, bins)] if known else []
+    return [None if v is None else bisect_right(edges, v) for v in values]
+
+
+def stratified_order(items, strata, seed=0):
+    """
+    `items` reordered so that every prefix is a proportionally allocated stratified
+    random sample: items are shuffled within their stratum, and each next item comes
+    from the stratum furthest below its share of the prefix.
+    """
+    rng = random.Random(seed)
+    groups = {}
+    for item, stratum in zip(items, strata):
+        groups.setdefault(stratum, []).append(item)
+    for group in groups.values():
+        rng.shuffle(group)
+    total = len(items)
+    taken = dict.fromkeys(groups, 0)
+    order = []
+    for n in range(1, total + 1):
+        stratum = max(groups, key=lambda s: n * len(groups[s]) / total - taken[s])
+        order.append(groups[stratum][taken[stratum]])
+        taken[stratum] += 1
+    return order
+
+
+class StratifiedCER(object):
+    """
+    CER of a stratified sample (errors / reference characters over all utterances seen)
+    with the delta-method interval of the combined ratio estimator: the variance of the
+    linearized residuals e - cer * l within each stratum, scaled by the stratum's finite
+    population correction, around a normal quantile. The sample is drawn without
+    replacement from `population` ({stratum: utterances}), so the interval closes on the
+    exact CER of the whole set once every utterance is in.
+
+    The interval is approximate: samples that have not met the rare large errors yet
+    (e.g. a few hallucinated utterances) look precise, and stopping on the width picks
+    them. On a synthetic set where 2% of the utterances hallucinate (tests/test_eval_engine.py),
+    300-utterance samples covered the exact CER 93.5% of the time and samples stopped at a
+    4-point width 92% (nominal 95%).
+    """
+
+    def __init__(self, population, confidence=0.95):
+        self.population = population
+        self.confidence = confidence
+        self.errors = {}
+        self.lengths = {}
+        self.n = 0
+
+    def add(self, stratum, errors, length):
+        self.errors.setdefault(stratum, []).append(errors)
+        self.lengths.setdefault(stratum, []).append(length)
+        self.n += 1
+
+    def estimate(self):
+        total = sum(map(sum, self.lengths.values()))
+        return sum(map(sum, self.errors.values())) / total if total else 0.0
+
+    def interval(self):
+        estimate = self.estimate()
+        length = sum(map(sum, self.lengths.values()))
+        variance = 0.0
+        for stratum, errors in self.errors.items():
+            n = len(errors)
+            if n < 2:
+                continue
+            residuals = [e - estimate * l for e, l in zip(errors, self.lengths[stratum])]
+            mean = sum(residuals) / n
+            fpc = max(0.0, 1 - n / self.population.get(stratum, n))
+            variance += fpc * n * sum((z - mean) ** 2 for z in residuals) / (n - 1)
+        z = NormalDist().inv_cdf((1 + self.confidence) / 2)
+        se = variance**0.5 / max(length, 1)
+        return max(0.0, estimate - z * se), estimate + z * se
+
+
+def sample_until_narrow(sample, scored, target_width, min_utts=300, check_every=20, report=None):
+    """
+    Add the (stratum, errors, length) items of `scored` to `sample` (a StratifiedCER)
+    until a stop check (from `min_utts` items on, every `check_every` items) finds the
+    interval at most `target_width` CER points wide, or `scored` runs out. `report(low, high)` is called at
+    every check. Returns the interval of everything added.
+    """
+    interval = None
+    for stratum, errors, length in scored:
+        sample.add(stratum, errors, length)
+        interval = None
+        if sample.n >= min_utts and sample.n % check_every == 0:
+            interval = sample.interval()
+            if report is not None:
+                report(*interval)
+            if (interval[1] - interval[0]) * 100 <= target_width:
+                break
+    return interval or sample.interval()
+
+
+def approximate(
+    ref_file,
+    scp_file,
+    decode_out,
+    norm_out,
+    cer_out,
+    model_dir="FunAudioLLM/Fun-ASR-Nano-2512",
+    device=None,
+    prompt=None,
+    nj=1,
+    cache_file=DEFAULT_CACHE_FILE,
+    target_width=1.0,
+    min_utts=300,
+    check_every=20,
+    confidence=0.95,
+    bins=4,
+    seed=0,
+):
+    """
+    Decode a stratified random sample of `scp_file` (strata: duration x reference length
+    quantile bins) in growing prefixes, and stop once the approximate interval of the CER
+    (see StratifiedCER) is at most `target_width` CER points wide (after `min_utts`,
+    checked every `check_every` utterances). The same seed draws the same sample, so checkpoints are
+    compared on the same utterances. Returns (cer, (low, high), utterances used);
+    cer_out holds the report of the sampled utterances.
+    """
+    refs = read_scp(ref_file)
+    with open(scp_file, "r", encoding="utf-8") as f:
+        pairs = [line.strip().split(maxsplit=1) for line in f if line.strip()]
+    pairs = [parts for parts in pairs if len(parts) == 2 and parts[0] in refs]
+    strata = list(
+        zip(
+            quantile_bins([audio_duration(audio) for _, audio in pairs], bins),
+            quantile_bins([len(refs[key]) for key, _ in pairs], bins),
+        )
+    )
+    stratum_of = {key: stratum for (key, _), stratum in zip(pairs, strata)}
+    order = stratified_order([f"{key} {audio}" for key, audio in pairs], strata, seed)
+
+    pool = normalizer_pool(max(nj, 1), cache_file)
+    sample = StratifiedCER(Counter(strata), confidence)
+    try:
+        from decode import build_model, decode_lines
+
+        model = build_model(model_dir, device)
+        hyps = write_through(decode_lines(model, order, prompt=prompt), decode_out)
+        normed = write_through(normalize_stream(pool, hyps), norm_out)
+        scorer = WERScorer(to_char=True)
+
+        def scored():
+            for key, text in normed:
+                counts = scorer.score(refs[key], text, utt=key, align=False).counts
+                yield stratum_of[key], counts.errors, counts.all
+
+        def show(low, high):
+            print(
+                f"[{sample.n}/{len(order)}] CER {sample.estimate() * 100:.2f} % "
+                f"approx. {confidence * 100:g}% CI [{low * 100:.2f}, {high * 100:.2f}]",
+                flush=True,
+            )
+
+        low, high = sample_until_narrow(sample, scored(), target_width, min_utts, check_every, show)
+        # stops decoding and closes the output files
+        normed.close()
+    finally:
+        pool.terminate()
+
+    report = score_files(ref_file, norm_out, align_to_hyp=True, to_char=True)
+    with open(cer_out, "w", encoding="utf-8") as f:
+        report.write(f)
+    print(
+        f"CER {sample.estimate() * 100:.2f} % (approximate {confidence * 100:g}% CI "
+        f"[{low * 100:.2f}, {high * 100:.2f}]) from {sample.n} of {len(order)} utterances",
+        flush=True,
+    )
+    print(
+        "The interval is a normal approximation; it can be too narrow on small samples "
+        "with rare large errors. Raise --approx_min_utts if the set has them.",
+        flush=True,
+    )
+    return sample.estimate(), (low, high), sample.n
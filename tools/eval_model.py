@@ -3,6 +3,8 @@ import os
 import subprocess
 import sys
 
+from tools.wer_scorer import score_files
+
 def run_command(cmd, shell=False):
     """Run a command in the shell and check for errors."""
     print(f"Running: {' '.join(cmd) if isinstance(cmd, list) else cmd}")
@@ -41,6 +43,19 @@ def main():
                         help="Path to the normalized reference text file")
     parser.add_argument("--prompt", type=str, default="", help="Prompt for decoding (e.g., '语音转写成日文：')")
     parser.add_argument("--yes", action="store_true", help="Automatically say yes to skip prompts if files exist")
+    parser.add_argument("--norm_nj", type=int, default=os.cpu_count() or 1, help="Worker processes for text normalization and scoring")
+    parser.add_argument("--engine", choices=["inprocess", "subprocess"], default="inprocess",
+                        help="inprocess: decode, normalize and score in this process with live CER; "
+                             "subprocess: run decode.py and whisper_mix_normalize.py separately")
+    parser.add_argument("--report_every", type=int, default=50, help="Print the running CER every N utterances (inprocess)")
+    parser.add_argument("--approx_width", type=float, default=0,
+                        help="Approximate eval: decode a stratified sample until the CER confidence interval "
+                             "is at most this many CER points wide (0: evaluate everything)")
+    parser.add_argument("--approx_min_utts", type=int, default=300,
+                        help="Approximate eval: utterances before the first stop check; earlier stops can miss "
+                             "rare large errors (hallucinations) and report too narrow an interval")
+    parser.add_argument("--approx_confidence", type=float, default=0.95, help="Approximate eval: nominal confidence of the (approximate) CER interval")
+    parser.add_argument("--approx_seed", type=int, default=0, help="Approximate eval: sampling seed (same seed, same sample)")
 
     args = parser.parse_args()
 
@@ -63,6 +78,64 @@ def main():
             return True
         return check_skip(fpath, step)
 
+    device = f"cuda:{args.gpu_id}" if args.device == "cuda" else args.device
+    model_dir = "FunAudioLLM/Fun-ASR-Nano-2512" if args.model_dir == "default" else args.model_dir
+
+    if args.approx_width > 0:
+        from tools.eval_engine import approximate
+
+        # sampled results go to their own files, next to the full ones
+        prefix = os.path.join(output_dir, f"{args.output_name}_approx")
+        print("-" * 50)
+        print(f"Approximate eval (target interval width {args.approx_width} CER points)...")
+        approximate(
+            args.ref_norm_text,
+            args.scp_file,
+            f"{prefix}_decode.txt",
+            f"{prefix}_norm.txt",
+            f"{prefix}_cer.txt",
+            model_dir=model_dir,
+            device=device,
+            prompt=args.prompt or None,
+            nj=args.norm_nj,
+            target_width=args.approx_width,
+            min_utts=args.approx_min_utts,
+            confidence=args.approx_confidence,
+            seed=args.approx_seed,
+        )
+        return
+
+    if args.engine == "inprocess":
+        from tools.eval_engine import evaluate
+
+        # the steps are streamed into each other, so decide what to skip up front
+        skip = [
+            step
+            for step, fpath, name in (
+                ("decode", decode_out, "Step 1: Decoding"),
+                ("norm", norm_out, "Step 2: Normalizing"),
+                ("cer", cer_out, "Step 3: Computing CER"),
+            )
+            if ask_skip(fpath, name)
+        ]
+        print("-" * 50)
+        print("Decoding, normalizing and scoring in-process...")
+        evaluate(
+            args.ref_norm_text,
+            decode_out,
+            norm_out,
+            cer_out,
+            scp_file=args.scp_file,
+            model_dir=model_dir,
+            device=device,
+            prompt=args.prompt or None,
+            nj=args.norm_nj,
+            skip=skip,
+            report_every=args.report_every,
+        )
+        print_summary(cer_out)
+        return
+
     # 1. Decoding
     print("-" * 50)
     if not ask_skip(decode_out, "Step 1: Decoding"):
@@ -91,18 +164,22 @@ def main():
     print("-" * 50)
     if not ask_skip(norm_out, "Step 2: Normalizing"):
         print("Step 2: Normalizing...")
-        norm_cmd = ["python", "tools/whisper_mix_normalize.py", decode_out, norm_out]
+        norm_cmd = ["python", "-m", "tools.whisper_mix_normalize", decode_out, norm_out, "--nj", str(args.norm_nj)]
         run_command(norm_cmd)
     
     # 3. Computing WER/CER
     print("-" * 50)
     if not ask_skip(cer_out, "Step 3: Computing CER"):
         print("Step 3: Computing CER...")
-        # Updated command based on 'compute-wer --help'
-        cmd_str = f"compute-wer -c {args.ref_norm_text} {norm_out} {cer_out}"
-        print(f"Running: {cmd_str}")
-        subprocess.run(cmd_str, shell=True, check=True)
-    
+        # same report as `compute-wer -c ref hyp cer_out`, scored in-process
+        report = score_files(args.ref_norm_text, norm_out, to_char=True, nj=args.norm_nj)
+        with open(cer_out, "w", encoding="utf-8") as f:
+            report.write(f)
+
+    print_summary(cer_out)
+
+
+def print_summary(cer_out):
     # Print tail
     print("-" * 50)
     print(f"Results saved to: {cer_out}")
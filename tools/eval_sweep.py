@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多个 checkpoint 的对比评测: 基础模型只加载一次，每句音频的特征与 encoder/adaptor 输出只计算一次并缓存
+(微调时 encoder 与 adaptor 冻结，各 checkpoint 只有 LLM 权重不同)；
+之后每个 checkpoint 只把与当前权重不同的参数张量拷进模型，再逐句做 LLM 解码、归一化与计分，
+最后输出各 checkpoint 的 CER 对比表。
+默认整句解码，不经过 VAD: 结果只在同一张表内可比，不能与 decode.py / eval_model.py (fsmn-vad 分段) 的 CER 对比。
+--vad 时与 decode.py 使用同一 AutoModel 流程 (含 fsmn-vad)，结果可与其对比，但不缓存特征。
+用法:
+    python -m tools.eval_sweep --scp_file tail1000.scp --ref_norm_text tail1000_norm.txt \
+        base outputs/model.pt.ep3 outputs/model.pt.best outputs/model.pt.avg10
+"""
+
+import argparse
+import os
+import re
+import time
+
+import torch
+
+from tools.eval_engine import live_score, normalize_stream, write_report, write_through
+from tools.wer_scorer import read_scp
+from tools.whisper_mix_normalize import DEFAULT_CACHE_FILE, normalizer_pool
+
+BASE = "base"
+# parameters the cached prepare_speech outputs depend on
+AUDIO_PREFIXES = ("audio_encoder.", "audio_adaptor.")
+
+
+def load_state_dict(path):
+    """Model weights of a training checkpoint (model.pt, model.pt.best, model.pt.avg10, ...)."""
+    src = torch.load(path, map_location="cpu")
+    for key in ("state_dict", "model"):
+        if isinstance(src.get(key), dict):
+            src = src[key]
+            break
+    return {
+        name[len("module.") :] if name.startswith("module.") else name: tensor
+        for name, tensor in src.items()
+        if isinstance(tensor, torch.Tensor)
+    }
+
+
+class CheckpointSweep(object):
+    """
+    One loaded model whose weights are swapped checkpoint by checkpoint. The output of
+    prepare_speech (features, audio encoder, adaptor) is cached per utterance and only
+    recomputed after a checkpoint changes the encoder or adaptor weights.
+
+    With `pipeline` (an AutoModel with fsmn-vad, as decode.py builds it) every utterance
+    goes through pipeline.generate instead, like decode.py, and nothing is cached.
+    """
+
+    def __init__(self, model, kwargs, prompt=None, pipeline=None):
+        self.model = model
+        self.kwargs = dict(kwargs)
+        if prompt:
+            self.kwargs["prompt"] = prompt
+        self.pipeline = pipeline
+        self.features = {}
+        self.base_state = None
+        # host copy of the weights loaded now, filled on first use; checkpoints are compared
+        # against it so only the tensors that changed are sent to the model's device
+        self.loaded = {}
+
+    @classmethod
+    def from_pretrained(cls, base_model, device=None, prompt=None, vad=False):
+        from decode import build_model, default_device
+
+        if vad:
+            auto_model = build_model(base_model, device=device)
+            return cls(auto_model.model, auto_model.kwargs, prompt, pipeline=auto_model)
+
+        from funasr import AutoModel
+
+        auto_model = AutoModel(
+            model=base_model,
+            trust_remote_code=True,
+            remote_code="./model.py",
+            device=device or default_device(),
+        )
+        return cls(auto_model.model, auto_model.kwargs, prompt)
+
+    def snapshot_base(self):
+        # needed when "base" comes after other checkpoints; complete, since a checkpoint may
+        # also have changed the audio encoder / adaptor
+        self.base_state = {name: tensor.to("cpu", copy=True) for name, tensor in self.model.state_dict().items()}
+        self.loaded = dict(self.base_state)
+
+    def load(self, state):
+        """Copy the tensors of `state` that differ from the loaded ones; returns how many did."""
+        # fetched every time: inference may cast the LLM and replace its tensors
+        params = self.model.state_dict()
+        changed = 0
+        audio_changed = False
+        with torch.no_grad():
+            for name, tensor in state.items():
+                param = params.get(name)
+                if param is None:
+                    continue
+                if param.shape != tensor.shape:
+                    raise ValueError(f"{name}: checkpoint shape {tuple(tensor.shape)} != model shape {tuple(param.shape)}")
+                current = self.loaded.get(name)
+                if current is None:
+                    current = self.loaded[name] = param.detach().to("cpu", copy=True)
+                if tensor.dtype != current.dtype:
+                    tensor = tensor.to(current.dtype)
+                if torch.equal(current, tensor):
+                    continue
+                param.copy_(tensor)
+                self.loaded[name] = tensor
+                changed += 1
+                audio_changed = audio_changed or name.startswith(AUDIO_PREFIXES)
+        if audio_changed:
+            # the cached adaptor outputs belong to the previous encoder / adaptor weights
+            self.features.clear()
+        return changed
+
+    def decode(self, lines):
+        """Yield (key, text) for every '<key> <audio>' line with the weights loaded now."""
+        if self.pipeline is not None:
+            from decode import decode_lines
+
+            yield from decode_lines(self.pipeline, lines, prompt=self.kwargs.get("prompt"))
+            return
+        device = self.kwargs["device"]
+        self.model.eval()
+        with torch.no_grad():
+            for line in lines:
+                parts = line.split(maxsplit=1)
+                if len(parts) != 2:
+                    continue
+                key, audio = parts
+                prepared = self.features.get(key)
+                if prepared is None:
+                    data_in = self.model.chat_inputs([audio], **self.kwargs)
+                    contents, batch, encoder_out, encoder_out_lens, _ = self.model.prepare_speech(data_in, **self.kwargs)
+                    # kept on the host so a long list does not pin GPU memory
+                    prepared = self.features[key] = to_device((contents, batch, encoder_out, encoder_out_lens), "cpu")
+                contents, batch, encoder_out, encoder_out_lens = to_device(prepared, device)
+                inputs_embeds, source_ids = self.model.embed_inputs(batch, encoder_out, encoder_out_lens, **self.kwargs)
+                results = self.model.generate_text(inputs_embeds, contents, batch, source_ids, [key], **self.kwargs)
+                yield key, results[0]["text"]
+
+
+def to_device(data, device):
+    """`data` with every tensor in it (through dicts, lists and tuples) moved to `device`."""
+    if isinstance(data, torch.Tensor):
+        return data.to(device)
+    if isinstance(data, dict):
+        return {key: to_device(value, device) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return type(data)(to_device(value, device) for value in data)
+    return data
+
+
+def output_name(checkpoint):
+    return re.sub(r"[^\w.-]+", "_", checkpoint).strip("_")
+
+
+def format_table(rows, vad=False):
+    best = min(rows, key=lambda row: row[1].overall.wer)[0]
+    lines = []
+    if not vad:
+        lines.append("whole utterances without VAD: not comparable with decode.py / eval_model.py (use --vad)")
+    lines += [f"{'checkpoint':<40}{'CER':>8}{'N':>8}{'Sub':>7}{'Del':>7}{'Ins':>7}{'SER':>8}{'time (s)':>10}"]
+    for checkpoint, report, seconds in rows:
+        counts = report.overall
+        lines.append(
+            f"{checkpoint:<40}{counts.wer * 100:>7.2f}%{counts.all:>8}{counts.replace:>7}{counts.delete:>7}"
+            f"{counts.insert:>7}{report.ser * 100:>7.2f}%{seconds:>10.1f}" + ("  *" if checkpoint == best else "")
+        )
+    return lines
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Evaluate several checkpoints of one finetune, sharing the frozen audio work.")
+    p.add_argument("checkpoints", nargs="+", help=f"Checkpoint files (model.pt, model.pt.best, model.pt.avg10, ...); '{BASE}' for the base model")
+    p.add_argument("--base_model", default="FunAudioLLM/Fun-ASR-Nano-2512", help="Model the checkpoints were finetuned from")
+    p.add_argument("--scp_file", default="/mnt/d/ML/datasets--litagin--Galgame_Speech_ASR_16kHz/tail1000.scp",
+                   help="Path to the validation scp file")
+    p.add_argument("--ref_norm_text", default="/mnt/d/ML/datasets--litagin--Galgame_Speech_ASR_16kHz/tail1000_norm.txt",
+                   help="Path to the normalized reference text file")
+    p.add_argument("--output_dir", default="eval_results/sweep", help="Where the per-checkpoint decode/norm/cer files go")
+    p.add_argument("--prompt", default="", help="Prompt for decoding (e.g., '语音转写成日文：')")
+    p.add_argument("--device", default="cuda", help="Device to use for decoding (e.g., cuda, cpu)")
+    p.add_argument("--gpu_id", type=int, default=0, help="GPU id when --device is cuda")
+    p.add_argument("--norm_nj", type=int, default=os.cpu_count() or 1, help="Worker processes for text normalization")
+    p.add_argument("--report_every", type=int, default=100, help="Print the running CER every N utterances")
+    p.add_argument("--vad", action="store_true",
+                   help="Decode through fsmn-vad like decode.py, so the CERs compare with eval_model.py "
+                   "(no feature cache, slower)")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(args.scp_file, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    refs = read_scp(args.ref_norm_text)
+
+    # fork the normalizer workers before the model touches the GPU
+    pool = normalizer_pool(max(args.norm_nj, 1), DEFAULT_CACHE_FILE)
+    rows = []
+    try:
+        sweep = CheckpointSweep.from_pretrained(
+            args.base_model,
+            device=f"cuda:{args.gpu_id}" if args.device == "cuda" else args.device,
+            prompt=args.prompt or None,
+            vad=args.vad,
+        )
+        if BASE in args.checkpoints[1:]:
+            sweep.snapshot_base()
+        for checkpoint in args.checkpoints:
+            print("-" * 50)
+            start = time.time()
+            if checkpoint == BASE:
+                state = sweep.base_state
+            else:
+                state = load_state_dict(checkpoint)
+            changed = sweep.load(state) if state is not None else 0
+            print(f"{checkpoint}: {changed} tensors swapped, {len(sweep.features)} cached utterances")
+
+            prefix = os.path.join(args.output_dir, output_name(checkpoint))
+            hyps = write_through(sweep.decode(lines), f"{prefix}_decode.txt")
+            live_score(refs, write_through(normalize_stream(pool, hyps), f"{prefix}_norm.txt"), args.report_every)
+            report = write_report(args.ref_norm_text, f"{prefix}_norm.txt", f"{prefix}_cer.txt")
+            rows.append((checkpoint, report, time.time() - start))
+    finally:
+        pool.terminate()
+
+    table = format_table(rows, args.vad)
+    with open(os.path.join(args.output_dir, "sweep.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(table) + "\n")
+    print("-" * 50)
+    print("\n".join(table))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,39 +6,26 @@ import re
 import sys
 
 
+# Character classes of the range tests these routines were written with.
+# "latin": \u0000-\u00ff, latin extended-A (\u0100-\u017f) and cyrillic (\u0400-\u04ff).
+_LATIN_CHARS = frozenset(map(chr, [*range(0x0000, 0x0180), *range(0x0400, 0x0500)]))
+_SCORE_EN_CHARS = _LATIN_CHARS - frozenset("0123456789")
+_CJK_OR_DIGIT_CHARS = frozenset(map(chr, [*range(0x4E00, 0x9FA6), *range(0x30, 0x3A)]))
+_SPACES = re.compile("[ ]{1,}")
+
+
 def scoreformat(name, line, flag=1):
-    newline = ""
-    for i in range(0, len(line)):
-        curr = line[i]
-        currEn = False
-        if curr == "":
-            continue
-        if (
-            (curr >= "\u0041" and curr <= "\u005a")  # eng
-            or (curr >= "\u0061" and curr <= "\u007a")  # eng
-            or (curr >= "\u0000" and curr <= "\u007f")  # de fr es it
-            or (curr >= "\u0400" and curr <= "\u04ff")  # ru
-            or (curr >= "\u0100" and curr <= "\u017f")  # latin1
-            or (curr >= "\u0080" and curr <= "\u00ff")  # latin2
-            or curr == "'"
-        ) and (curr < "\u0030" or curr > "\u0039"):
-            currEn = True
-        if i == 0:
-            newline = newline + curr
+    pieces = []
+    lastEn = False
+    for i, curr in enumerate(line):
+        currEn = curr in _SCORE_EN_CHARS
+        if i == 0 or (lastEn and currEn):
+            pieces.append(curr)
         else:
-            if lastEn == True and currEn == True:
-                newline = newline + curr
-            else:
-                newline = newline + " " + curr
-        if flag == -1:
-            lastEn = False
-        else:
-            lastEn = currEn
-    ret = re.sub("[ ]{1,}", " ", newline)
-    ret = ret
-    if name == "":
-        ret = ret
-    else:
+            pieces.append(" " + curr)
+        lastEn = currEn and flag != -1
+    ret = _SPACES.sub(" ", "".join(pieces))
+    if name != "":
         if flag <= 0:
             ret = ret + " " + "(" + name + ")"
         else:
@@ -47,150 +34,127 @@ def scoreformat(name, line, flag=1):
 
 
 def recoformat(line):
-    newline = ""
+    pieces = []
     en_flag = 0  # 0: no-english   1 : english   2: former
-    for i in range(0, len(line)):
-        word = line[i]
-        if ord(word) == 32:
+    for word in line:
+        if word == " ":
             if en_flag == 0:
                 continue
-            else:
-                en_flag = 0
-                newline += " "
-        if (word >= "\u4e00" and word <= "\u9fa5") or (
-            word >= "\u0030" and word <= "\u0039"
-        ):
-            if en_flag == 1:
-                newline += " " + word
-            else:
-                newline += word
             en_flag = 0
-        elif (
-            (word >= "\u0041" and word <= "\u005a")  # eng
-            or (word >= "\u0061" and word <= "\u007a")  # eng
-            or (word >= "\u0000" and word <= "\u007f")  # de fr es it
-            or (word >= "\u0400" and word <= "\u04ff")  # ru
-            or (word >= "\u0100" and word <= "\u017f")  # latin1
-            or (word >= "\u0080" and word <= "\u00ff")  # latin2
-            or word == "'"
-        ):
+            pieces.append(" ")
+            # no continue: the space itself then takes the latin branch below
+        if word in _CJK_OR_DIGIT_CHARS:
+            pieces.append(" " + word if en_flag == 1 else word)
+            en_flag = 0
+        elif word in _LATIN_CHARS:
             if en_flag == 0:
-                newline += " " + ("" if (word == "'") else word)
+                pieces.append(" " + ("" if (word == "'") else word))
             else:
-                newline += word
+                pieces.append(word)
             en_flag = 1
         else:
-            newline += " " + word
-    newline = newline
-    newline = re.sub("[ ]{1,}", " ", newline)
-    newline = newline
-    return newline
+            pieces.append(" " + word)
+    return _SPACES.sub(" ", "".join(pieces))
 
 
-def numbersingle(line):
+class _DigitTable(dict):
+    """str.translate table: every unicode decimal digit (what \\d matches) -> its chnu entry."""
+
     chnu = ["零", "一", "二", "两", "三", "四", "五", "六", "七", "八", "九", "点"]
-    newline = ""
-    for id in range(len(line)):
-        if re.findall(r"\.", line[id]):
-            if re.findall(r"\.\s*$", line[id]):
-                newline += "."
-            else:
-                newline += chnu[10]
-        elif re.search(r"0", line[id]):
-            if id > 0 and id < len(line) - 1:
-                if (
-                    re.search(r"\d", line[id - 1])
-                    and (not re.search(r"\d", line[id + 1]))
-                    and (not re.search(r"0", line[id - 1]))
-                ):
-                    if (
-                        id > 2
-                        and len(line) > 2
-                        and (not re.search(r"\d", line[id - 1]))
-                    ):
-                        newline = newline[:-1]
-                        newline += chnu[int(line[id - 1])] + "十"
-                    else:
-                        newline += chnu[int(line[id])]
-                else:
-                    newline += chnu[int(line[id])]
-            else:
-                newline += chnu[int(line[id])]
-        elif re.search(r"\d", line[id]):
-            newline += chnu[int(line[id])]
-        else:
-            newline += line[id]
-    return newline
+
+    def __missing__(self, code):
+        char = chr(code)
+        # indexed by the digit's value, so 3 -> "两", 4 -> "三" ...; kept as the scoring has always done it
+        value = self.chnu[int(char)] if char.isdecimal() else code
+        self[code] = value
+        return value
+
+
+_DIGIT_TABLE = _DigitTable()
+
+
+def numbersingle(line):
+    # Per character: a digit becomes chnu[digit] and everything else, "." included, is kept.
+    # (The "0" and "." special cases of the original per-character regex version could
+    # never fire, so this is the whole mapping.)
+    return line.translate(_DIGIT_TABLE)
+
+
+_CH_BITS = {
+    "零": "1",
+    "十": "2",
+    "百": "3",
+    "千": "4",
+    "万": "5",
+    "十万": "6",
+    "百万": "7",
+    "千万": "8",
+}
+_CH_DIGITS = {
+    "一": "1",
+    "二": "2",
+    "三": "3",
+    "四": "4",
+    "五": "5",
+    "六": "6",
+    "七": "7",
+    "八": "8",
+    "九": "9",
+    "两": "2",
+    "幺": "1",
+}
+_CH_UNITS = {"里": "1", "克": "1", "米": "1"}
+# a line without any of these leaves ch_number2digit unchanged
+_CH_NUMBER_START = frozenset(_CH_DIGITS) | {"十", "零"}
 
 
 def ch_number2digit(line):
+    if _CH_NUMBER_START.isdisjoint(line):
+        return line
+    bits = _CH_BITS
+    chsh = _CH_DIGITS
+    unit = _CH_UNITS
     number_flag = 0
     zero_flag = 0
-    bits = {
-        "零": "1",
-        "十": "2",
-        "百": "3",
-        "千": "4",
-        "万": "5",
-        "十万": "6",
-        "百万": "7",
-        "千万": "8",
-    }
-    chsh = {
-        "一": "1",
-        "二": "2",
-        "三": "3",
-        "四": "4",
-        "五": "5",
-        "六": "6",
-        "七": "7",
-        "八": "8",
-        "九": "9",
-        "两": "2",
-        "幺": "1",
-    }
-    unit = {"里": "1", "克": "1", "米": "1"}
-    newline = ""
+    out = []
     digit = []
     bit = []
     onebit = ""
-    for i in range(len(line)):
-        if ord(line[i]) == 32:
-            newline += " "
+    last = len(line) - 1
+    for i, ch in enumerate(line):
+        if ch == " ":
+            out.append(" ")
             continue
-        if line[i] in chsh:
+        if ch in chsh:
             number_flag = 1
-            if line[i] == "两":
-                if (i == len(line) - 1) or (
-                    (line[i + 1] not in chsh.keys())
-                    and (line[i + 1] not in bits.keys())
-                ):
+            if ch == "两":
+                if (i == last) or ((line[i + 1] not in chsh) and (line[i + 1] not in bits)):
                     number_flag = -1
             if number_flag == 1:
-                digit.append(chsh[line[i]])
+                digit.append(chsh[ch])
 
-        elif "十" == line[i] and number_flag == 0:
+        elif "十" == ch and number_flag == 0:
             number_flag = 2
             digit.append("1")
-            bit.append(line[i])
-        elif "十" == line[i] and number_flag == 3:
+            bit.append(ch)
+        elif "十" == ch and number_flag == 3:
             digit.append("1")
-            bit.append(line[i])
-        elif ("零" == line[i]) and (number_flag == 0 or number_flag == 1):
+            bit.append(ch)
+        elif ("零" == ch) and (number_flag == 0 or number_flag == 1):
             digit.append("0")
-        elif ("零" == line[i]) and number_flag == 3:
+        elif ("零" == ch) and number_flag == 3:
             zero_flag = 1
-        elif number_flag == 1 and line[i] in bits:
+        elif number_flag == 1 and ch in bits:
             number_flag = 3
-            if line[i] == "千":
-                if i < len(line) - 1:
+            if ch == "千":
+                if i < last:
                     if line[i + 1] in unit:
                         number_flag = -1
             if number_flag == 3:
-                onebit = line[i]
+                onebit = ch
                 bit.append(onebit)
-        elif number_flag == 3 and line[i] in bits:
-            onebit = bit[-1] + line[i]
+        elif number_flag == 3 and ch in bits:
+            onebit = bit[-1] + ch
             if onebit in bits:
                 bit[-1] = onebit
             else:
@@ -199,73 +163,60 @@ def ch_number2digit(line):
             number_flag = -1
         if len(digit) > 0 and number_flag == -1:
             number_flag = -2
-        if i == (len(line) - 1) and number_flag >= 0:
+        if i == last and number_flag >= 0:
             number_flag = -1
         if number_flag < 0:
-            newdigit = ""
             if len(digit) > 0:  # and (len(digit) == len(bit))):
-                if (
-                    len(bit) == 1
-                    and zero_flag == 0
-                    and bit[0] == "百"
-                    and len(bit) != len(digit)
-                ):
+                if len(bit) == 1 and zero_flag == 0 and bit[0] == "百" and len(bit) != len(digit):
                     bit.append("十")
                 if len(digit) == (len(bit) + 1):
                     bit.append("零")
                 if len(digit) == len(bit):
-                    for m in range(len(digit))[-1::-1]:
-                        if int(bits[bit[m]]) == int(len(newdigit) + 1):
-                            newdigit += digit[m]
-                        else:
-                            nu = int(bits[bit[m]]) - len(newdigit) - 1
-                            for n in range(nu):
-                                newdigit += "0"
-                            newdigit += digit[m]
-                    for z in range(len(newdigit))[-1::-1]:
-                        newline += newdigit[z]
+                    # place each digit at its unit's position, lowest first, zero-filling the gaps
+                    newdigit = []
+                    for m in range(len(digit) - 1, -1, -1):
+                        nu = int(bits[bit[m]]) - len(newdigit) - 1
+                        if nu > 0:
+                            newdigit.extend("0" * nu)
+                        newdigit.append(digit[m])
+                    out.extend(reversed(newdigit))
                 else:
-                    newline += "".join(digit)
+                    out.extend(digit)
                 bit = []
                 digit = []
                 zero_flag = 0
             else:
-                newline += line[i]
+                out.append(ch)
             if number_flag == -2:
-                newline += line[i]
+                out.append(ch)
             number_flag = 0
-    return newline
+    return "".join(out)
+
+
+_SPECIAL_TABLE = str.maketrans(
+    {
+        "\u00f7": "除以",  # ÷
+        "\u00d7": "乘以",  # ×
+        "=": "等于",
+        "+": "加",
+        "-": "负",
+        "\u2103": "摄氏度",  # ℃
+        "\u33a1": "平方米",  # ㎡
+        "\u2030": "%",  # ‰
+        "\ufe6a": "%",  # ﹪
+        ".": "点",
+        "\u00b0": "度",  # °
+    }
+)
 
 
 def special(line):
-    newline = ""
-    for e in range(len(line)):
-        if ord(line[e]) == 247:
-            newline += "除以"
-        elif ord(line[e]) == 215:
-            newline += "乘以"
-        elif ord(line[e]) == 61:
-            newline += "等于"
-        elif ord(line[e]) == 43:
-            newline += "加"
-        elif ord(line[e]) == 45:
-            newline += "负"
-        elif ord(line[e]) == 8451:
-            newline += "摄氏度"
-        elif ord(line[e]) == 13217:
-            newline += "平方米"
-        elif ord(line[e]) == 8240 or ord(line[e]) == 65130:
-            newline += "%"
-        elif ord(line[e]) == 46:
-            newline += "点"
-        elif ord(line[e]) == 176:
-            newline += "度"
-            angel = 1
-        elif ord(line[e]) == 8242 and angel == 1:
-            newline += "分"
-        else:
-            newline += line[e]
-    return newline
+    # a prime after a degree sign is an arc minute; one before any degree sign is kept
+    if "\u2032" in line:
+        degree = line.find("\u00b0")
+        if degree >= 0:
+            line = line[:degree] + line[degree:].replace("\u2032", "分")
+    return line.translate(_SPECIAL_TABLE)
 
 
 def all_convert(content):
@@ -200,11 +200,11 @@ def main():
     print("=" * 50)
     
     print("\n# 1. 生成训练集 JSONL (日文Prompt)")
-    cmd_train = f'python tools/scp2jsonl.py "++scp_file={train_wav_scp}" "++transcript_file={train_text_txt}" "++jsonl_file={train_jsonl}" "++prompt=\'语音转写成日文：\'"'
+    cmd_train = f'python -m tools.scp2jsonl "++scp_file={train_wav_scp}" "++transcript_file={train_text_txt}" "++jsonl_file={train_jsonl}" "++prompt=\'语音转写成日文：\'"'
     print(cmd_train.replace("\\", "\\\\"))
     
     print("\n# 2. 生成验证集 JSONL (日文Prompt)")
-    cmd_val = f'python tools/scp2jsonl.py "++scp_file={val_wav_scp}" "++transcript_file={val_text_txt}" "++jsonl_file={val_jsonl}" "++prompt=\'语音转写成日文：\'"'
+    cmd_val = f'python -m tools.scp2jsonl "++scp_file={val_wav_scp}" "++transcript_file={val_text_txt}" "++jsonl_file={val_jsonl}" "++prompt=\'语音转写成日文：\'"'
     print(cmd_val.replace("\\", "\\\\"))
 
 
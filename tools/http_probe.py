@@ -0,0 +1,101 @@
+import struct
+from io import BytesIO
+from typing import Optional
+
+import soundfile as sf
+
+from remote_audio import HTTPPool
+
+# Enough for the RIFF/fmt chunks of a wav or the STREAMINFO block of a flac, even
+# with a few hundred bytes of LIST/ID3-style metadata in front of them.
+HEADER_BYTES = 64 * 1024
+
+
+def _wav_duration(head: bytes, total_size: Optional[int]) -> Optional[float]:
+    if len(head) < 12 or head[:4] not in (b"RIFF", b"RF64") or head[8:12] != b"WAVE":
+        return None
+    pos = 12
+    fmt = None
+    fact_frames = None
+    while pos + 8 <= len(head):
+        chunk_id = head[pos : pos + 4]
+        chunk_size = struct.unpack_from("<I", head, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b"fmt " and body + 16 <= len(head):
+            fmt = struct.unpack_from("<HHIIHH", head, body)
+        elif chunk_id == b"fact" and body + 4 <= len(head):
+            fact_frames = struct.unpack_from("<I", head, body)[0]
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            format_tag, _, sample_rate, _, block_align, _ = fmt
+            if sample_rate == 0 or block_align == 0:
+                return None
+            if format_tag not in (1, 3, 0xFFFE):
+                # compressed wav: only the fact chunk knows the frame count
+                return fact_frames / sample_rate if fact_frames else None
+            # streamed or RF64 files leave the size unset; trust the transfer size
+            if chunk_size in (0, 0xFFFFFFFF) or (
+                total_size is not None and body + chunk_size > total_size
+            ):
+                if total_size is None:
+                    return None
+                chunk_size = total_size - body
+            return (chunk_size // block_align) / sample_rate
+        pos = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _flac_duration(head: bytes) -> Optional[float]:
+    # "fLaC", then the mandatory STREAMINFO block (4 byte block header + 34 bytes)
+    if len(head) < 42 or head[:4] != b"fLaC" or head[4] & 0x7F != 0:
+        return None
+    info = int.from_bytes(head[18:26], "big")
+    sample_rate = info >> 44
+    total_samples = info & ((1 << 36) - 1)
+    if sample_rate == 0 or total_samples == 0:
+        return None
+    return total_samples / sample_rate
+
+
+def header_duration(head: bytes, total_size: Optional[int] = None) -> Optional[float]:
+    """Duration parsed from the leading bytes of a wav/flac file, or None if unknown."""
+    duration = _wav_duration(head, total_size)
+    if duration is None:
+        duration = _flac_duration(head)
+    return duration
+
+
+class HTTPDurationProber(HTTPPool):
+    """Probe remote audio durations over keep-alive connections.
+
+    One connection per (scheme, host) is kept per thread and reused across
+    requests. Only the first `header_bytes` are requested with a Range header;
+    the full file is fetched only for formats whose header does not carry the
+    length, or when the server ignores Range.
+    """
+
+    def __init__(self, header_bytes: int = HEADER_BYTES, timeout: float = 60):
+        super().__init__(timeout=timeout)
+        self.header_bytes = header_bytes
+
+    def duration(self, url: str) -> float:
+        status, head, total_size = self.fetch(url, (0, self.header_bytes - 1))
+        if status == 404:
+            raise FileNotFoundError(f"WAV not found: {url}")
+        if status == 200:
+            # server ignored the Range header and sent the whole file
+            return sf.info(BytesIO(head)).duration
+        if status != 206:
+            raise IOError(f"HTTP {status} for {url}")
+
+        duration = header_duration(head, total_size)
+        if duration is not None:
+            return duration
+        if total_size is not None and total_size <= len(head):
+            return sf.info(BytesIO(head)).duration
+
+        status, body, _ = self.fetch(url)
+        if status != 200:
+            raise IOError(f"HTTP {status} for {url}")
+        return sf.info(BytesIO(body)).duration
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+把大量小音频文件打包成少量大分片 (.pack + .idx.npz)，并改写清单中的音频路径为
+pack://<分片>.pack#<utt>，训练/解码时由 audio_source 通过 mmap 直接读取。
+支持 jsonl (scp2jsonl / tar_to_jsonl 的输出) 与 scp 两种清单；
+--pcm 时预先解码为 int16 PCM，读取时免解码。
+"""
+
+import argparse
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import soundfile as sf
+from tqdm import tqdm
+
+from packed_audio import PackWriter, make_pack_uri
+from tar_audio import TAR_SCHEME, read_tar_uri
+
+SPEECH_PATTERN = re.compile(r"(<\|startofspeech\|>!)(.*?)(<\|endofspeech\|>)")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Pack audio referenced by a jsonl/scp manifest into .pack shards.")
+    p.add_argument("manifest", help="Input jsonl (ChatML rows) or scp (utt path) manifest")
+    p.add_argument("output_dir", help="Directory for the .pack shards")
+    p.add_argument("--output_manifest", required=True, help="Rewritten manifest with pack:// paths")
+    p.add_argument("--name", default=None, help="Shard name prefix (default: manifest file name)")
+    p.add_argument("--shard_size", type=int, default=2048, help="Target shard size in MiB (default: 2048)")
+    p.add_argument("--pcm", action="store_true", help="Store decoded int16 PCM instead of the encoded bytes")
+    p.add_argument("--chunk_size", type=int, default=256)
+    p.add_argument("--num_workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    return p.parse_args()
+
+
+def audio_key(path: str) -> str:
+    member = path.partition(".tar#")[2] if path.startswith(TAR_SCHEME) else path
+    return os.path.splitext(os.path.basename(member))[0]
+
+
+def read_source(path: str) -> bytes:
+    if path.startswith(TAR_SCHEME):
+        return read_tar_uri(path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def iter_manifest(path: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """Yield (line, audio path or None); jsonl rows and scp lines are both accepted."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if line.lstrip().startswith("{"):
+                m = None
+                for message in json.loads(line)["messages"]:
+                    if message["role"] == "user":
+                        m = SPEECH_PATTERN.search(message["content"])
+                        break
+                yield line, m.group(2) if m else None
+            else:
+                parts = line.split(maxsplit=1)
+                yield line, parts[1].strip() if len(parts) == 2 else None
+
+
+def rewrite_line(line: str, uri: str) -> str:
+    if line.lstrip().startswith("{"):
+        row = json.loads(line)
+        for message in row["messages"]:
+            if message["role"] == "user":
+                message["content"] = SPEECH_PATTERN.sub(
+                    lambda m: m.group(1) + uri + m.group(3), message["content"], count=1
+                )
+                break
+        return json.dumps(row, ensure_ascii=False) + "\n"
+    return f"{line.split(maxsplit=1)[0]} {uri}\n"
+
+
+def load_clip(path: str, pcm: bool) -> Dict:
+    data = read_source(path)
+    if not pcm:
+        return {"data": data, "sample_rate": sf.info(BytesIO(data)).samplerate}
+    samples, sample_rate = sf.read(BytesIO(data), dtype="float32", always_2d=True)
+    return {"samples": samples.mean(axis=1), "sample_rate": sample_rate}
+
+
+def _load_chunk(chunk: List[Optional[str]], pcm: bool) -> List[Dict]:
+    results = []
+    for path in chunk:
+        if path is None:
+            results.append(None)
+            continue
+        try:
+            results.append(load_clip(path, pcm))
+        except Exception as e:
+            results.append({"error": f"Error processing {path}: {str(e)}"})
+    return results
+
+
+class ShardSet:
+    """Rolls over to a new shard once the current one reaches `shard_size` bytes."""
+
+    def __init__(self, output_dir: str, name: str, shard_size: int):
+        self.output_dir = output_dir
+        self.name = name
+        self.shard_size = shard_size
+        self.count = 0
+        self.writer = None
+        self.keys = set()
+
+    def writer_for_next(self) -> PackWriter:
+        if self.writer is not None and self.writer.size >= self.shard_size:
+            self.writer.close()
+            self.writer = None
+        if self.writer is None:
+            shard = os.path.join(self.output_dir, f"{self.name}-{self.count:06d}.pack")
+            self.writer = PackWriter(shard)
+            self.keys = set()
+            self.count += 1
+        return self.writer
+
+    def unique_key(self, key: str) -> str:
+        candidate, n = key, 1
+        while candidate in self.keys:
+            candidate, n = f"{key}.{n}", n + 1
+        self.keys.add(candidate)
+        return candidate
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def main():
+    args = parse_args()
+
+    output_dir = os.path.abspath(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    name = args.name or os.path.splitext(os.path.basename(args.manifest))[0]
+    shards = ShardSet(output_dir, name, args.shard_size << 20)
+
+    counts = {"packed": 0, "failed": 0}
+    error_messages = []
+    entries = iter_manifest(args.manifest)
+    inflight = deque()
+
+    with ProcessPoolExecutor(max_workers=args.num_workers) as executor, open(
+        args.output_manifest, "w", encoding="utf-8"
+    ) as f_out, tqdm(desc="Packing") as pbar:
+        while True:
+            for _ in range(2 * args.num_workers - len(inflight)):
+                chunk = list(islice(entries, args.chunk_size))
+                if not chunk:
+                    break
+                future = executor.submit(_load_chunk, [path for _, path in chunk], args.pcm)
+                inflight.append((chunk, future))
+            if not inflight:
+                break
+
+            # oldest first: shards and the rewritten manifest keep the input order
+            chunk, future = inflight.popleft()
+            for (line, path), clip in zip(chunk, future.result()):
+                if clip is None:
+                    f_out.write(line)
+                    continue
+                if "error" in clip:
+                    counts["failed"] += 1
+                    if len(error_messages) < 10:
+                        error_messages.append(clip["error"])
+                    continue
+                writer = shards.writer_for_next()
+                key = shards.unique_key(audio_key(path))
+                if args.pcm:
+                    writer.add_pcm(key, clip["samples"], clip["sample_rate"])
+                else:
+                    writer.add_encoded(key, clip["data"], clip["sample_rate"])
+                f_out.write(rewrite_line(line, make_pack_uri(writer.shard, key)))
+                counts["packed"] += 1
+            pbar.update(len(chunk))
+            pbar.set_postfix(packed=counts["packed"], failed=counts["failed"], shards=shards.count)
+    shards.close()
+
+    print(f"\nPacked {counts['packed']} clips into {shards.count} shards in {output_dir}")
+    print(f"  Manifest: {args.output_manifest}")
+    print(f"  Failed: {counts['failed']}")
+    for error in error_messages:
+        print(f"  - {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Galgame数据集 一遍扫描直接生成 jsonl (替代 generate_scp.py + scp2jsonl.py)
+并行扫描每个分片子目录 (000000, 000001, ...)，配对音频与文本，
+同时读取时长与分词，按 utt 哈希确定性地划分训练/验证集。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, List, Tuple
+
+import soundfile as sf
+from tqdm import tqdm
+
+from tools.scp2jsonl import DEFAULT_PROMPT, build_row, load_tokenizer
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Scan extracted Galgame shard directories and write train/val jsonl in one pass."
+    )
+    p.add_argument("data_dir", help="Directory containing the shard subdirectories (000000, 000001, ...)")
+    p.add_argument("output_dir", help="Directory for the train/val jsonl files")
+    p.add_argument("--prompt", default=DEFAULT_PROMPT, help="Prompt, e.g. '语音转写成日文：'")
+    p.add_argument("--val_ratio", type=float, default=0.2, help="Fraction of utterances sent to val (default: 0.2)")
+    p.add_argument("--shard_start", type=int, default=0, help="Index of the first shard directory to scan")
+    p.add_argument("--num_shards", type=int, default=None, help="Number of shard directories to scan (default: all)")
+    p.add_argument("--audio_ext", default=".ogg")
+    p.add_argument("--text_ext", default=".txt")
+    p.add_argument("--num_workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    p.add_argument("--name", default=None, help="Output name tag (default: derived from the shard range)")
+    return p.parse_args()
+
+
+def is_val(utt: str, val_ratio: float) -> bool:
+    """Deterministic split: the same utt lands in the same set on every run and machine."""
+    bucket = int(hashlib.sha1(utt.encode("utf-8")).hexdigest()[:8], 16) % 10000
+    return bucket < val_ratio * 10000
+
+
+def scan_pairs(shard_dir: str, audio_ext: str, text_ext: str) -> Tuple[List[Tuple[str, str, str]], int, int]:
+    """Walk `shard_dir` with os.scandir and pair audio files with their transcripts.
+
+    Returns ([(utt, audio_path, text_path)] sorted by audio path, number of audio files
+    without a transcript, number of transcripts without an audio file).
+    """
+    pairs = []
+    missing = 0
+    orphans = 0
+    stack = [shard_dir]
+    while stack:
+        audio, texts = {}, set()
+        current = stack.pop()
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(audio_ext):
+                    audio[entry.name[: -len(audio_ext)]] = entry.path
+                elif entry.name.endswith(text_ext):
+                    texts.add(entry.name[: -len(text_ext)])
+        for stem, path in audio.items():
+            if stem in texts:
+                pairs.append((stem, path, os.path.join(current, stem + text_ext)))
+            else:
+                missing += 1
+        orphans += len(texts.difference(audio))
+    pairs.sort(key=lambda x: x[1])
+    return pairs, missing, orphans
+
+
+_tokenizer = None
+_options = None
+
+
+def _init_worker(options):
+    global _tokenizer, _options
+    _tokenizer = load_tokenizer()
+    _options = options
+
+
+def _process_shard(shard_dir: str) -> Dict:
+    prompt, val_ratio, audio_ext, text_ext = _options
+    pairs, missing, orphans = scan_pairs(shard_dir, audio_ext, text_ext)
+
+    items, errors = [], []
+    for utt, audio_path, text_path in pairs:
+        try:
+            with open(text_path, "r", encoding="utf-8") as f:
+                text = f.read().strip()
+            if not text:
+                missing += 1
+                continue
+            items.append((utt, audio_path, text, sf.info(audio_path).duration))
+        except Exception as e:
+            errors.append(f"Error processing {audio_path}: {str(e)}")
+
+    result = {"train": [], "val": [], "missing": missing, "orphans": orphans, "errors": errors}
+    if items:
+        encoded = _tokenizer(
+            [text for _, _, text, _ in items],
+            add_special_tokens=False,
+            return_attention_mask=False,
+        )["input_ids"]
+        for (utt, audio_path, text, duration), ids in zip(items, encoded):
+            row = build_row(prompt, audio_path, text, duration, len(ids))
+            split = "val" if is_val(utt, val_ratio) else "train"
+            result[split].append(json.dumps(row, ensure_ascii=False) + "\n")
+    return result
+
+
+def main():
+    args = parse_args()
+
+    data_dir = os.path.abspath(args.data_dir)
+    shard_dirs = sorted(
+        entry.path for entry in os.scandir(data_dir) if entry.is_dir(follow_symlinks=False)
+    )
+    end = len(shard_dirs) if args.num_shards is None else args.shard_start + args.num_shards
+    shard_dirs = shard_dirs[args.shard_start : end]
+    if not shard_dirs:
+        print(f"No shard directories found in {data_dir}")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    name = args.name or f"shards{args.shard_start}_{args.shard_start + len(shard_dirs)}"
+    train_jsonl = os.path.join(args.output_dir, f"train_{name}.jsonl")
+    val_jsonl = os.path.join(args.output_dir, f"val_{name}.jsonl")
+
+    counts = {"train": 0, "val": 0, "missing": 0, "orphans": 0, "failed": 0}
+    error_messages = []
+    options = (args.prompt, args.val_ratio, args.audio_ext, args.text_ext)
+    shards = iter(shard_dirs)
+    inflight = deque()
+
+    with ProcessPoolExecutor(
+        max_workers=args.num_workers, initializer=_init_worker, initargs=(options,)
+    ) as executor, open(train_jsonl, "w", encoding="utf-8") as f_train, open(
+        val_jsonl, "w", encoding="utf-8"
+    ) as f_val, tqdm(total=len(shard_dirs), desc="Shards") as pbar:
+        while True:
+            for shard_dir in islice(shards, 2 * args.num_workers - len(inflight)):
+                inflight.append(executor.submit(_process_shard, shard_dir))
+            if not inflight:
+                break
+            # oldest first: output follows shard order regardless of which worker finishes first
+            result = inflight.popleft().result()
+            f_train.writelines(result["train"])
+            f_val.writelines(result["val"])
+            counts["train"] += len(result["train"])
+            counts["val"] += len(result["val"])
+            counts["missing"] += result["missing"]
+            counts["orphans"] += result["orphans"]
+            counts["failed"] += len(result["errors"])
+            error_messages.extend(result["errors"][: 10 - len(error_messages)])
+            pbar.update(1)
+            pbar.set_postfix(counts)
+
+    print(f"\nScanned {len(shard_dirs)} shard directories")
+    print(f"  Train: {counts['train']} -> {train_jsonl}")
+    print(f"  Val: {counts['val']} -> {val_jsonl}")
+    print(f"  Missing transcript: {counts['missing']}")
+    print(f"  Transcript without audio: {counts['orphans']}")
+    print(f"  Failed: {counts['failed']}")
+    for error in error_messages:
+        print(f"  - {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,244 @@
+import hashlib
 import hydra
 import json
 import os
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from io import BytesIO
-from typing import Dict, Optional, Tuple
-from urllib.request import urlopen
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import soundfile as sf
-from modelscope import AutoTokenizer
 from tqdm import tqdm
 from omegaconf import DictConfig, OmegaConf, ListConfig
 
+from blocklist import Blocklist
+from tools.http_probe import HTTPDurationProber
+
+TOKENIZER_NAME = "Qwen/Qwen3-0.6B"
+DEFAULT_PROMPT = "语音转写："
+
+
+def load_tokenizer():
+    # modelscope is slow to import and only the pool workers tokenize
+    from modelscope import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+
+
+def speech_length(duration: float) -> int:
+    """Number of 10ms fbank frames (25ms window) for a clip of `duration` seconds."""
+    return int((duration * 1000 - 25) // 10 + 1)
+
+
+def build_row(prompt: str, wav_path: str, text: str, duration: float, text_length: int) -> Dict:
+    return {
+        "messages": [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {
+                "role": "user",
+                "content": f"{prompt}<|startofspeech|>!{wav_path}<|endofspeech|>",
+            },
+            {"role": "assistant", "content": text},
+        ],
+        "speech_length": speech_length(duration),
+        "text_length": text_length,
+    }
+
+
+def count_lines(path: str) -> int:
+    count = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            count += block.count(b"\n")
+    return count
+
+
+def load_transcripts(transcript_file: str) -> Dict[str, str]:
+    """Read `utt text` lines into a dict so the scp can be key-joined against it."""
+    transcripts = {}
+    with open(transcript_file, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split(maxsplit=1)
+            if len(parts) != 2:
+                continue
+            transcripts[parts[0]] = parts[1]
+    return transcripts
+
+
+def iter_scp(scp_file: str, transcripts: Dict[str, str]) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """Yield (utt, wav_path, text) in scp order; text is None when the utt has no transcript.
+
+    Matched transcripts are popped from `transcripts`, so whatever is left afterwards
+    had no scp entry.
+    """
+    with open(scp_file, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split(maxsplit=1)
+            if len(parts) != 2:
+                continue
+            utt, wav_path = parts
+            yield utt, wav_path, transcripts.pop(utt, None)
+
+
+def drop_blocked(items: Iterable[Tuple], blocklist: Blocklist, skipped: List[str]) -> Iterator[Tuple]:
+    """Filter (utt, wav_path, text) items whose audio is on the blocklist; their utts go to `skipped`."""
+    for item in items:
+        if item[1] in blocklist:
+            skipped.append(item[0])
+            continue
+        yield item
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ManifestCache:
+    """Persistent per-utterance results for incremental runs.
+
+    A row is reused only when (path, size, mtime, text hash, prompt) all match, so
+    re-extracted audio, edited transcripts and prompt changes are recomputed. Remote
+    paths are treated as immutable and stored with size = mtime = -1.
+    """
+
+    def __init__(self, cache_file: str):
+        self.conn = sqlite3.connect(cache_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS utts ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, text_hash TEXT, "
+            "prompt TEXT, duration REAL, text_length INTEGER)"
+        )
+
+    def lookup(self, paths: List[str]) -> Dict[str, Tuple]:
+        """Map path -> (size, mtime_ns, text_hash, prompt, duration, text_length)."""
+        found = {}
+        for start in range(0, len(paths), 500):
+            batch = paths[start : start + 500]
+            rows = self.conn.execute(
+                "SELECT path, size, mtime_ns, text_hash, prompt, duration, text_length "
+                f"FROM utts WHERE path IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            for row in rows:
+                found[row[0]] = row[1:]
+        return found
+
+    def store(self, entries: List[Tuple]):
+        self.conn.executemany("INSERT OR REPLACE INTO utts VALUES (?, ?, ?, ?, ?, ?, ?)", entries)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def attach_cached(chunk: List[Tuple], cache: Optional[ManifestCache]) -> List[Tuple]:
+    found = cache.lookup([wav_path for _, wav_path, _ in chunk]) if cache is not None else {}
+    return [(utt, wav_path, text, found.get(wav_path)) for utt, wav_path, text in chunk]
+
+
+def iter_chunks(items: Iterable, chunk_size: int) -> Iterator[List]:
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ordered_map(executor, fn, items: Iterable, max_inflight: int) -> Iterator:
+    """Yield fn(item) for every item in input order, computed on `executor`.
+
+    Items are pulled lazily and at most `max_inflight` are submitted but not yet
+    yielded, so memory stays bounded however long the input is. Waiting on the oldest
+    future keeps the output order even when later items finish first.
+    """
+    items = iter(items)
+    inflight = deque()
+    while True:
+        for item in islice(items, max_inflight - len(inflight)):
+            inflight.append(executor.submit(fn, item))
+        if not inflight:
+            return
+        yield inflight.popleft().result()
+
 
 class LineProcessor:
-    def __init__(self, tokenizer, prompt="语音转写："):
+    def __init__(self, tokenizer, prompt=DEFAULT_PROMPT):
         self.tokenizer = tokenizer
         self.prompt = prompt
-        self.lock = threading.Lock()
-
-    def process_line(self, line_pair: Tuple[str, str]) -> Optional[Dict]:
-        line1, line2 = line_pair
-
-        line1, line2 = line1.strip(), line2.strip()
-        if not line1 or not line2:
-            return None
-
-        parts1, parts2 = line1.split(maxsplit=1), line2.split(maxsplit=1)
-        if len(parts1) != 2 or len(parts2) != 2:
-            return None
-
-        utt1, utt2 = parts1[0], parts2[0]
-        wav_path, text = parts1[1], parts2[1]
-
-        if utt1 != utt2:
-            return {"error": f"UTT mismatch: {utt1} vs {utt2}"}
-
-        try:
-            if wav_path.startswith("http"):
-                response = urlopen(wav_path)
-                if response.status != 200:
-                    return {"error": f"WAV not found: {wav_path}"}
-                audio_file = BytesIO(response.read())
-                duration = sf.info(audio_file).duration
-            else:
-                if not os.path.exists(wav_path):
-                    return {"error": f"WAV not found: {wav_path}"}
-                duration = sf.info(wav_path).duration
-
-            data = {
-                "messages": [
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {
-                        "role": "user",
-                        "content": f"{self.prompt}<|startofspeech|>!{wav_path}<|endofspeech|>",
-                    },
-                    {"role": "assistant", "content": text},
-                ],
-                "speech_length": int((duration * 1000 - 25) // 10 + 1),
-                "text_length": len(self.tokenizer.tokenize(text)),
-            }
-            return {"success": data, "utt": utt1}
-
-        except Exception as e:
-            return {"error": f"Error processing {wav_path}: {str(e)}"}
+        self.prober = HTTPDurationProber()
+
+    def cache_key(self, wav_path: str, text: str) -> Tuple:
+        if wav_path.startswith("http"):
+            size, mtime_ns = -1, -1
+        else:
+            try:
+                st = os.stat(wav_path)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"WAV not found: {wav_path}")
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        return size, mtime_ns, text_hash(text), self.prompt
+
+    def probe_duration(self, wav_path: str) -> float:
+        if wav_path.startswith("http"):
+            return self.prober.duration(wav_path)
+        return sf.info(wav_path).duration
+
+    def process_chunk(self, chunk: List[Tuple[str, str, Optional[str], Optional[Tuple]]]) -> List[Dict]:
+        """Probe every clip of the chunk, then tokenize all surviving texts in one batch call.
+
+        Items whose cached entry still matches the file and text are answered from the
+        cache; freshly computed items carry a "cache" entry for the caller to store.
+        """
+        results = [None] * len(chunk)
+        pending = []
+        for i, (utt, wav_path, text, cached) in enumerate(chunk):
+            if text is None:
+                results[i] = {"error": f"No transcript for {utt}"}
+                continue
+            try:
+                key = self.cache_key(wav_path, text)
+                if cached is not None and tuple(cached[:4]) == key:
+                    duration, text_length = cached[4:]
+                    data = build_row(self.prompt, wav_path, text, duration, text_length)
+                    results[i] = {"success": data, "utt": utt, "cached": True}
+                    continue
+                pending.append((i, wav_path, text, key, self.probe_duration(wav_path)))
+            except FileNotFoundError as e:
+                results[i] = {"error": str(e)}
+            except Exception as e:
+                results[i] = {"error": f"Error processing {wav_path}: {str(e)}"}
+
+        if pending:
+            encoded = self.tokenizer(
+                [text for _, _, text, _, _ in pending],
+                add_special_tokens=False,
+                return_attention_mask=False,
+            )["input_ids"]
+            for (i, wav_path, text, key, duration), ids in zip(pending, encoded):
+                data = build_row(self.prompt, wav_path, text, duration, len(ids))
+                results[i] = {
+                    "success": data,
+                    "utt": chunk[i][0],
+                    "cache": (wav_path,) + key + (duration, len(ids)),
+                }
+        return results
+
+
+# One processor per worker process, built once by the pool initializer.
+_processor = None
+
+
+def _init_worker(prompt):
+    global _processor
+    _processor = LineProcessor(load_tokenizer(), prompt=prompt)
+
+
+def _process_chunk(chunk):
+    return _processor.process_chunk(chunk)
 
 
 @hydra.main(config_name=None, version_base=None)
@@ -80,65 +255,85 @@ def main_hydra(cfg: DictConfig):
     transcript_file = kwargs["transcript_file"]
     max_workers = kwargs.get("max_workers", os.cpu_count())
     jsonl_file = kwargs["jsonl_file"]
-    prompt = kwargs.get("prompt", "语音转写：")
+    prompt = kwargs.get("prompt", DEFAULT_PROMPT)
+    # lines handed to a worker at once; also the tokenizer batch size
+    chunk_size = kwargs.get("chunk_size", 256)
+    # chunks submitted but not yet written; bounds memory regardless of dataset size
+    max_inflight = kwargs.get("max_inflight", 2 * max_workers)
+    # sqlite file with per-utterance results; unchanged rows are reused on the next run
+    cache_file = kwargs.get("cache_file", None)
+    # broken audio found by tools/check_tars.py; listed clips are left out of the jsonl
+    blocklist_file = kwargs.get("blocklist", None)
 
-    with open(scp_file, "r", encoding="utf-8") as f1, open(transcript_file, "r", encoding="utf-8") as f2:
-        scp_lines = f1.readlines()
-        transcript_lines = f2.readlines()
+    transcripts = load_transcripts(transcript_file)
+    total = count_lines(scp_file)
+    if total != len(transcripts):
+        print(f"Warning: Line count mismatch - scp: {total}, transcript: {len(transcripts)}")
 
-    if len(scp_lines) != len(transcript_lines):
-        print(
-            f"Warning: Line count mismatch - scp: {len(scp_lines)}, transcript: {len(transcript_lines)}"
-        )
-
-    tokenizer = AutoTokenizer.from_pretrained("Qwen/Qwen3-0.6B")
-    processor = LineProcessor(tokenizer, prompt=prompt)
-
-    data_pairs = list(zip(scp_lines, transcript_lines))
+    cache = ManifestCache(cache_file) if cache_file else None
 
     processed_count = 0
+    cached_count = 0
     failed_count = 0
     error_messages = []
 
-    with tqdm(total=len(data_pairs), desc="Processing") as pbar:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            with open(jsonl_file, "w", encoding="utf-8") as f_out:  # Add encoding="utf-8"
-                futures = {
-                    executor.submit(processor.process_line, pair): i
-                    for i, pair in enumerate(data_pairs)
-                }
-
-                for future in as_completed(futures):
-                    result = future.result()
+    items = iter_scp(scp_file, transcripts)
+    blocked = []
+    if blocklist_file:
+        items = drop_blocked(items, Blocklist.load(blocklist_file), blocked)
+    chunks = (attach_cached(chunk, cache) for chunk in iter_chunks(items, chunk_size))
 
-                    if result and "success" in result:
-                        with processor.lock:
+    with tqdm(total=total, desc="Processing") as pbar:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(prompt,)
+        ) as executor:
+            with open(jsonl_file, "w", encoding="utf-8") as f_out:
+                for results in ordered_map(executor, _process_chunk, chunks, max_inflight):
+                    new_entries = []
+                    for result in results:
+                        if "success" in result:
                             json.dump(result["success"], f_out, ensure_ascii=False)
                             f_out.write("\n")
-                        processed_count += 1
-                    elif result and "error" in result:
-                        failed_count += 1
-                        error_messages.append(result["error"])
+                            processed_count += 1
+                            if result.get("cached"):
+                                cached_count += 1
+                            elif "cache" in result:
+                                new_entries.append(result["cache"])
+                        else:
+                            failed_count += 1
+                            if len(error_messages) < 10:
+                                error_messages.append(result["error"])
+                    if cache is not None and new_entries:
+                        cache.store(new_entries)
 
-                    pbar.update(1)
+                    pbar.update(len(results))
                     pbar.set_postfix(
-                        {"processed": processed_count, "failed": failed_count}
+                        {"processed": processed_count, "cached": cached_count, "failed": failed_count}
                     )
 
+    if cache is not None:
+        cache.close()
+
     print(f"\nProcessing completed:")
-    print(f"  Total lines: {len(data_pairs)}")
+    print(f"  Total lines: {processed_count + failed_count + len(blocked)}")
     print(f"  Successfully processed: {processed_count}")
+    if cache is not None:
+        print(f"  Reused from cache: {cached_count}")
     print(f"  Failed: {failed_count}")
+    if blocklist_file:
+        print(f"  Skipped (blocklist): {len(blocked)}")
+    if transcripts:
+        print(f"  Transcripts without scp entry: {len(transcripts)}")
 
-    if error_messages and len(error_messages) <= 10:
+    if error_messages and failed_count <= 10:
         print(f"\nSample errors:")
-        for error in error_messages[:10]:
+        for error in error_messages:
             print(f"  - {error}")
     elif error_messages:
         print(f"\nFirst 10 errors:")
-        for error in error_messages[:10]:
+        for error in error_messages:
             print(f"  - {error}")
-        print(f"  ... and {len(error_messages) - 10} more errors")
+        print(f"  ... and {failed_count - 10} more errors")
 
 
 if __name__ == "__main__":
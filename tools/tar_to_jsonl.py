@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Galgame数据集 直接从 tar 分片生成 jsonl (无需 extract_tars.sh 解压)
+每个分片顺序读取一遍，在内存中配对 .ogg 与 .txt，读取时长并分词，
+jsonl 中的音频路径为 tar://<分片>.tar#<成员>，训练时由 audio_source 直接读取。
+"""
+
+import argparse
+import json
+import os
+import tarfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import islice
+from typing import Dict, List
+
+import soundfile as sf
+from tqdm import tqdm
+
+from tar_audio import make_tar_uri
+from tools.scan_to_jsonl import is_val
+from tools.scp2jsonl import DEFAULT_PROMPT, build_row, load_tokenizer
+
+TAR_PREFIX = "galgame-speech-asr-16kHz-train-"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Stream Galgame tar shards and write train/val jsonl that reference tar members."
+    )
+    p.add_argument("tar_dir", help="Directory containing the galgame-speech-asr-16kHz-train-*.tar shards")
+    p.add_argument("output_dir", help="Directory for the train/val jsonl files")
+    p.add_argument("--prompt", default=DEFAULT_PROMPT, help="Prompt, e.g. '语音转写成日文：'")
+    p.add_argument("--val_ratio", type=float, default=0.2, help="Fraction of utterances sent to val (default: 0.2)")
+    p.add_argument("--shard_start", type=int, default=0, help="Index of the first tar shard to read")
+    p.add_argument("--num_shards", type=int, default=None, help="Number of tar shards to read (default: all)")
+    p.add_argument("--tar_prefix", default=TAR_PREFIX)
+    p.add_argument("--audio_ext", default=".ogg")
+    p.add_argument("--text_ext", default=".txt")
+    p.add_argument("--num_workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    p.add_argument("--name", default=None, help="Output name tag (default: derived from the shard range)")
+    return p.parse_args()
+
+
+_tokenizer = None
+_options = None
+
+
+def _init_worker(options):
+    global _tokenizer, _options
+    _tokenizer = load_tokenizer()
+    _options = options
+
+
+def _process_tar(shard: str) -> Dict:
+    """Read one shard front to back; audio and transcript of an utt are paired by stem."""
+    prompt, val_ratio, audio_ext, text_ext = _options
+    audio, texts = {}, {}
+    items, errors, empty = [], [], []
+
+    def pair(stem):
+        member = audio.pop(stem)
+        text = texts.pop(stem)
+        if not text:
+            empty.append(stem)
+            return
+        try:
+            duration = sf.info(BytesIO(member[1])).duration
+        except Exception as e:
+            errors.append(f"Error processing {make_tar_uri(shard, member[0])}: {str(e)}")
+            return
+        items.append((os.path.basename(stem), member[0], text, duration))
+
+    try:
+        # "r|": strictly sequential stream, no seeking
+        with tarfile.open(shard, "r|") as tar:
+            for info in tar:
+                if not info.isfile():
+                    continue
+                if info.name.endswith(audio_ext):
+                    stem = info.name[: -len(audio_ext)]
+                    audio[stem] = (info.name, tar.extractfile(info).read())
+                elif info.name.endswith(text_ext):
+                    stem = info.name[: -len(text_ext)]
+                    texts[stem] = tar.extractfile(info).read().decode("utf-8").strip()
+                else:
+                    continue
+                if stem in audio and stem in texts:
+                    pair(stem)
+    except (tarfile.TarError, OSError) as e:
+        errors.append(f"Error reading {shard}: {str(e)}")
+
+    # members left unpaired at the end of the shard, and pairs with an empty transcript
+    result = {
+        "train": [],
+        "val": [],
+        "missing": len(audio) + len(empty),
+        "orphans": len(texts),
+        "errors": errors,
+    }
+    if items:
+        encoded = _tokenizer(
+            [text for _, _, text, _ in items],
+            add_special_tokens=False,
+            return_attention_mask=False,
+        )["input_ids"]
+        for (utt, member, text, duration), ids in zip(items, encoded):
+            row = build_row(prompt, make_tar_uri(shard, member), text, duration, len(ids))
+            split = "val" if is_val(utt, val_ratio) else "train"
+            result[split].append(json.dumps(row, ensure_ascii=False) + "\n")
+    return result
+
+
+def main():
+    args = parse_args()
+
+    tar_dir = os.path.abspath(args.tar_dir)
+    shards = sorted(
+        entry.path
+        for entry in os.scandir(tar_dir)
+        if entry.is_file() and entry.name.startswith(args.tar_prefix) and entry.name.endswith(".tar")
+    )
+    end = len(shards) if args.num_shards is None else args.shard_start + args.num_shards
+    shards = shards[args.shard_start : end]
+    if not shards:
+        print(f"No {args.tar_prefix}*.tar shards found in {tar_dir}")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    name = args.name or f"tars{args.shard_start}_{args.shard_start + len(shards)}"
+    train_jsonl = os.path.join(args.output_dir, f"train_{name}.jsonl")
+    val_jsonl = os.path.join(args.output_dir, f"val_{name}.jsonl")
+
+    counts = {"train": 0, "val": 0, "missing": 0, "orphans": 0, "failed": 0}
+    error_messages: List[str] = []
+    options = (args.prompt, args.val_ratio, args.audio_ext, args.text_ext)
+    pending = iter(shards)
+    inflight = deque()
+
+    with ProcessPoolExecutor(
+        max_workers=args.num_workers, initializer=_init_worker, initargs=(options,)
+    ) as executor, open(train_jsonl, "w", encoding="utf-8") as f_train, open(
+        val_jsonl, "w", encoding="utf-8"
+    ) as f_val, tqdm(total=len(shards), desc="Shards") as pbar:
+        while True:
+            for shard in islice(pending, 2 * args.num_workers - len(inflight)):
+                inflight.append(executor.submit(_process_tar, shard))
+            if not inflight:
+                break
+            # oldest first: output follows shard order regardless of which worker finishes first
+            result = inflight.popleft().result()
+            f_train.writelines(result["train"])
+            f_val.writelines(result["val"])
+            counts["train"] += len(result["train"])
+            counts["val"] += len(result["val"])
+            counts["missing"] += result["missing"]
+            counts["orphans"] += result["orphans"]
+            counts["failed"] += len(result["errors"])
+            error_messages.extend(result["errors"][: 10 - len(error_messages)])
+            pbar.update(1)
+            pbar.set_postfix(counts)
+
+    print(f"\nRead {len(shards)} tar shards")
+    print(f"  Train: {counts['train']} -> {train_jsonl}")
+    print(f"  Val: {counts['val']} -> {val_jsonl}")
+    print(f"  Missing transcript: {counts['missing']}")
+    print(f"  Transcript without audio: {counts['orphans']}")
+    print(f"  Failed: {counts['failed']}")
+    for error in error_messages:
+        print(f"  - {error}")
+
+
+if __name__ == "__main__":
+    main()
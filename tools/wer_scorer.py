@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内 CER/WER 计算，结果与 compute-wer 0.2.5 一致: 同样的分词、对齐 (rapidfuzz 位并行编辑距离)、
+逐句输出格式与 Overall/分类/SER 汇总，可作为库调用 (WERScorer / score_files)，
+也可按句切块多进程计算。
+用法与 compute-wer 相同:
+    python -m tools.wer_scorer -c ref.txt hyp.txt cer.txt --nj 8
+"""
+
+import argparse
+import logging
+import multiprocessing
+import sys
+import unicodedata
+from collections import Counter
+from functools import partial
+from itertools import islice
+
+from rapidfuzz.distance import Levenshtein
+
+SINGLE_QUOTE = "'"
+SEPARATOR = "=" * 75
+
+CLUSTER_NAMES = {
+    "DIGIT": "Number",
+    "CJK UNIFIED IDEOGRAPH": "Chinese",
+    "CJK COMPATIBILITY IDEOGRAPH": "Chinese",
+    "LATIN CAPITAL LETTER": "English",
+    "LATIN SMALL LETTER": "English",
+    "HIRAGANA LETTER": "Japanese",
+    "KATAKANA LETTER": "Japanese",
+}
+CLUSTER_IGNORED_PREFIXES = (
+    "AMPERSAND",
+    "APOSTROPHE",
+    "COMMERCIAL AT",
+    "DEGREE CELSIUS",
+    "EQUALS SIGN",
+    "FULL STOP",
+    "HYPHEN-MINUS",
+    "LOW LINE",
+    "NUMBER SIGN",
+    "PLUS SIGN",
+    "SEMICOLON",
+    "SOH (Start of Header)",
+    "UNK (UNKOWN)",
+)
+
+
+def is_character_based(char):
+    """Scripts written without spaces (CJK, kana, Thai, Lao, Myanmar, Khmer, Tibetan)."""
+    cp = ord(char)
+    return (
+        0x4E00 <= cp <= 0x9FFF
+        or 0x3040 <= cp <= 0x30FF
+        or 0x0E00 <= cp <= 0x0EFF
+        or 0x1000 <= cp <= 0x109F
+        or 0x1780 <= cp <= 0x17FF
+        or 0x0F00 <= cp <= 0x0FFF
+    )
+
+
+class ErrorCounts(object):
+    """Cor/Sub/Del/Ins counts; str() is compute-wer's "WER: ..." line."""
+
+    __slots__ = ("equal", "replace", "delete", "insert")
+
+    def __init__(self, equal=0, replace=0, delete=0, insert=0):
+        self.equal = equal
+        self.replace = replace
+        self.delete = delete
+        self.insert = insert
+
+    @property
+    def all(self):
+        return self.equal + self.replace + self.delete
+
+    @property
+    def errors(self):
+        return self.replace + self.delete + self.insert
+
+    @property
+    def wer(self):
+        return self.errors / self.all if self.all else 0
+
+    def update(self, other):
+        self.equal += other.equal
+        self.replace += other.replace
+        self.delete += other.delete
+        self.insert += other.insert
+
+    def as_tuple(self):
+        return self.equal, self.replace, self.delete, self.insert
+
+    def __str__(self):
+        return (
+            f"{self.wer * 100:4.2f} % N={self.all} Cor={self.equal} "
+            f"Sub={self.replace} Del={self.delete} Ins={self.insert}"
+        )
+
+
+class UttScore(object):
+    """Counts of one utterance plus, when requested, the padded alignment lines."""
+
+    __slots__ = ("utt", "counts", "ref_aligned", "hyp_aligned")
+
+    def __init__(self, utt, counts, ref_aligned=None, hyp_aligned=None):
+        self.utt = utt
+        self.counts = counts
+        self.ref_aligned = ref_aligned
+        self.hyp_aligned = hyp_aligned
+
+    @property
+    def wer(self):
+        return self.counts.wer
+
+    def format(self):
+        head = f"utt: {self.utt}\n" if self.utt is not None else ""
+        return (
+            f"{head}WER: {self.counts}\n"
+            f"ref: {' '.join(self.ref_aligned)}\nhyp: {' '.join(self.hyp_aligned)}\n\n"
+        )
+
+
+class _Memo(dict):
+    """dict that fills itself from `fn`, so hot lookups stay in C (map(memo.__getitem__, ...))."""
+
+    def __init__(self, fn):
+        super().__init__()
+        self.fn = fn
+
+    def __missing__(self, key):
+        value = self[key] = self.fn(key)
+        return value
+
+
+OP_INDEX = {"equal": 0, "replace": 1, "delete": 2, "insert": 3}
+
+
+class WERScorer(object):
+    """
+    Accumulating scorer with compute-wer's semantics: `score()` one utterance at a time,
+    then `overall()` for the totals and the per-script clusters. Tokens, clusters and
+    display widths go through memo tables, and the tokens of each op are buffered and
+    counted per cluster (all compute-wer reports) in bulk, so an utterance costs little
+    beyond its alignment.
+    """
+
+    # buffered tokens before they are folded into the cluster counts
+    FLUSH_SIZE = 1 << 16
+
+    def __init__(
+        self,
+        to_char=False,
+        case_sensitive=False,
+        remove_tag=True,
+        ignore_words=(),
+        ignore_punctuation=False,
+        max_wer=sys.maxsize,
+    ):
+        self.to_char = to_char
+        self.case_sensitive = case_sensitive
+        self.remove_tag = remove_tag
+        self.ignore_words = set(ignore_words)
+        self.ignore_punctuation = ignore_punctuation
+        self.max_wer = max_wer
+        # cluster -> [equal, replace, delete, insert], in the order compute-wer lists them
+        # (first appearance of a token of that cluster)
+        self.cluster_counts = {}
+        self.ser_cor = 0
+        self.ser_err = 0
+        self._char_token = _Memo(self._make_char_token)
+        self._word_token = _Memo(self._make_token)
+        self._cluster = _Memo(default_cluster)
+        # tokens of accepted utterances per op (equal, replace, delete, insert), not yet
+        # folded into cluster_counts
+        self._pending = ([], [], [], [])
+        self._known_tokens = set()
+        self._width = _Memo(lambda token: sum(1 + (unicodedata.east_asian_width(c) in "AFW") for c in token))
+
+    # ---------------------------------------------------------------- tokenization
+    def _make_token(self, token):
+        """Final form of a raw token ("" when it is dropped)."""
+        if self.remove_tag:
+            token = strip_tags(token)
+        if not self.case_sensitive:
+            token = token.upper()
+        return "" if token in self.ignore_words else token
+
+    def _make_char_token(self, char):
+        """Token of one character in char mode ("" when the character is skipped)."""
+        cat = unicodedata.category(char)
+        if cat in ("Zs", "Cn"):
+            return ""
+        if cat[0] in "PS":
+            # an apostrophe kept for word-internal use is dropped again in char mode
+            kept = not self.ignore_punctuation
+        else:
+            kept = is_character_based(char) or cat[0] in "LN"
+        return self._make_token(char) if kept else ""
+
+    def _split_words(self, text):
+        res = []
+        i = 0
+        length = len(text)
+        while i < length:
+            char = text[i]
+            cat = unicodedata.category(char)
+            if cat in ("Zs", "Cn"):
+                i += 1
+                continue
+            if cat[0] in "PS":
+                if not self.ignore_punctuation:
+                    res.append(char)
+                    i += 1
+                    continue
+                elif char != SINGLE_QUOTE:
+                    i += 1
+                    continue
+            if is_character_based(char):
+                res.append(char)
+                i += 1
+            elif cat[0] in "LN":
+                j = i + 1
+                while j < length:
+                    next_char = text[j]
+                    next_cat = unicodedata.category(next_char)
+                    if next_cat == "Zs" or is_character_based(next_char):
+                        break
+                    if next_cat[0] in "PS" and next_char != SINGLE_QUOTE:
+                        break
+                    if next_cat[0] in "LN" or next_char == SINGLE_QUOTE:
+                        j += 1
+                    else:
+                        break
+                res.append(text[i:j])
+                i = j
+            else:
+                i += 1
+        return res
+
+    def tokenize(self, text):
+        if self.to_char:
+            return list(filter(None, map(self._char_token.__getitem__, text)))
+        return list(filter(None, map(self._word_token.__getitem__, self._split_words(text))))
+
+    # ---------------------------------------------------------------- scoring
+    def score(self, reference, hypothesis, utt=None, align=True):
+        """Score one utterance; it is accumulated unless its WER reaches max_wer."""
+        ref = self.tokenize(reference)
+        hyp = self.tokenize(hypothesis)
+        counts = ErrorCounts()
+        pending = self._pending
+        marks = [len(tokens) for tokens in pending]
+        # each op is counted for its token (the hypothesis token for an insertion)
+        if ref == hyp:
+            opcodes = None
+            counts.equal = len(ref)
+            pending[0].extend(ref)
+        else:
+            opcodes = Levenshtein.opcodes(ref, hyp)
+            for o in opcodes:
+                tag = o.tag
+                if tag == "insert":
+                    counts.insert += o.dest_end - o.dest_start
+                    pending[3].extend(hyp[o.dest_start : o.dest_end])
+                else:
+                    setattr(counts, tag, getattr(counts, tag) + o.src_end - o.src_start)
+                    pending[OP_INDEX[tag]].extend(ref[o.src_start : o.src_end])
+
+        wer = counts.wer
+        if wer < self.max_wer:
+            if not (self._known_tokens.issuperset(ref) and self._known_tokens.issuperset(hyp)):
+                self._register(ref, hyp, opcodes)
+            if wer == 0:
+                self.ser_cor += 1
+            else:
+                self.ser_err += 1
+            if sum(map(len, pending)) > self.FLUSH_SIZE:
+                self._flush()
+        else:
+            for tokens, mark in zip(pending, marks):
+                del tokens[mark:]
+
+        result = UttScore(utt, counts)
+        if align:
+            result.ref_aligned, result.hyp_aligned = self._align(ref, hyp, opcodes)
+        return result
+
+    def _register(self, ref, hyp, opcodes):
+        # new tokens may bring new clusters: list them in token order, like compute-wer
+        if opcodes is None:
+            tokens = ref
+        else:
+            tokens = []
+            for o in opcodes:
+                if o.tag == "insert":
+                    tokens.extend(hyp[o.dest_start : o.dest_end])
+                else:
+                    tokens.extend(ref[o.src_start : o.src_end])
+        for token in tokens:
+            if token not in self._known_tokens:
+                self._known_tokens.add(token)
+                self.cluster_counts.setdefault(self._cluster[token], [0, 0, 0, 0])
+
+    def _flush(self):
+        # fold the buffered tokens of each op into the cluster counts, in bulk
+        for op, tokens in enumerate(self._pending):
+            for cluster, n in Counter(map(self._cluster.__getitem__, tokens)).items():
+                self.cluster_counts[cluster][op] += n
+            tokens.clear()
+
+    def totals(self):
+        """cluster -> [equal, replace, delete, insert] of everything scored so far."""
+        self._flush()
+        return self.cluster_counts
+
+    def _align(self, ref, hyp, opcodes):
+        """compute-wer's padded alignment columns."""
+        if opcodes is None:
+            return ref, list(ref)
+        width = self._width.__getitem__
+        ref_aligned, hyp_aligned = [], []
+        for o in opcodes:
+            tag = o.tag
+            if tag == "equal":
+                ref_aligned.extend(ref[o.src_start : o.src_end])
+                hyp_aligned.extend(ref[o.src_start : o.src_end])
+            elif tag == "replace":
+                for ref_token, hyp_token in zip(ref[o.src_start : o.src_end], hyp[o.dest_start : o.dest_end]):
+                    diff = width(hyp_token) - width(ref_token)
+                    ref_aligned.append(ref_token + " " * diff)
+                    hyp_aligned.append(hyp_token + " " * -diff)
+            elif tag == "delete":
+                for ref_token in ref[o.src_start : o.src_end]:
+                    ref_aligned.append(ref_token)
+                    hyp_aligned.append(" " * width(ref_token))
+            else:
+                for hyp_token in hyp[o.dest_start : o.dest_end]:
+                    ref_aligned.append(" " * width(hyp_token))
+                    hyp_aligned.append(hyp_token)
+        return ref_aligned, hyp_aligned
+
+    def merge(self, cluster_counts, ser_cor, ser_err):
+        """Fold in the totals() of another scorer (e.g. a worker's), keeping first-seen order."""
+        self._flush()
+        for cluster, counts in cluster_counts.items():
+            mine = self.cluster_counts.setdefault(cluster, [0, 0, 0, 0])
+            for k in range(4):
+                mine[k] += counts[k]
+        self.ser_cor += ser_cor
+        self.ser_err += ser_err
+
+    def overall(self):
+        """(overall ErrorCounts, {cluster: ErrorCounts}) like compute-wer's summary."""
+        overall = ErrorCounts()
+        clusters = {}
+        for name, counts in self.totals().items():
+            counts = ErrorCounts(*counts)
+            overall.update(counts)
+            if counts.all > 0:
+                clusters[name] = counts
+        return overall, clusters
+
+    @property
+    def ser(self):
+        total = self.ser_cor + self.ser_err
+        return self.ser_err / total if total else 0
+
+    def ser_line(self):
+        total = self.ser_cor + self.ser_err
+        return f"{self.ser * 100:4.2f} % N={total} Cor={self.ser_cor} Err={self.ser_err}"
+
+
+def strip_tags(token):
+    """Drop <...> tags from a token."""
+    if "<" not in token:
+        return token
+    chars = []
+    i = 0
+    while i < len(token):
+        if token[i] == "<":
+            end = token.find(">", i) + 1
+            if end == 0:
+                chars.append(token[i])
+                i += 1
+            else:
+                i = end
+        else:
+            chars.append(token[i])
+            i += 1
+    return "".join(chars)
+
+
+def default_cluster(token):
+    """Script cluster of a token (Chinese, Japanese, English, Number or Other)."""
+    clusters = set()
+    for char in token:
+        name = "SOH" if char == "\x01" else unicodedata.name(char, "UNK")
+        if name.startswith(CLUSTER_IGNORED_PREFIXES):
+            continue
+        cluster = "Other"
+        for key, value in CLUSTER_NAMES.items():
+            if name.startswith(key):
+                cluster = value
+                break
+        clusters.add(cluster)
+    return clusters.pop() if len(clusters) == 1 else "Other"
+
+
+def read_scp(path):
+    """utt -> text; a repeated utt must repeat the same text."""
+    utt2text = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            arr = line.strip().split(maxsplit=1)
+            if not arr:
+                continue
+            utt, text = arr[0], arr[1] if len(arr) > 1 else ""
+            if utt in utt2text and text != utt2text[utt]:
+                raise ValueError(f"Conflicting text found:\n{utt}\t{text}\n{utt}\t{utt2text[utt]}")
+            utt2text[utt] = text
+    return utt2text
+
+
+class ScoreReport(object):
+    """Everything compute-wer writes: per-utterance scores, totals, clusters and SER."""
+
+    def __init__(self, utts, scorer, missing_labels=None, missing_hyps=None):
+        self.utts = utts
+        self.overall, self.clusters = scorer.overall()
+        self.ser = scorer.ser
+        self.ser_line = scorer.ser_line()
+        self.missing_labels = missing_labels
+        self.missing_hyps = missing_hyps
+
+    def summary_lines(self):
+        lines = [f"Overall -> {self.overall}"]
+        lines += [f"{name} -> {counts}" for name, counts in self.clusters.items()]
+        if self.missing_labels is not None:
+            lines.append(f"SER -> {self.ser_line} ML={self.missing_labels} MH={self.missing_hyps}")
+        return lines
+
+    def write(self, fout, sort=None):
+        utts = self.utts
+        if sort is not None:
+            utts = sorted(utts, key=lambda u: u.utt if sort == "utt" else u.wer)
+        for utt in utts:
+            fout.write(utt.format())
+        fout.write(SEPARATOR + "\n")
+        for line in self.summary_lines():
+            fout.write(line + "\n")
+        fout.write(SEPARATOR + "\n")
+
+
+def _score_chunk(chunk, options):
+    # runs in a pool worker: score a chunk with a private scorer and hand back its state
+    scorer = WERScorer(**options)
+    listed = []
+    for utt, ref, hyp in chunk:
+        result = scorer.score(ref, hyp, utt=utt)
+        if result.wer <= scorer.max_wer:
+            listed.append(result)
+    return listed, scorer.totals(), scorer.ser_cor, scorer.ser_err
+
+
+def _chunks(items, chunk_size):
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def score_files(ref_file, hyp_file, align_to_hyp=False, nj=1, chunk_size=2000, **options):
+    """
+    Score a hypothesis file against a reference file ('<utt> <text>' lines) like
+    `compute-wer [-c] ref hyp`. Utterances are reported in reference order (hypothesis
+    order with align_to_hyp); options are those of WERScorer.
+    """
+    refs = read_scp(ref_file)
+    hyps = read_scp(hyp_file)
+    missing_labels = sum(1 for utt in hyps if utt not in refs)
+    missing_hyps = sum(1 for utt in refs if utt not in hyps)
+
+    if align_to_hyp:
+        pairs = [(utt, refs[utt], hyp) for utt, hyp in hyps.items() if utt in refs]
+    else:
+        for utt in refs:
+            if utt not in hyps:
+                logging.warning("No hypothesis found for %s, use empty string as hypothesis.", utt)
+        # compute-wer counts the empty hypotheses it fills in as present, so MH stays 0
+        missing_hyps = 0
+        pairs = [(utt, ref, hyps.get(utt, "")) for utt, ref in refs.items()]
+
+    scorer = WERScorer(**options)
+    utts = []
+    if nj <= 1:
+        for utt, ref, hyp in pairs:
+            result = scorer.score(ref, hyp, utt=utt)
+            if result.wer <= scorer.max_wer:
+                utts.append(result)
+    else:
+        with multiprocessing.Pool(nj) as pool:
+            # chunks come back in order, so clusters keep the sequential first-seen order
+            for listed, cluster_counts, ser_cor, ser_err in pool.imap(
+                partial(_score_chunk, options=options), _chunks(pairs, chunk_size)
+            ):
+                utts.extend(listed)
+                scorer.merge(cluster_counts, ser_cor, ser_err)
+    return ScoreReport(utts, scorer, missing_labels, missing_hyps)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Compute WER/CER and align hypotheses with references (compute-wer compatible).")
+    p.add_argument("ref", help="Reference text file ('<utt> <text>')")
+    p.add_argument("hyp", help="Hypothesis text file ('<utt> <text>')")
+    p.add_argument("output_file", nargs="?", default=None, help="Report file (default: stdout)")
+    p.add_argument("--align-to-hyp", action="store_true", help="Score hypothesis utterances only")
+    p.add_argument("-c", "--char", action="store_true", help="Character-level (CER) instead of word-level")
+    p.add_argument("-s", "--sort", choices=["utt", "wer"], default=None, help="Sort utterances by id or WER")
+    p.add_argument("-cs", "--case-sensitive", action="store_true", help="Case-sensitive matching")
+    p.add_argument("-ig", "--ignore-file", default=None, help="File with words to ignore, one per line")
+    p.add_argument("-ip", "--ignore-punctuation", action="store_true", help="Ignore punctuation (except ')")
+    p.add_argument("-mw", "--max-wer", type=float, default=sys.maxsize, help="Only list utterances with WER <= this")
+    p.add_argument("--nj", type=int, default=1, help="Worker processes (default: 1)")
+    return p.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args()
+    ignore_words = set()
+    if args.ignore_file is not None:
+        with open(args.ignore_file, "r", encoding="utf-8") as f:
+            for line in f:
+                word = line.strip()
+                if word:
+                    ignore_words.add(word if args.case_sensitive else word.upper())
+
+    report = score_files(
+        args.ref,
+        args.hyp,
+        align_to_hyp=args.align_to_hyp,
+        nj=args.nj,
+        to_char=args.char,
+        case_sensitive=args.case_sensitive,
+        ignore_words=ignore_words,
+        ignore_punctuation=args.ignore_punctuation,
+        max_wer=args.max_wer,
+    )
+    if args.output_file is None:
+        sys.stdout.write("\n")
+        report.write(sys.stdout, sort=args.sort)
+    else:
+        with open(args.output_file, "w", encoding="utf-8") as f:
+            report.write(f, sort=args.sort)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,31 @@
 #!/usr/bin/python
 # Author: Mengze Chen
 
+import argparse
+import hashlib
+import multiprocessing
+import os
 import re
-import sys
+import sqlite3
+import string
+from collections import OrderedDict
+from functools import lru_cache, partial
+from itertools import groupby, islice
 
-import cn_tn as cn_tn
-import format5res as cn_itn
-import pyopenjtalk
-import zhconv
-from whisper_normalizer.basic import BasicTextNormalizer
-from whisper_normalizer.english import EnglishTextNormalizer
+from tools import cn_tn
+from tools import format5res as cn_itn
 
-basic_normalizer = BasicTextNormalizer()
-english_normalizer = EnglishTextNormalizer()
+# the sqlite cache of normalized texts is opt-in: set $NORM_CACHE (or pass --cache_file)
+DEFAULT_CACHE_FILE = os.environ.get("NORM_CACHE") or None
+
+
+@lru_cache(maxsize=None)
+def whisper_normalizers():
+    """(basic, english) whisper normalizers, built on first use: importing this module stays cheap."""
+    from whisper_normalizer.basic import BasicTextNormalizer
+    from whisper_normalizer.english import EnglishTextNormalizer
+
+    return BasicTextNormalizer(), EnglishTextNormalizer()
 
 
 def is_only_chinese_and_english(s):
@@ -37,7 +50,32 @@ def is_number(s):
     return re.match(pattern, s) is not None
 
 
+# Character classes of the three patterns above. Tokens come from str.split(), so they
+# hold no whitespace and the \s of the patterns never matters.
+_NUMBER_CHARS = frozenset("0123456789,.!?:;，。！？：；、%'")
+_ENGLISH_CHARS = _NUMBER_CHARS | frozenset(string.ascii_letters + "-~")
+_CHINESE_ENGLISH_CHARS = _ENGLISH_CHARS | frozenset(map(chr, range(0x4E00, 0x9FA6)))
+
+
+@lru_cache(maxsize=65536)
+def token_language(token):
+    """
+    Language class of one whitespace-free token, same as testing is_only_english,
+    is_number and is_only_chinese_and_english in turn: one pass over its characters
+    (set() and subset tests) instead of three regex matches, memoized as tokens recur.
+    """
+    chars = set(token)
+    if chars <= _ENGLISH_CHARS and not chars <= _NUMBER_CHARS:
+        return "en"
+    if chars <= _CHINESE_ENGLISH_CHARS:
+        return "chn_en"
+    return "not_chn_en"
+
+
 def safe_ja_g2p(text, kana=True, max_length=100):
+    # only kana conversion needs pyopenjtalk (and its dictionary)
+    import pyopenjtalk
+
     if len(text) > max_length:
         # 如果文本过长，分段处理
         parts = []
@@ -56,80 +94,232 @@ def safe_ja_g2p(text, kana=True, max_length=100):
             return text  # 如果转换失败，返回原文本
 
 
-def normalize_text(srcfn, dstfn, kana=False):
+def normalize_part(language, text):
+    """Normalize one run of same-language tokens."""
+    import zhconv
+
+    basic_normalizer, english_normalizer = whisper_normalizers()
+    if language == "en":
+        out_part1 = english_normalizer(text)
+        return cn_itn.scoreformat("", out_part1)
+    if language == "chn_en":
+        out_part1 = english_normalizer(text)
+    else:
+        out_part1 = basic_normalizer(text)
+    out_part2 = cn_tn.normalize_nsw(out_part1)
+    out_part3 = cn_itn.all_convert(out_part2)
+    return zhconv.convert(out_part3, "zh-cn")
+
+
+def normalize_sentence(text, kana=False):
+    """Normalize the text part of a line (everything after the key)."""
+    text = re.sub(r"=", " ", text)
+    text = re.sub(r"\(", " ", text)
+    text = re.sub(r"\)", " ", text)
+    # From Chongjia Ni
+    if kana:
+        text = safe_ja_g2p(text, kana=True, max_length=100)
+
+    conts = [normalize_part(language, " ".join(run)) for language, run in groupby(text.split(), key=token_language)]
+    return " ".join(conts).strip()
+
+
+def split_line(line):
+    """"<key> <text>" -> (key, text), or None for a blank line."""
+    line_arr = line.strip().split(maxsplit=1)
+    if len(line_arr) < 1:
+        return None
+    return line_arr[0], line_arr[1] if len(line_arr) == 2 else ""
+
+
+def normalize_line(line, kana=False):
+    """Normalize one "<key> <text>" line; returns "<key>\t<text>\n", or None for a blank line."""
+    parts = split_line(line)
+    if parts is None:
+        return None
+    return "{0}\t{1}\n".format(parts[0], normalize_sentence(parts[1], kana))
+
+
+@lru_cache(maxsize=None)
+def normalizer_version():
+    """
+    Everything the output depends on besides the text: the installed normalizer
+    packages and the local normalizer sources, so upgrading or editing any of them
+    invalidates cached results.
+    """
+    import importlib.metadata
+
+    parts = []
+    for dist in ("whisper-normalizer", "zhconv", "pyopenjtalk"):
+        try:
+            parts.append(f"{dist}={importlib.metadata.version(dist)}")
+        except importlib.metadata.PackageNotFoundError:
+            parts.append(f"{dist}=?")
+    for path in (cn_tn.__file__, cn_itn.__file__, __file__):
+        with open(path, "rb") as f:
+            parts.append(hashlib.sha1(f.read()).hexdigest())
+    return "|".join(parts)
+
+
+class NormCache(object):
+    """
+    Normalized text keyed by (text, kana, normalizer_version()): an in-process LRU in
+    front of a sqlite file, so references and recurring hypotheses are normalized once
+    across evaluations. Several processes may share the file.
+    """
+
+    def __init__(self, cache_file, max_memory_items=100000):
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        self.conn = sqlite3.connect(cache_file, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS norm (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        self.memory = OrderedDict()
+        self.max_memory_items = max_memory_items
+
+    @staticmethod
+    def key(text, kana):
+        return hashlib.sha1(f"{normalizer_version()}|{int(kana)}|{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        found = {}
+        missing = []
+        for key in keys:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                found[key] = self.memory[key]
+            else:
+                missing.append(key)
+        # stay well under sqlite's bound parameter limit
+        for start in range(0, len(missing), 500):
+            batch = missing[start : start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, value FROM norm WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            for key, value in rows:
+                self._remember(key, value)
+                found[key] = value
+        return found
+
+    def put_many(self, items):
+        if not items:
+            return
+        for key, value in items:
+            self._remember(key, value)
+        self.conn.executemany("INSERT OR REPLACE INTO norm VALUES (?, ?)", items)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def normalize_lines(lines, kana=False, cache=None):
+    """normalize_line over a batch, answering repeated texts from `cache` (a NormCache) if given."""
+    if cache is None:
+        return [normalize_line(line, kana) for line in lines]
+
+    parsed = [split_line(line) for line in lines]
+    keys = [None if parts is None else NormCache.key(parts[1], kana) for parts in parsed]
+    known = cache.get_many({key for key in keys if key is not None})
+    new_items = []
+    results = []
+    for parts, key in zip(parsed, keys):
+        if parts is None:
+            results.append(None)
+            continue
+        if key not in known:
+            known[key] = normalize_sentence(parts[1], kana)
+            new_items.append((key, known[key]))
+        results.append("{0}\t{1}\n".format(parts[0], known[key]))
+    cache.put_many(new_items)
+    return results
+
+
+_worker_cache = None
+
+
+def _init_worker(cache_file):
+    # the normalizers and the cache connection are set up once per worker
+    global _worker_cache
+    whisper_normalizers()
+    _worker_cache = NormCache(cache_file) if cache_file else None
+
+
+def _normalize_chunk(chunk, kana):
+    return normalize_lines(chunk, kana, _worker_cache)
+
+
+def normalizer_pool(nj, cache_file=None):
+    """Process pool for normalize_async; each worker opens `cache_file` (a NormCache) once."""
+    return multiprocessing.Pool(nj, initializer=_init_worker, initargs=(cache_file,))
+
+
+def normalize_async(pool, lines, kana=False):
+    """normalize_lines(lines) on a normalizer_pool worker; returns the AsyncResult."""
+    return pool.apply_async(_normalize_chunk, (lines, kana))
+
+
+def _iter_chunks(f, chunk_size):
+    while True:
+        chunk = list(islice(f, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def normalize_text(srcfn, dstfn, kana=False, nj=1, chunk_size=256, cache_file=None):
+    """
+    Normalize `srcfn` into `dstfn`. The source is streamed; with nj > 1 chunks of
+    `chunk_size` lines are spread over a process pool and written back in input order.
+    With `cache_file`, texts normalized by earlier runs are looked up instead of recomputed.
+    """
     with open(srcfn, "r", encoding="utf-8") as f_read, open(dstfn, "w", encoding="utf-8") as f_write:
-        all_lines = f_read.readlines()
-        for line in all_lines:
-            line = line.strip()
-            line_arr = line.split(maxsplit=1)
-            if len(line_arr) < 1:
-                continue
-            if len(line_arr) == 1:
-                line_arr.append("")
-            key = line_arr[0]
-            line_arr[1] = re.sub(r"=", " ", line_arr[1])
-            line_arr[1] = re.sub(r"\(", " ", line_arr[1])
-            line_arr[1] = re.sub(r"\)", " ", line_arr[1])
-            # From Chongjia Ni
-            if kana:
-                line_arr[1] = safe_ja_g2p(line_arr[1], kana=True, max_length=100)
-
-            line_arr = f"{key}\t{line_arr[1]}".split()
-            conts = []
-            language_bak = ""
-            part = []
-            for i in range(1, len(line_arr)):
-                out_part = ""
-                chn_eng_bool = is_only_chinese_and_english(line_arr[i])
-                eng_bool = is_only_english(line_arr[i])
-                num_bool = is_number(line_arr[i])
-                if eng_bool and not num_bool:
-                    language = "en"
-                elif chn_eng_bool:
-                    language = "chn_en"
-                else:
-                    language = "not_chn_en"
-                if language == language_bak or language_bak == "":
-                    part.append(line_arr[i])
-                    language_bak = language
-                else:
-                    if language_bak == "en":
-                        out_part1 = english_normalizer(" ".join(part))
-                        out_part = cn_itn.scoreformat("", out_part1)
-                    elif language_bak == "chn_en":
-                        out_part1 = english_normalizer(" ".join(part))
-                        out_part2 = cn_tn.normalize_nsw(out_part1)
-                        out_part3 = cn_itn.all_convert(out_part2)
-                        out_part = zhconv.convert(out_part3, "zh-cn")
-                    else:
-                        out_part1 = basic_normalizer(" ".join(part))
-                        out_part2 = cn_tn.normalize_nsw(out_part1)
-                        out_part3 = cn_itn.all_convert(out_part2)
-                        out_part = zhconv.convert(out_part3, "zh-cn")
-                    conts.append(out_part)
-                    language_bak = language
-                    part = []
-                    part.append(line_arr[i])
-                if i == len(line_arr) - 1:
-                    if language == "en":
-                        out_part1 = english_normalizer(" ".join(part))
-                        out_part = cn_itn.scoreformat("", out_part1)
-                    elif language == "chn_en":
-                        out_part1 = english_normalizer(" ".join(part))
-                        out_part2 = cn_tn.normalize_nsw(out_part1)
-                        out_part3 = cn_itn.all_convert(out_part2)
-                        out_part = zhconv.convert(out_part3, "zh-cn")
-                    else:
-                        out_part1 = basic_normalizer(" ".join(part))
-                        out_part2 = cn_tn.normalize_nsw(out_part1)
-                        out_part3 = cn_itn.all_convert(out_part2)
-                        out_part = zhconv.convert(out_part3, "zh-cn")
-                    conts.append(out_part)
-
-            f_write.write("{0}\t{1}\n".format(key, " ".join(conts).strip()))
+        if nj <= 1:
+            cache = NormCache(cache_file) if cache_file else None
+            try:
+                for chunk in _iter_chunks(f_read, chunk_size):
+                    f_write.writelines(out for out in normalize_lines(chunk, kana, cache) if out is not None)
+            finally:
+                if cache is not None:
+                    cache.close()
+            return
+
+        with normalizer_pool(nj, cache_file) as pool:
+            # imap keeps the input order and only reads ahead as far as the workers consume
+            for results in pool.imap(partial(_normalize_chunk, kana=kana), _iter_chunks(f_read, chunk_size)):
+                f_write.writelines(out for out in results if out is not None)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Normalize '<key> <text>' files for CER/WER scoring.")
+    p.add_argument("srcfn", help="Input text file")
+    p.add_argument("dstfn", help="Output normalized text file")
+    p.add_argument("kana", nargs="?", default=None, help="Any value converts Japanese text to kana first")
+    p.add_argument("--nj", type=int, default=1, help="Worker processes (default: 1)")
+    p.add_argument("--chunk_size", type=int, default=256, help="Lines per worker task (default: 256)")
+    p.add_argument(
+        "--cache_file",
+        default=DEFAULT_CACHE_FILE,
+        help="sqlite cache of normalized texts, e.g. ~/.cache/fun_asr_galgame/norm_cache.sqlite "
+        "(default: $NORM_CACHE, or no cache)",
+    )
+    p.add_argument("--no_cache", action="store_true", help="Normalize everything and leave the cache untouched")
+    return p.parse_args()
 
 
 if __name__ == "__main__":
-    srcfn = sys.argv[1]
-    dstfn = sys.argv[2]
-    normalize_text(srcfn, dstfn, True if len(sys.argv) > 3 else False)
+    args = parse_args()
+    normalize_text(
+        args.srcfn,
+        args.dstfn,
+        args.kana is not None,
+        nj=args.nj,
+        chunk_size=args.chunk_size,
+        cache_file=None if args.no_cache else args.cache_file,
+    )